@@ -0,0 +1,138 @@
+"""
+יומן ריצה (write-ahead journal) לעיבוד תיקייה לתיקיית יעד - המשך מדויק אחרי קריסה.
+
+היומן נשמר בתיקיית היעד (.batch_journal/<hash של תיקיית המקור>/) כקובצי JSONL:
+כל תהליך כותב לקובץ משלו (ללא נעילות בין תהליכים), שורה אחת בקריאת write אחת.
+רשומות:
+- run       - כותרת הריצה (שם תיקיית ה-scan, כדי שהמשך הריצה ישתמש באותה תיקייה)
+- reserving - תיקיית ה-ID שבה עומד להישמר שם, לפני יצירת הקובץ הריק (בהמשך ריצה - קבצים ריקים
+              שנשארו בתיקייה מקריסה לפני רשומת ה-reserved נמחקים)
+- reserved  - שם היעד שנשמר לקובץ, לפני ההעתקה (בהמשך ריצה - אותו שם, ללא עותק כפול)
+- done     - תוצאת העיבוד של הקובץ (קובץ שהעיבוד שלו נכשל לא נרשם - ינוסה שוב)
+קובץ מזוהה לפי שם + גודל + זמן שינוי. בסיום הריצה (אחרי ההעברה לתיקיית ה-scan) היומן נמחק.
+"""
+import hashlib
+import json
+import os
+import shutil
+from uuid import uuid4
+
+JOURNAL_DIR_NAME = ".batch_journal"
+# fsync אחרי כל רשומה (עמידות גם בהפסקת חשמל, במחיר כתיבה סינכרונית לדיסק)
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC") == "1"
+
+
+def journal_dir(destination_folder, source_folder):
+    """תיקיית היומן של זוג (מקור, יעד)"""
+    digest = hashlib.sha1(os.path.abspath(source_folder).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(destination_folder, JOURNAL_DIR_NAME, digest)
+
+
+def file_key(path):
+    """מזהה של תוכן הקובץ לצורך היומן (גודל + זמן שינוי) - ללא קריאת הקובץ"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class JournalWriter:
+    """קובץ יומן של תהליך אחד (O_APPEND, כל רשומה בקריאת write אחת)"""
+
+    def __init__(self, directory, fsync=JOURNAL_FSYNC):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid4().hex[:8]}.jsonl")
+        self.fsync = fsync
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+
+    def append(self, record):
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+_writers = {}
+
+
+def append_record(directory, record):
+    """מוסיף רשומה ליומן (כותב אחד לכל תהליך ותיקייה). שגיאה ביומן לעולם לא מכשילה את העיבוד."""
+    if not directory:
+        return
+    key = (directory, os.getpid())
+    try:
+        if key not in _writers:
+            _writers[key] = JournalWriter(directory)
+        _writers[key].append(record)
+    except OSError as e:
+        print(f"שגיאה בכתיבה ליומן הריצה {directory}: {e}")
+
+
+class JournalState:
+    """מצב הריצה הקודמת כפי שנקרא מהיומן"""
+
+    def __init__(self):
+        self.run = None
+        self.done = {}
+        self.reserved = {}
+        self.id_numbers = set()
+
+    def __bool__(self):
+        return self.run is not None
+
+    def done_record(self, name, key):
+        """רשומת done של הקובץ (אם לא השתנה מאז), או None"""
+        record = self.done.get(name)
+        return record if record and record.get('key') == key else None
+
+    def reserved_path(self, name, key):
+        """שם היעד שנשמר לקובץ בריצה הקודמת ולא הושלם, או None"""
+        record = self.reserved.get(name)
+        if record and record.get('key') == key and name not in self.done:
+            return record.get('dest')
+        return None
+
+
+def load_journal(directory):
+    """קורא את כל קובצי היומן בתיקייה (שורה חלקית מקריסה באמצע כתיבה - מדולגת)"""
+    state = JournalState()
+    try:
+        names = sorted(f for f in os.listdir(directory) if f.endswith('.jsonl'))
+    except OSError:
+        return state
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"שגיאה בקריאת יומן הריצה {name}: {e}")
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            record_type = record.get('type')
+            if record_type == 'run':
+                state.run = state.run or record
+            elif record_type == 'reserving':
+                state.id_numbers.add(record['id'])
+            elif record_type == 'reserved':
+                state.reserved[record['file']] = record
+            elif record_type == 'done':
+                state.done[record['file']] = record
+    return state
+
+
+def remove_journal(directory):
+    """מוחק את היומן בסיום הריצה (וסוגר את הכותב של התהליך הנוכחי)"""
+    writer = _writers.pop((directory, os.getpid()), None)
+    if writer:
+        writer.close()
+    shutil.rmtree(directory, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(directory))  # .batch_journal - רק אם ריקה
+    except OSError:
+        pass
@@ -0,0 +1,99 @@
+"""
+בנצ'מרק: רינדור דפים ל-OCR - הנתיב הישן מול DocumentSession.
+
+הנתיב הישן: פתיחת הקובץ פעמיים (חילוץ טקסט + המרה לתמונות), קידוד כל pixmap
+ל-PNG ופענוח חזרה ב-PIL, ואז המרה לגווני אפור.
+הנתיב החדש: פתיחה אחת, רינדור ישיר ל-pixmap בגווני אפור והעברת הדגימות ל-PIL.
+
+הרצה (מתיקיית הפרויקט):
+    python benchmarks/bench_document_session.py --pages 5 --repeat 3
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+import pdf_processor
+
+
+def build_scanned_pdf(path, pages):
+    """יוצר PDF "סרוק" (דפי תמונה בלבד, ללא שכבת טקסט) בגודל A4"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        img = Image.new("RGB", (2480, 3508), "white")
+        draw = ImageDraw.Draw(img)
+        for line in range(60):
+            draw.text((150, 150 + line * 55), f"Form line {line} page {page_num} ID 203191572", fill="black")
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG")
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(path)
+    doc.close()
+
+
+def legacy_render(pdf_path):
+    """הנתיב הקודם: שתי פתיחות + PNG הלוך-חזור + המרה לגווני אפור"""
+    doc = fitz.open(pdf_path)
+    "".join(page.get_text() for page in doc)
+    doc.close()
+
+    doc = fitz.open(pdf_path)
+    images = []
+    for page in doc:
+        zoom = 300 / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        img = Image.open(io.BytesIO(pix.tobytes("png")))
+        images.append(img.convert("L"))
+    doc.close()
+    return images
+
+
+def session_render(pdf_path):
+    """הנתיב החדש: פתיחה אחת ורינדור ישיר לגווני אפור"""
+    with pdf_processor.DocumentSession(pdf_path) as session:
+        session.text()
+        return [session.render_gray(page_num) for page_num in range(len(session))]
+
+
+def measure(func, pdf_path, repeat):
+    """מחזיר את הזמן הטוב ביותר (שניות) מתוך repeat הרצות"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(pdf_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocumentSession rendering benchmark")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scanned.pdf")
+        build_scanned_pdf(pdf_path, args.pages)
+
+        legacy = measure(legacy_render, pdf_path, args.repeat)
+        session = measure(session_render, pdf_path, args.repeat)
+
+    legacy_ms = legacy * 1000 / args.pages
+    session_ms = session * 1000 / args.pages
+    print(f"pages: {args.pages}, repeat: {args.repeat}")
+    print(f"legacy (2x open + PNG round trip): {legacy_ms:8.1f} ms/page")
+    print(f"DocumentSession (raw gray pixmap): {session_ms:8.1f} ms/page")
+    print(f"saving: {legacy_ms - session_ms:8.1f} ms/page ({legacy / session:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+בנצ'מרק: קצב OCR (דפים לשנייה) - מנוע tesserocr (טעון בזיכרון) מול pytesseract (תהליך לכל תמונה).
+
+הרצה (מתיקיית הפרויקט):
+    python benchmarks/bench_ocr_engines.py --pages 10
+מנוע שאינו מותקן מדולג (עם הודעה).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+from PIL import Image, ImageDraw
+
+import ocr_engine
+from pdf_processor import DEFAULT_TESSERACT_PATH
+
+# נתיב tesseract.exe ב-Windows (כמו ב-pdf_processor) - גם עבור tesserocr, שמאתר לפיו את tessdata
+if os.path.exists(DEFAULT_TESSERACT_PATH):
+    pytesseract.pytesseract.tesseract_cmd = DEFAULT_TESSERACT_PATH
+
+
+def build_pages(count, dpi):
+    """יוצר דפי A4 בגווני אפור עם שורות טקסט ומספר ת"ז"""
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    pages = []
+    for page_num in range(count):
+        img = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(img)
+        for line in range(25):
+            draw.text((dpi // 2, dpi // 2 + line * dpi // 4),
+                      f"Form line {line} page {page_num} ID 203191572", fill=0)
+        pages.append(img)
+    return pages
+
+
+def measure(engine, pages):
+    """מחזיר את קצב ה-OCR (דפים לשנייה) של המנוע"""
+    engine.image_to_string(pages[0])  # חימום (טעינת נתוני שפה)
+    start = time.perf_counter()
+    for img in pages:
+        engine.image_to_string(img)
+    return len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק: קצב OCR - tesserocr מול pytesseract")
+    parser.add_argument("--pages", type=int, default=10, help="מספר הדפים למדידה")
+    parser.add_argument("--dpi", type=int, default=150, help="רזולוציית הדפים הסינתטיים")
+    args = parser.parse_args()
+
+    pages = build_pages(args.pages, args.dpi)
+    results = {}
+    for backend in ("tesserocr", "pytesseract"):
+        try:
+            engine = ocr_engine.create_ocr_engine(backend)
+            results[backend] = measure(engine, pages)
+            engine.close()
+        except Exception as e:
+            print(f"{backend:12s} skipped: {e}")
+            continue
+        print(f"{backend:12s} {results[backend]:6.2f} pages/sec")
+
+    if len(results) == 2:
+        print(f"speedup: {results['tesserocr'] / results['pytesseract']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+בנצ'מרק: שלבי הצנרת על קורפוס סינתטי (synthetic_corpus.py), עם תוצאות ב-JSON והשוואה ל-baseline.
+
+שלבים שנמדדים בנפרד:
+- extract_text      - extract_text_from_pdf על כל הקבצים (לדף)
+- pdf_to_images     - רינדור הקבצים הסרוקים ל-300 DPI, דף אחר דף (לדף)
+- ocr               - perform_ocr_on_images על הדפים שרונדרו (לדף; מדולג אם Tesseract לא מותקן)
+- find_regex_match  - דירוג מועמדי ת"ז בטקסט שחולץ (לקריאה)
+- placement         - place_file של כל קובץ לתיקייה אחרת (לקובץ)
+- end_to_end        - process_folder_with_destination על עותק של הקורפוס (לקובץ), כולל דיוק מול המניפסט
+
+הרצה (מתיקיית הפרויקט):
+    python benchmarks/bench_pipeline.py --output results.json
+    python benchmarks/bench_pipeline.py --baseline results.json --tolerance 0.15
+קוד יציאה 1 אם שלב כלשהו איטי מה-baseline מעבר ל-tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import pdf_processor
+from file_placement import place_file
+from synthetic_corpus import add_corpus_arguments, build_corpus, corpus_options
+
+SCANNED_KINDS = ('scan', 'rotated', 'bundle')
+
+
+def best_of(func, repeat):
+    """מריץ את func repeat פעמים; מחזיר (הזמן הטוב ביותר בשניות, התוצאה של ההרצה האחרונה)"""
+    best = result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def stage_result(seconds, items, unit):
+    return {'seconds': round(seconds, 4), 'items': items, 'unit': unit,
+            'ms_per_item': round(seconds * 1000 / items, 3) if items else None,
+            'per_sec': round(items / seconds, 2) if seconds else None}
+
+
+def ocr_available():
+    """האם מנוע ה-OCR עובד בסביבה הזו"""
+    try:
+        pdf_processor.ocr_image(Image.new('L', (64, 64), 255))
+        return True
+    except Exception:
+        return False
+
+
+def bench_extract_text(corpus, entries, repeat):
+    paths = [os.path.join(corpus, entry['file']) for entry in entries]
+    seconds, texts = best_of(lambda: [pdf_processor.extract_text_from_pdf(path) for path in paths], repeat)
+    return stage_result(seconds, sum(entry['pages'] for entry in entries), 'page'), texts
+
+
+def bench_render_and_ocr(corpus, entries, max_ocr_pages, with_ocr):
+    """
+    רינדור הקבצים הסרוקים (כל הדפים, דף אחר דף - iter_page_images), ו-OCR לעד max_ocr_pages דפים מהם.
+    רק הדפים שעוברים OCR נשמרים בזיכרון.
+    """
+    render_seconds = ocr_seconds = 0.0
+    rendered = ocr_pages = 0
+    ocr_texts = []
+    for entry in entries:
+        images = []
+        start = time.perf_counter()
+        for image in pdf_processor.iter_page_images(os.path.join(corpus, entry['file'])):
+            rendered += 1
+            if ocr_pages + len(images) < max_ocr_pages:
+                images.append(image)
+        render_seconds += time.perf_counter() - start
+        if with_ocr and images:
+            start = time.perf_counter()
+            ocr_texts.append(pdf_processor.perform_ocr_on_images(images))
+            ocr_seconds += time.perf_counter() - start
+            ocr_pages += len(images)
+    stages = {'pdf_to_images': stage_result(render_seconds, rendered, 'page')}
+    if with_ocr:
+        stages['ocr'] = stage_result(ocr_seconds, ocr_pages, 'page')
+    return stages, ocr_texts
+
+
+def bench_find_regex_match(texts, repeat, regex):
+    texts = [text for text in texts if text]
+    seconds, _ = best_of(lambda: [pdf_processor.find_regex_match(text, regex) for text in texts], repeat)
+    return stage_result(seconds, len(texts), 'call')
+
+
+def bench_placement(corpus, entries, repeat):
+    paths = [os.path.join(corpus, entry['file']) for entry in entries]
+    strategies = Counter()
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(corpus))) as target:
+            start = time.perf_counter()
+            for path in paths:
+                strategy, _ = place_file(path, os.path.join(target, os.path.basename(path)))
+                strategies[strategy] += 1
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = stage_result(best, len(paths), 'file')
+    result['strategies'] = dict(strategies)
+    result['mb'] = round(sum(os.path.getsize(path) for path in paths) / (1024 * 1024), 2)
+    return result
+
+
+def bench_end_to_end(corpus, entries, workers, ocr_workers, regex):
+    """עיבוד תיקייה מלא על עותק של הקורפוס; הדיוק נבדק לפי מספר הקבצים בכל תיקיית ת"ז"""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(corpus))) as work:
+        source = os.path.join(work, "source")
+        destination = os.path.join(work, "destination")
+        os.makedirs(source)
+        for entry in entries:
+            shutil.copy2(os.path.join(corpus, entry['file']), source)
+        start = time.perf_counter()
+        stats = pdf_processor.process_folder_with_destination(
+            source, destination, regex, None, workers=workers, cache_path=None,
+            ocr_workers=ocr_workers, resume=False, metrics_dir=None,
+            templates_path=os.path.join(work, "roi_templates.json"))
+        seconds = time.perf_counter() - start
+
+        placed = Counter()
+        for name in os.listdir(destination):
+            folder = os.path.join(destination, name)
+            if os.path.isdir(folder) and name != "unidentified":
+                placed[name] = len(os.listdir(folder))
+    expected = Counter(entry['id'] for entry in entries if entry['id'])
+    if not ocr_workers:
+        expected = Counter(entry['id'] for entry in entries if entry['id'] and entry['kind'] not in SCANNED_KINDS)
+    correct = sum(min(count, placed[id_number]) for id_number, count in expected.items())
+
+    result = stage_result(seconds, len(entries), 'file')
+    result.update({'workers': workers, 'ocr_workers': ocr_workers,
+                   'expected': sum(expected.values()), 'correct': correct,
+                   'wrong': sum(placed.values()) - correct,
+                   'success_count': stats['success_count'], 'unidentified_count': stats['unidentified_count'],
+                   'failed_count': stats['failed_count'], 'stage_seconds': stats.get('stage_seconds', {})})
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """מדפיס השוואה לכל שלב; מחזיר את רשימת השלבים שהאטו מעבר ל-tolerance"""
+    if baseline.get('corpus') != results['corpus']:
+        print("warning: baseline was measured on a different corpus - comparison is indicative only")
+    regressions = []
+    print(f"\n{'stage':18s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, stage in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or not base.get('ms_per_item') or not stage.get('ms_per_item'):
+            continue
+        ratio = stage['ms_per_item'] / base['ms_per_item']
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{name:18s} {base['ms_per_item']:9.2f} ms {stage['ms_per_item']:9.2f} ms {ratio - 1:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק: זמן כל שלב בעיבוד ה-PDF, על קורפוס סינתטי")
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="מספר החזרות לשלבים הזולים (נלקחת הטובה ביותר)")
+    parser.add_argument("--ocr-pages", type=int, default=10, help="מספר הדפים הסרוקים המקסימלי ל-OCR בשלב ה-OCR")
+    parser.add_argument("--workers", type=int, default=max(1, os.cpu_count() or 1),
+                        help="תהליכי מסלול הטקסט בשלב end_to_end")
+    parser.add_argument("--ocr-workers", type=int, default=pdf_processor.OCR_WORKERS,
+                        help="תהליכי מסלול ה-OCR בשלב end_to_end")
+    parser.add_argument("--regex", default=r'(?<!\d)\d{8,9}(?!\d)', help="תבנית REGEX לחיפוש")
+    parser.add_argument("--corpus-dir", help="שמירת הקורפוס שנוצר בתיקייה זו (ברירת מחדל: תיקייה זמנית)")
+    parser.add_argument("--output", help="כתיבת התוצאות לקובץ JSON")
+    parser.add_argument("--baseline", help="תוצאות JSON של ריצה קודמת להשוואה")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="האטה מותרת לעומת הריצה הקודמת (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with_ocr = ocr_available()
+    ocr_workers = args.ocr_workers if with_ocr else 0
+    # כל מה שהריצה כותבת (קורפוס, יעד, תבניות ROI) נשאר בתיקייה הזמנית - לא בתיקיית המשתמש
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        corpus = args.corpus_dir or os.path.join(work_dir, "corpus")
+        entries = build_corpus(corpus, **corpus_options(args))
+        scanned = [entry for entry in entries if entry['kind'] in SCANNED_KINDS]
+        print(f"corpus: {len(entries)} files, {sum(e['pages'] for e in entries)} pages ({len(scanned)} scanned)"
+              f"{'' if with_ocr else ' - OCR not available, ocr stage skipped'}")
+
+        stages = {}
+        stages['extract_text'], texts = bench_extract_text(corpus, entries, args.repeat)
+        render_stages, ocr_texts = bench_render_and_ocr(corpus, scanned, args.ocr_pages, with_ocr)
+        stages.update(render_stages)
+        stages['find_regex_match'] = bench_find_regex_match(texts + ocr_texts, args.repeat, args.regex)
+        stages['placement'] = bench_placement(corpus, entries, args.repeat)
+        stages['end_to_end'] = bench_end_to_end(corpus, entries, args.workers, ocr_workers, args.regex)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'pymupdf': fitz.VersionBind, 'cpu_count': os.cpu_count(), 'ocr': with_ocr},
+        'corpus': corpus_options(args),
+        'stages': stages,
+    }
+
+    for name, stage in stages.items():
+        print(f"{name:18s} {stage['ms_per_item']:9.2f} ms/{stage['unit']:5s} {stage['per_sec']:9.1f} {stage['unit']}s/sec")
+    e2e = stages['end_to_end']
+    print(f"end_to_end accuracy: {e2e['correct']}/{e2e['expected']} placed correctly, {e2e['wrong']} wrong "
+          f"(workers={e2e['workers']}, ocr_workers={e2e['ocr_workers']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"results -> {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+בנצ'מרק: קצב סריקה מקצה לקצה (דפים לשנייה) עם הסורק המדומה -
+הזנת דפים בקצב נתון, שמירה ל-PDF, OCR, זיהוי ת"ז וסידור בתיקיית היעד.
+
+הרצה (מתיקיית הפרויקט):
+    python benchmarks/bench_scan_simulator.py --pages 20 --pps 2 --workers 1,4
+--pps 0 - הזנה מהירה ככל האפשר (מודד את קצב העיבוד בלבד).
+--workers - מספרי threads של OCR להשוואה (1 - OCR של דף אחד בכל פעם).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+import scanner_module
+from scanner_backends import SimulatorScanner
+
+IDS = ("203191572", "314823576", "000000018")
+
+
+def build_page_images(folder, count, dpi):
+    """יוצר תמונות דפי A4 עם שורת ת"ז"""
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    try:
+        font = ImageFont.load_default(size=dpi // 6)
+    except TypeError:
+        font = ImageFont.load_default()
+    for page_num in range(count):
+        img = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(img)
+        draw.text((dpi // 2, dpi // 2), f"Form {page_num}", fill=0, font=font)
+        draw.text((dpi // 2, dpi), f"ID: {IDS[page_num % len(IDS)]}", fill=0, font=font)
+        img.save(os.path.join(folder, f"page_{page_num:04d}.png"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק: קצב סריקה מקצה לקצה (סורק מדומה)")
+    parser.add_argument("--pages", type=int, default=20, help="מספר הדפים במזין")
+    parser.add_argument("--pps", type=float, default=2.0, help="קצב המזין, דפים לשנייה (0 - ללא הגבלה)")
+    parser.add_argument("--dpi", type=int, default=200, help="רזולוציית הדפים המדומים")
+    parser.add_argument("--workers", default="1,4", help="מספרי threads של OCR להשוואה, מופרדים בפסיקים")
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    # תבניות ה-ROI והמדדים של הריצה נשארים בתיקייה הזמנית - לא בתיקיית המשתמש (~/.ocr_scanning)
+    with tempfile.TemporaryDirectory(prefix="bench_scan_") as work_dir:
+        images = os.path.join(work_dir, "feeder")
+        os.makedirs(images)
+        build_page_images(images, args.pages, args.dpi)
+        feeder = f"{args.pps:.1f} pages/sec" if args.pps else "unlimited"
+        print(f"feeder: {feeder}, pages: {args.pages}")
+
+        results = {}
+        for workers in worker_counts:
+            output = os.path.join(work_dir, f"output_{workers}")
+            os.makedirs(output)
+            scanner = SimulatorScanner(images, args.pps or None)
+            start = time.perf_counter()
+            scanner_module.scan_and_process(output, r'(?<!\d)\d{8,9}(?!\d)', backend=scanner, workers=workers,
+                                            metrics_dir=None,
+                                            templates_path=os.path.join(work_dir, f"roi_templates_{workers}.json"))
+            elapsed = time.perf_counter() - start
+            results[workers] = args.pages / elapsed
+            placed = sum(len(files) for _, _, files in os.walk(output))
+            print(f"workers={workers:<3d} {elapsed:7.2f} s  {results[workers]:6.2f} pages/sec  ({placed} files)")
+
+        if len(results) > 1:
+            base = results[worker_counts[0]]
+            for workers in worker_counts[1:]:
+                print(f"speedup {workers} vs {worker_counts[0]}: {results[workers] / base:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
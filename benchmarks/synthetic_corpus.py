@@ -0,0 +1,191 @@
+"""
+קורפוס סינתטי לבנצ'מרקים (PyMuPDF בלבד) - זהה בין הרצות לאותו seed.
+
+סוגי קבצים:
+- text    - PDF עם שכבת טקסט (טופס בעברית עם מספר ת"ז)
+- scan    - דף סרוק: אותו טופס כתמונה בלבד (ללא שכבת טקסט)
+- rotated - דף סרוק מסובב (90/180/270)
+- bundle  - צרור סרוק של כמה דפים (ת"ז בדף הראשון, שאר הדפים טקסט מילוי)
+- noid    - PDF עם שכבת טקסט ללא ת"ז (צפוי ל-unidentified)
+
+שימוש עצמאי:
+    python benchmarks/synthetic_corpus.py <תיקייה> --text 20 --scans 10 --rotated 4 --bundles 3,10
+"""
+import argparse
+import json
+import os
+import random
+
+import fitz  # PyMuPDF
+
+MANIFEST_NAME = "corpus.json"
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 בנקודות
+HEBREW_SCRIPT = 5
+SCAN_JPEG_QUALITY = 75
+
+FORM_TITLES = ("טופס בקשה להחזר הוצאות", "הצהרת בריאות", "טופס פרטים אישיים", "בקשה לאישור זכאות")
+FILLER_LINES = (
+    "הריני מצהיר כי כל הפרטים שמסרתי בטופס זה נכונים ומלאים",
+    "יש לצרף צילום של המסמכים הרלוונטיים לבקשה",
+    "הבקשה תטופל בתוך שלושים ימי עבודה ממועד קבלתה",
+    "במקרה של שינוי בפרטים יש לעדכן את המשרד בהקדם",
+    "הטופס ימולא בכתב יד ברור או בהקלדה",
+)
+ID_LABELS = ("מספר תעודת זהות", "תעודת זהות", "מספר זהות")
+
+
+def israeli_id(rng):
+    """מספר ת"ז אקראי תקין (ספרת ביקורת)"""
+    digits = [rng.randint(0, 9) for _ in range(8)]
+    total = 0
+    for i, digit in enumerate(digits):
+        value = digit * (2 if i % 2 else 1)
+        total += value // 10 + value % 10
+    digits.append((10 - total % 10) % 10)
+    return "".join(str(d) for d in digits)
+
+
+class FormWriter:
+    """כותב דפי טופס בעברית (מימין לשמאל) עם הגופנים המובנים של PyMuPDF"""
+
+    def __init__(self):
+        self.hebrew = fitz.Font(script=HEBREW_SCRIPT)
+        self.latin = fitz.Font("helv")
+
+    def _right_line(self, writer, right, y, text, fontsize, number=None):
+        """שורה מיושרת לימין: תווית בעברית ואחריה (משמאל) מספר"""
+        width = self.hebrew.text_length(text, fontsize=fontsize)
+        writer.append((right - width, y), text, font=self.hebrew, fontsize=fontsize, right_to_left=True)
+        if number:
+            number_width = self.latin.text_length(number, fontsize=fontsize)
+            writer.append((right - width - fontsize - number_width, y), number, font=self.latin, fontsize=fontsize)
+
+    def page(self, doc, rng, id_number=None, title=None):
+        """מוסיף לקובץ דף טופס (עם שכבת טקסט) ומחזיר אותו"""
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        writer = fitz.TextWriter(page.rect)
+        right = PAGE_WIDTH - 60
+        y = 80
+        self._right_line(writer, right, y, title or rng.choice(FORM_TITLES), 18)
+        y += 40
+        self._right_line(writer, right, y, "תאריך", 11, f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024")
+        y += 22
+        self._right_line(writer, right, y, "טלפון", 11, f"05{rng.randint(0, 9)}-{rng.randint(1000000, 9999999)}")
+        y += 22
+        if id_number:
+            self._right_line(writer, right, y, rng.choice(ID_LABELS), 12, id_number)
+            y += 30
+        for _ in range(rng.randint(6, 14)):
+            self._right_line(writer, right, y, rng.choice(FILLER_LINES), 11)
+            y += 20
+        writer.write_text(page)
+        return page
+
+
+def _scan_page(out_doc, source_page, dpi, rotation=0):
+    """מוסיף דף "סרוק": הדף המקורי כתמונת JPEG בגווני אפור, ללא שכבת טקסט"""
+    pix = source_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    width, height = source_page.rect.width, source_page.rect.height
+    if rotation in (90, 270):
+        width, height = height, width
+    page = out_doc.new_page(width=width, height=height)
+    page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=SCAN_JPEG_QUALITY), rotate=rotation)
+    return page
+
+
+def _save(doc, path):
+    # no_new_id - אותו תוכן בכל הרצה (בסיס להשוואה בין הרצות)
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def build_corpus(folder, text=20, scans=10, rotated=4, bundles=(3, 10), noid=2, dpi=150, seed=1):
+    """
+    יוצר את הקורפוס בתיקייה וכותב מניפסט (corpus.json).
+    מחזיר את רשימת הרשומות: {'file', 'kind', 'pages', 'id', 'rotation'}.
+    """
+    rng = random.Random(seed)
+    writer = FormWriter()
+    os.makedirs(folder, exist_ok=True)
+    entries = []
+
+    def add(kind, index, pages, id_number, rotation=0):
+        name = f"{kind}_{index:03d}.pdf"
+        entries.append({'file': name, 'kind': kind, 'pages': pages, 'id': id_number, 'rotation': rotation})
+        return os.path.join(folder, name)
+
+    for index in range(text):
+        id_number = israeli_id(rng)
+        doc = fitz.open()
+        writer.page(doc, rng, id_number)
+        _save(doc, add('text', index, 1, id_number))
+
+    for index in range(noid):
+        doc = fitz.open()
+        writer.page(doc, rng)
+        _save(doc, add('noid', index, 1, None))
+
+    for kind, count in (('scan', scans), ('rotated', rotated)):
+        for index in range(count):
+            id_number = israeli_id(rng)
+            rotation = rng.choice((90, 180, 270)) if kind == 'rotated' else 0
+            source = fitz.open()
+            out = fitz.open()
+            _scan_page(out, writer.page(source, rng, id_number), dpi, rotation)
+            source.close()
+            _save(out, add(kind, index, 1, id_number, rotation))
+
+    for index, pages in enumerate(bundles):
+        id_number = israeli_id(rng)
+        source = fitz.open()
+        out = fitz.open()
+        for page_num in range(pages):
+            _scan_page(out, writer.page(source, rng, id_number if page_num == 0 else None), dpi)
+        source.close()
+        _save(out, add('bundle', index, pages, id_number))
+
+    with open(os.path.join(folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, 'dpi': dpi, 'files': entries}, f, ensure_ascii=False, indent=1)
+    return entries
+
+
+def load_manifest(folder):
+    """קורא את המניפסט של קורפוס קיים"""
+    with open(os.path.join(folder, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)['files']
+
+
+def parse_sizes(value):
+    """"3,10,40" -> (3, 10, 40)"""
+    return tuple(int(size) for size in value.split(",") if size.strip())
+
+
+def add_corpus_arguments(parser):
+    """פרמטרי הקורפוס (משותפים לסקריפטים של הבנצ'מרק)"""
+    parser.add_argument("--text", type=int, default=20, help="קבצי PDF עם שכבת טקסט")
+    parser.add_argument("--scans", type=int, default=10, help="סריקות של דף אחד (תמונה בלבד)")
+    parser.add_argument("--rotated", type=int, default=4, help="סריקות מסובבות של דף אחד")
+    parser.add_argument("--bundles", type=parse_sizes, default=(3, 10), help="גודלי הסריקות מרובות הדפים, למשל 3,10,40")
+    parser.add_argument("--noid", type=int, default=2, help="קבצי PDF עם שכבת טקסט ללא תעודת זהות")
+    parser.add_argument("--scan-dpi", type=int, default=150, help="רזולוציית התמונות בסריקות")
+    parser.add_argument("--seed", type=int, default=1, help="זרע המספרים האקראיים (אותו seed - אותו קורפוס)")
+
+
+def corpus_options(args):
+    """מילון פרמטרי הקורפוס מתוך args (גם לשמירה בתוצאות ולהשוואה מול baseline)"""
+    return {'text': args.text, 'scans': args.scans, 'rotated': args.rotated, 'bundles': list(args.bundles),
+            'noid': args.noid, 'dpi': args.scan_dpi, 'seed': args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="יצירת קורפוס PDF סינתטי")
+    parser.add_argument("folder", help="תיקיית היעד לקורפוס")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    entries = build_corpus(args.folder, **corpus_options(args))
+    pages = sum(entry['pages'] for entry in entries)
+    print(f"{len(entries)} files, {pages} pages -> {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
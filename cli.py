@@ -0,0 +1,152 @@
+"""
+נקודת כניסה לשורת הפקודה (ללא ממשק גרפי).
+לא מייבא PyQt5 או scanner_module (pywin32) - מתאים להרצה מ-cron / שרת Linux.
+
+דוגמאות:
+    python cli.py <תיקיית מקור> <תיקיית יעד>
+    python cli.py <תיקיית מקור> <תיקיית יעד> --regex "\\b\\d{9}\\b" --workers 4 --format json
+    python cli.py <תיקיית מקור> <תיקיית יעד> --watch
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import threading
+
+DEFAULT_REGEX = r'(?<!\d)\d{8,9}(?!\d)'
+
+# קודי יציאה (שגיאת פרמטרים - 2, של argparse)
+EXIT_OK = 0
+EXIT_FILE_ERRORS = 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="סידור קבצי PDF לתיקיות לפי תעודת זהות (ללא ממשק גרפי)")
+    parser.add_argument("source", help="תיקיית מקור עם קבצי PDF")
+    parser.add_argument("destination", help="תיקיית יעד לקבצים המסודרים")
+    parser.add_argument("--regex", default=DEFAULT_REGEX,
+                        help=f"תבנית REGEX לחיפוש (ברירת מחדל: {DEFAULT_REGEX})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="מספר הקבצים שמעובדים במקביל במסלול הטקסט "
+                             "(ברירת מחדל: מספר המעבדים פחות תהליכי ה-OCR, לפחות 1)")
+    parser.add_argument("--ocr-workers", type=int, default=None,
+                        help="תהליכים נפרדים לקבצים סרוקים (OCR); 0 - ללא OCR "
+                             "(ברירת מחדל: OCR_WORKERS או חצי ממספר המעבדים)")
+    parser.add_argument("--format", choices=("text", "json"), default="text",
+                        help="פורמט הסיכום שנכתב ל-stdout")
+    parser.add_argument("--watch", action="store_true",
+                        help="מצב מעקב: עיבוד רציף של קבצים חדשים עד Ctrl+C / SIGTERM")
+    parser.add_argument("--no-cache", action="store_true", help="ללא מטמון תוצאות")
+    parser.add_argument("--raster-budget-mb", type=int, default=None,
+                        help="תקרת הזיכרון (MB) לתמונות הדפים שבעיבוד ל-OCR, משותפת לכל התהליכים; 0 - ללא הגבלה "
+                             "(ברירת מחדל: RASTER_BUDGET_MB או 1024)")
+    parser.add_argument("--metrics-dir", default=None,
+                        help="תיקיית דוחות המדדים - JSON / CSV בסיום ו-metrics.prom במהלך הריצה "
+                             "(ברירת מחדל: OCR_METRICS_DIR או ~/.ocr_scanning/metrics)")
+    parser.add_argument("--no-metrics", action="store_true", help="ללא כתיבת קובצי מדדים")
+    parser.add_argument("--progress", nargs="?", const="-", default=None, metavar="FILE",
+                        help="אירועי התקדמות כשורות JSON (סך, הסתיימו, בעיבוד, קצב, זמן משוער לסיום) - "
+                             "ל-stderr, או לקובץ FILE")
+    parser.add_argument("--quiet", action="store_true", help="ללא לוג (רק הסיכום)")
+    return parser
+
+
+def print_stats(stats, output_format, stream=sys.stdout):
+    """כותב את הסטטיסטיקה בסיום: JSON (שורה אחת) או טקסט key=value"""
+    if output_format == "json":
+        stream.write(json.dumps(stats, ensure_ascii=False, sort_keys=True) + "\n")
+        return
+    for key in sorted(stats):
+        value = stats[key]
+        if key == 'errors':
+            value = len(value)
+        elif isinstance(value, dict):
+            value = ",".join(f"{k}:{v}" for k, v in sorted(value.items(), key=lambda item: str(item[0])))
+        stream.write(f"{key}={value}\n")
+
+
+def parse_args(argv=None):
+    """מפרש ובודק את הפרמטרים (שגיאה - הודעה ויציאה עם קוד 2)"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        re.compile(args.regex)
+    except re.error as e:
+        parser.error(f"תבנית REGEX לא תקינה: {e}")
+    if args.ocr_workers is not None and args.ocr_workers < 0:
+        parser.error("--ocr-workers חייב להיות 0 או יותר")
+    if args.raster_budget_mb is not None and args.raster_budget_mb < 0:
+        parser.error("--raster-budget-mb חייב להיות 0 או יותר")
+    if not os.path.isdir(args.source):
+        parser.error(f"תיקיית המקור לא קיימת: {args.source}")
+    try:
+        os.makedirs(args.destination, exist_ok=True)
+    except OSError as e:
+        parser.error(f"לא ניתן ליצור את תיקיית היעד: {e}")
+    return args
+
+
+@contextlib.contextmanager
+def open_progress_stream(target):
+    """זרם אירועי ההתקדמות: None - ללא, "-" - stderr, אחרת קובץ (נוסף לסופו)"""
+    if not target:
+        yield None
+    elif target == "-":
+        yield sys.stderr
+    else:
+        with open(target, 'a', encoding='utf-8') as stream:
+            yield stream
+
+
+def run(args):
+    """מריץ את העיבוד ומחזיר את מילון הסטטיסטיקה"""
+    import pdf_processor
+    from progress import json_lines
+
+    # הלוג נכתב ל-stderr, כדי ש-stdout יכיל רק את הסיכום
+    def log_callback(message):
+        print(message, file=sys.stderr, flush=True)
+
+    log = None if args.quiet else log_callback
+    cache_path = None if args.no_cache else pdf_processor.DEFAULT_CACHE_PATH
+    ocr_workers = pdf_processor.OCR_WORKERS if args.ocr_workers is None else args.ocr_workers
+    # תהליכי ה-OCR רצים במקביל למסלול הטקסט - יחד לא יותר ממספר המעבדים
+    workers = max(1, (os.cpu_count() or 1) - ocr_workers) if args.workers is None else args.workers
+    metrics_dir = None if args.no_metrics else (args.metrics_dir or pdf_processor.DEFAULT_METRICS_DIR)
+    raster_budget_mb = pdf_processor.RASTER_BUDGET_MB if args.raster_budget_mb is None else args.raster_budget_mb
+
+    if args.watch:
+        if args.progress:
+            print("--progress לא נתמך במצב מעקב (אין מספר קבצים כולל)", file=sys.stderr)
+        stop_event = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+        return pdf_processor.watch_folder_with_destination(
+            args.source, args.destination, args.regex, log,
+            stop_event=stop_event, cache_path=cache_path, ocr=ocr_workers > 0, metrics_dir=metrics_dir,
+            raster_budget_mb=raster_budget_mb)
+    with open_progress_stream(args.progress) as stream:
+        return pdf_processor.process_folder_with_destination(
+            args.source, args.destination, args.regex, log,
+            workers=workers, cache_path=cache_path, ocr_workers=ocr_workers, metrics_dir=metrics_dir,
+            progress_callback=json_lines(stream) if stream else None, raster_budget_mb=raster_budget_mb)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # stdout מיועד לסיכום בלבד: הודעות print של המודולים (ואזהרות בייבוא fitz) מופנות ל-stderr
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        stats = run(args)
+    print_stats(stats, args.format, stdout)
+    return EXIT_FILE_ERRORS if stats.get('failed_count') or stats.get('errors') else EXIT_OK
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+אינדקס בזיכרון של תיקיית היעד - המספר הבא לכל תעודת זהות ({id}-{n}.pdf).
+כל תיקיית ID נסרקת פעם אחת בלבד (בשימוש הראשון בריצה), ומשם המספור מתבצע בזיכרון
+במקום os.listdir / os.path.exists לכל קובץ.
+"""
+import os
+import threading
+
+
+def next_number_on_disk(id_folder_path, id_number):
+    """סורקת את תיקיית ה-ID ומחזירה את המספר העוקב אחרי הגבוה ביותר הקיים"""
+    max_number = 0
+    prefix = f"{id_number}-"
+    try:
+        with os.scandir(id_folder_path) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith(prefix) and name.endswith(".pdf")):
+                    continue
+                # פורמט: {id_number}-{number}.pdf
+                try:
+                    number = int(name[len(prefix):-4])
+                except ValueError:
+                    continue
+                if number > max_number:
+                    max_number = number
+    except OSError:
+        pass
+    return max_number + 1
+
+
+class DestinationIndex:
+    """
+    שומר את המספר הבא לכל תעודת זהות בתיקיית היעד.
+    שמירת שם היא אטומית: נעילה בין threads באותו תהליך, ויצירת הקובץ עם O_EXCL
+    בין תהליכים - אם תהליך אחר כבר תפס את המספר, ממשיכים למספר הבא.
+    """
+
+    def __init__(self, destination_folder):
+        self.destination_folder = destination_folder
+        self._next_numbers = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, id_number):
+        """
+        שומר את השם הפנוי הבא ל-ID ומחזיר את הנתיב המלא.
+        הקובץ נוצר ריק - המתקשר כותב / מעתיק / מחליף אותו (os.replace).
+        """
+        id_folder_path = os.path.join(self.destination_folder, id_number)
+        with self._lock:
+            number = self._next_numbers.get(id_number)
+            if number is None:
+                os.makedirs(id_folder_path, exist_ok=True)
+                number = next_number_on_disk(id_folder_path, id_number)
+            while True:
+                dest_path = os.path.join(id_folder_path, f"{id_number}-{number}.pdf")
+                try:
+                    fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    # נתפס על ידי תהליך אחר (או נוסף מבחוץ) - ממשיכים לבא בתור
+                    number += 1
+                    continue
+                os.close(fd)
+                self._next_numbers[id_number] = number + 1
+                return dest_path
+
+    def release(self, dest_path):
+        """
+        מוחק שם ששמור ולא נוצל (למשל אחרי כשל בהעתקה) - כדי שלא יישאר PDF ריק בתיקיית ה-ID.
+        אם זה השם האחרון שנשמר ל-ID, המספר חוזר לשימוש (הקובץ הבא לא "מדלג" עליו).
+        """
+        id_number = os.path.basename(os.path.dirname(dest_path))
+        name = os.path.basename(dest_path)
+        prefix = f"{id_number}-"
+        with self._lock:
+            try:
+                os.remove(dest_path)
+            except OSError:
+                return
+            if not (name.startswith(prefix) and name.endswith(".pdf")):
+                return
+            try:
+                number = int(name[len(prefix):-4])
+            except ValueError:
+                return
+            if self._next_numbers.get(id_number) == number + 1:
+                self._next_numbers[id_number] = number
+
+
+# מספר האינדקסים (ריצות) שנשמרים בכל תהליך
+MAX_RUN_INDEXES = 8
+
+_run_indexes = {}
+_run_indexes_lock = threading.Lock()
+
+
+def get_destination_index(destination_folder, run_id=None):
+    """
+    מחזיר את אינדקס היעד של הריצה הנוכחית בתהליך הזה.
+    run_id מזהה ריצה; ריצה חדשה בונה אינדקס חדש (כדי לא להסתמך על מצב ישן של התיקייה).
+    """
+    key = (os.path.abspath(destination_folder), run_id)
+    with _run_indexes_lock:
+        index = _run_indexes.get(key)
+        if index is None:
+            # ריצה חדשה - משחררים את האינדקסים של הריצות הישנות ביותר
+            while len(_run_indexes) >= MAX_RUN_INDEXES:
+                _run_indexes.pop(next(iter(_run_indexes)))
+            index = _run_indexes[key] = DestinationIndex(destination_folder)
+        return index
@@ -0,0 +1,151 @@
+"""
+שכבת מיקום קבצים (placement): העתקה / קישור / העברה של קבצים ליעד בדרך הזולה ביותר
+שמערכת הקבצים מאפשרת, עם ספירה של הבתים שהועברו בפועל.
+
+אסטרטגיות (לפי הסדר שבו מנסים אותן):
+- reflink         - שכפול copy-on-write (Btrfs / XFS) - אפס בתים
+- hardlink        - קישור קשיח (אותו כונן) - אפס בתים; היעד והמקור הם אותו קובץ, ולכן רק לפי בקשה
+- copy_file_range - העתקה בתוך הקרנל (Linux; בשיתוף NFS - לפעמים בצד השרת)
+- sendfile        - העתקה בתוך הקרנל (Linux)
+- copyfile2       - CopyFile2 של Windows (Python 3.12+; העתקה בצד השרת בשיתופי SMB)
+- copy            - העתקה רגילה בבלוקים גדולים (תמיד זמינה)
+"""
+import os
+import shutil
+import sys
+from uuid import uuid4
+
+# סדר ברירת המחדל (hardlink לא כלול - היעד היה משתף את הקובץ עם הארכיון במקור)
+DEFAULT_STRATEGIES = ('reflink', 'copy_file_range', 'sendfile', 'copyfile2', 'copy')
+
+COPY_BUFFER_SIZE = 1024 * 1024
+# ioctl של Linux לשכפול קובץ (FICLONE)
+FICLONE = 0x40049409
+
+
+def _reflink(src, dst, size):
+    if not sys.platform.startswith('linux'):
+        raise NotImplementedError("reflink")
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    return 0
+
+
+def _hardlink(src, dst, size):
+    # היעד יכול להיות קובץ ריק ששמור מראש - מקשרים לשם זמני ומחליפים
+    temp_path = f"{dst}.{uuid4().hex[:8]}.link"
+    os.link(src, temp_path)
+    try:
+        os.replace(temp_path, dst)
+    except OSError:
+        os.remove(temp_path)
+        raise
+    return 0
+
+
+def _copy_file_range(src, dst, size):
+    if not hasattr(os, 'copy_file_range'):
+        raise NotImplementedError("copy_file_range")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        copied = 0
+        while copied < size:
+            count = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if count == 0:
+                break
+            copied += count
+    if copied != size:
+        raise OSError(f"copy_file_range העתיק {copied} מתוך {size} בתים")
+    return copied
+
+
+def _sendfile(src, dst, size):
+    if not sys.platform.startswith('linux') or not hasattr(os, 'sendfile'):
+        raise NotImplementedError("sendfile")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        copied = 0
+        while copied < size:
+            count = os.sendfile(fdst.fileno(), fsrc.fileno(), copied, size - copied)
+            if count == 0:
+                break
+            copied += count
+    if copied != size:
+        raise OSError(f"sendfile העתיק {copied} מתוך {size} בתים")
+    return copied
+
+
+def _copyfile2(src, dst, size):
+    try:
+        import _winapi
+        copy_file2 = _winapi.CopyFile2
+    except (ImportError, AttributeError):
+        raise NotImplementedError("CopyFile2")
+    copy_file2(src, dst, 0)
+    return size
+
+
+def _stream_copy(src, dst, size):
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+    return size
+
+
+_STRATEGIES = {
+    'reflink': _reflink,
+    'hardlink': _hardlink,
+    'copy_file_range': _copy_file_range,
+    'sendfile': _sendfile,
+    'copyfile2': _copyfile2,
+    'copy': _stream_copy,
+}
+
+
+def place_file(src, dst, strategies=DEFAULT_STRATEGIES):
+    """
+    מעתיק את src ל-dst בדרך הזולה ביותר מבין האסטרטגיות (כמו shutil.copy2 - כולל זמני הקובץ).
+    מחזיר (שם האסטרטגיה, בתים שהועברו בפועל).
+    """
+    size = os.path.getsize(src)
+    last_error = None
+    for name in strategies:
+        try:
+            transferred = _STRATEGIES[name](src, dst, size)
+        except (OSError, NotImplementedError) as e:
+            # המערכת / הכונן לא תומכים - ממשיכים לאסטרטגיה הבאה
+            last_error = e
+            continue
+        if name != 'hardlink':
+            shutil.copystat(src, dst)
+        return name, transferred
+    raise last_error or OSError(f"לא נמצאה דרך להעתיק את {src}")
+
+
+def move_file(src, dst, strategies=DEFAULT_STRATEGIES):
+    """
+    מעביר קובץ: שינוי שם (אותו כונן - אפס בתים), ואם לא אפשרי - place_file ומחיקת המקור.
+    מחזיר (שם האסטרטגיה, בתים שהועברו בפועל).
+    """
+    try:
+        os.rename(src, dst)
+        return 'rename', 0
+    except OSError:
+        # כונן אחר (או יעד קיים ב-Windows) - העתקה ומחיקה, כמו shutil.move
+        pass
+    name, transferred = place_file(src, dst, strategies)
+    os.remove(src)
+    return name, transferred
+
+
+def record_placement(stats, strategy, transferred):
+    """מעדכן מילון סטטיסטיקה: בתים שהועברו בפועל וספירה לפי אסטרטגיה"""
+    stats['bytes_transferred'] = stats.get('bytes_transferred', 0) + transferred
+    placement = stats.setdefault('placement', {})
+    placement[strategy] = placement.get(strategy, 0) + 1
+
+
+def placement_summary(stats):
+    """שורת סיכום ללוג"""
+    placement = stats.get('placement', {})
+    details = ", ".join(f"{name}: {count}" for name, count in sorted(placement.items()))
+    megabytes = stats.get('bytes_transferred', 0) / (1024 * 1024)
+    return f"הועברו בפועל {megabytes:.1f} MB ({details})"
@@ -0,0 +1,215 @@
+"""
+מעקב אחרי תיקיית מקור - זיהוי קבצי PDF חדשים ברגע שהם מגיעים.
+- InotifyWatcher: inotify של Linux (דרך ctypes, ללא תלות חיצונית)
+- PollingWatcher: גיבוי - סריקת התיקייה כל כמה שניות (Windows, macOS, כונני רשת)
+קובץ נחשב מוכן לעיבוד רק כשהכתיבה אליו הסתיימה (ראו PendingFiles).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# מרווח הסריקה במצב polling (שניות)
+POLL_INTERVAL = 1.0
+# זמן ללא שינוי בגודל / בזמן השינוי שאחריו הקובץ נחשב שלם (שניות)
+SETTLE_TIME = 0.5
+# קובץ יציב בלי סימן סוף (%%EOF) מעובד בכל זאת אחרי הזמן הזה - העיבוד עצמו יטפל בקובץ פגום
+STALE_TIME = 30.0
+# גם עם inotify - סריקה מלאה מדי פעם (אירועים מכונני רשת לא תמיד מגיעים)
+RESCAN_INTERVAL = 30.0
+
+# inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def list_pdf_files(folder):
+    """רשימת קבצי ה-PDF ברמה העליונה של התיקייה (ללא תתי-תיקיות)"""
+    try:
+        with os.scandir(folder) as entries:
+            return [entry.name for entry in entries
+                    if entry.name.lower().endswith('.pdf') and entry.is_file()]
+    except OSError:
+        return []
+
+
+class PollingWatcher:
+    """מעקב בסריקה חוזרת של התיקייה"""
+    name = "polling"
+
+    def __init__(self, folder, poll_interval=POLL_INTERVAL):
+        self.folder = folder
+        self.poll_interval = poll_interval
+        self._last_scan = 0.0
+
+    def changes(self, timeout):
+        """
+        ממתין עד timeout שניות ומחזיר (שמות קבצים שאולי השתנו, האם הכתיבה אליהם ידועה כגמורה).
+        """
+        wait = self._last_scan + self.poll_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() - self._last_scan < self.poll_interval:
+                return [], False
+        self._last_scan = time.monotonic()
+        return list_pdf_files(self.folder), False
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    מעקב באמצעות inotify: IN_CLOSE_WRITE (הכותב סגר את הקובץ) ו-IN_MOVED_TO (הועבר לתיקייה).
+    """
+    name = "inotify"
+
+    def __init__(self, folder):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify זמין רק ב-Linux")
+        self.folder = folder
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 נכשל")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self._fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch נכשל: {folder}")
+        self._last_scan = time.monotonic()
+
+    def changes(self, timeout):
+        # סריקה מלאה מדי פעם, או אחרי גלישת תור האירועים
+        if time.monotonic() - self._last_scan >= RESCAN_INTERVAL:
+            self._last_scan = time.monotonic()
+            return list_pdf_files(self.folder), False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return [], True
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], True
+
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            _, event_mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if event_mask & IN_Q_OVERFLOW:
+                self._last_scan = 0.0
+                continue
+            name = os.fsdecode(raw_name)
+            if name.lower().endswith('.pdf'):
+                names.append(name)
+        return names, True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def create_watcher(folder, poll_interval=POLL_INTERVAL, use_inotify=None):
+    """inotify אם אפשר (use_inotify=None - אוטומטי), אחרת polling"""
+    if use_inotify is not False:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            if use_inotify:
+                raise
+            if sys.platform.startswith('linux'):
+                print(f"inotify לא זמין ({e}) - ממשיך עם סריקה חוזרת")
+    return PollingWatcher(folder, poll_interval)
+
+
+def _has_pdf_trailer(path):
+    """בודק שסוף הקובץ מכיל %%EOF (סורקים ותוכנות כותבים אותו אחרון)"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+class PendingFiles:
+    """
+    קבצים שזוהו ועוד לא עובדו.
+    קובץ מוכן כשגודלו וזמן השינוי שלו לא השתנו SETTLE_TIME שניות (או שהכותב סגר אותו - inotify)
+    וסופו מכיל %%EOF.
+    """
+
+    def __init__(self, folder, settle_time=SETTLE_TIME):
+        self.folder = folder
+        self.settle_time = settle_time
+        self._pending = {}
+        # קבצים שכבר עובדו (ונשארו בתיקייה, למשל כשההעברה נכשלה) - לפי גודל וזמן שינוי
+        self._handled = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _state(self, name):
+        try:
+            st = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def add(self, names, closed=False):
+        now = time.monotonic()
+        for name in names:
+            state = self._state(name)
+            if state is None or self._handled.get(name) == state:
+                continue
+            entry = self._pending.get(name)
+            if entry is None:
+                self._pending[name] = entry = {'arrived': now, 'state': state, 'stable_since': now}
+            elif entry['state'] != state:
+                entry['state'] = state
+                entry['stable_since'] = now
+            if closed:
+                entry['stable_since'] = min(entry['stable_since'], now - self.settle_time)
+
+    def pop_ready(self):
+        """מחזיר רשימת (שם קובץ, זמן הגעה) של הקבצים שהכתיבה אליהם הסתיימה"""
+        now = time.monotonic()
+        ready = []
+        for name, entry in list(self._pending.items()):
+            state = self._state(name)
+            if state is None:
+                # הקובץ נמחק / הועבר לפני שעובד
+                del self._pending[name]
+                continue
+            if state != entry['state']:
+                entry['state'] = state
+                entry['stable_since'] = now
+                continue
+            stable_for = now - entry['stable_since']
+            if state[0] == 0 or stable_for < self.settle_time:
+                continue
+            if stable_for < STALE_TIME and not _has_pdf_trailer(os.path.join(self.folder, name)):
+                continue
+            del self._pending[name]
+            ready.append((name, entry['arrived']))
+        ready.sort(key=lambda item: item[1])
+        return ready
+
+    def mark_handled(self, name):
+        state = self._state(name)
+        if state is not None:
+            self._handled[name] = state
+        else:
+            self._handled.pop(name, None)
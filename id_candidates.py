@@ -0,0 +1,177 @@
+"""
+מנוע מועמדים לתעודת זהות.
+מריץ כמה תבניות (תבנית המשתמש + תבניות מובנות: 8/9 ספרות, עם/בלי מקפים ורווחים),
+מקומפלות פעם אחת לריצה, ומדרג את המועמדים התקינים לפי הקרבה לתוויות עוגן כמו "ת.ז".
+תבנית המשתמש קובעת מה נחשב התאמה: התבניות המובנות רצות רק בתוך הקטעים שהיא התאימה
+(ועל כל הטקסט רק כשאין תבנית משתמש), ומועמד של תבנית המשתמש תמיד קודם למועמד מובנה.
+"""
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+IdCandidate = namedtuple('IdCandidate', 'value score position source')
+
+# תוויות עוגן שלידן מופיעה בדרך כלל תעודת הזהות
+ANCHOR_PATTERN = re.compile(
+    r'ת\s?[."״\']\s?ז|תעודת\s+זהות|מס(?:פר|\'|׳)?\s*זהות|\bI\.?\s?D\b|\bidentity\b',
+    re.IGNORECASE)
+
+# תבניות מובנות למספר זהות
+BUILTIN_PATTERNS = (
+    r'(?<!\d)\d{9}(?!\d)',
+    r'(?<!\d)\d{8}(?!\d)',
+    r'(?<!\d)\d{2,3}-\d{5,6}-\d(?!\d)',
+    r'(?<!\d)\d{3}\s\d{3}\s\d{3}(?!\d)',
+)
+
+# ניקוד
+USER_PATTERN_BONUS = 3.0
+NINE_DIGITS_BONUS = 0.5
+ANCHOR_BONUS = 5.0
+# טווח ההשפעה של עוגן: בתווים (טקסט בלבד) או בגבהי-שורה (כשיש תיבות מילים)
+ANCHOR_TEXT_RANGE = 60
+ANCHOR_BOX_RANGE = 8.0
+
+
+def _checksum_ok(digits):
+    """ספרת ביקורת של ת"ז (כמו pdf_processor.is_valid_israeli_id, ללא תלות מעגלית)"""
+    if not digits.isdigit() or len(digits) > 9:
+        return False
+    digits = digits.zfill(9)
+    total = 0
+    for i, ch in enumerate(digits):
+        val = int(ch) * (2 if i % 2 == 1 else 1)
+        total += val // 10 + val % 10
+    return total % 10 == 0
+
+
+def words_from_ocr_data(data):
+    """ממיר פלט image_to_data (מילון) לרשימת מילים בפורמט של fitz: (x0, y0, x1, y1, טקסט)"""
+    words = []
+    for index, word in enumerate(data.get('text', [])):
+        word = str(word).strip()
+        if not word:
+            continue
+        left, top = data['left'][index], data['top'][index]
+        words.append((left, top, left + data['width'][index], top + data['height'][index], word))
+    return words
+
+
+class IdCandidateEngine:
+    """
+    מנוע דירוג מועמדים. נבנה פעם אחת לכל תבנית REGEX (ראו get_candidate_engine).
+    """
+
+    def __init__(self, regex_pattern=None, builtin_patterns=BUILTIN_PATTERNS):
+        self.user_regex = re.compile(regex_pattern, re.MULTILINE) if regex_pattern else None
+        self.builtin_regexes = [re.compile(pattern) for pattern in builtin_patterns]
+
+    @staticmethod
+    def _add(found, raw, position, bonus, source):
+        """מוסיף התאמה אם היא ת"ז תקינה (ספרת ביקורת); ממוזג לפי ערך + מיקום"""
+        digits = re.sub(r'[\s-]', '', raw.strip())
+        if not _checksum_ok(digits):
+            return
+        key = (digits.zfill(9), position)
+        previous = found.get(key)
+        if previous is None or bonus > previous[0]:
+            found[key] = (bonus, source, len(digits))
+
+    def _raw_candidates(self, text):
+        """
+        כל ההתאמות התקינות: של תבנית המשתמש, ושל התבניות המובנות בתוך הקטעים שהיא התאימה
+        (כל הטקסט - רק כשאין תבנית משתמש).
+        """
+        found = {}
+        if self.user_regex is None:
+            spans = [(0, len(text))]
+        else:
+            spans = []
+            group = 1 if self.user_regex.groups else 0
+            for match in self.user_regex.finditer(text):
+                raw = match.group(group)
+                if raw is None:
+                    continue
+                self._add(found, raw, match.start(group), USER_PATTERN_BONUS, 'user')
+                spans.append(match.span(group))
+        for start, end in spans:
+            for regex in self.builtin_regexes:
+                for match in regex.finditer(text, start, end):
+                    self._add(found, match.group(0), match.start(), 0.0, 'builtin')
+        return found
+
+    def candidates(self, text, words=None):
+        """
+        מחזיר רשימת מועמדים תקינים מדורגת (הגבוה ביותר ראשון).
+        words - רשימת מילים עם תיבות (x0, y0, x1, y1, טקסט, ...) מ-fitz או מ-OCR,
+        או פונקציה ללא פרמטרים שמחזירה אותה (מחושבת רק אם יש צורך).
+        """
+        if not text:
+            return []
+        found = self._raw_candidates(text)
+        if not found:
+            return []
+
+        anchors = [m for m in ANCHOR_PATTERN.finditer(text)]
+        box_distances = None
+        if anchors and len({value for value, _ in found}) > 1 and words is not None:
+            box_distances = self._box_anchor_distances(words() if callable(words) else words)
+
+        ranked = []
+        for (value, position), (bonus, source, length) in found.items():
+            score = bonus + (NINE_DIGITS_BONUS if length == 9 else 0.0)
+            if box_distances and value in box_distances:
+                score += ANCHOR_BONUS * max(0.0, 1.0 - box_distances[value] / ANCHOR_BOX_RANGE)
+            elif anchors:
+                distance = min(min(abs(position - a.end()), abs(position - a.start())) for a in anchors)
+                score += ANCHOR_BONUS * max(0.0, 1.0 - distance / ANCHOR_TEXT_RANGE)
+            ranked.append(IdCandidate(value, score, position, source))
+
+        # התאמה לתבנית המשתמש קודמת לכל התאמה מובנית (גם כשהמובנית קרובה יותר לעוגן);
+        # בתוך כל קבוצה - ניקוד גבוה קודם, ובתיקו - ההופעה הראשונה בטקסט (כמו ההתנהגות הקודמת)
+        ranked.sort(key=lambda c: (c.source != 'user', -c.score, c.position))
+        return ranked
+
+    def best(self, text, words=None):
+        """מחזיר את המועמד המוביל (מספר בן 9 ספרות) או None"""
+        ranked = self.candidates(text, words)
+        return ranked[0].value if ranked else None
+
+    @staticmethod
+    def _box_anchor_distances(words):
+        """
+        לכל מספר שמופיע כמילה בודדת - המרחק לעוגן הקרוב ביותר, ביחידות של גובה שורה.
+        """
+        anchor_boxes = []
+        number_boxes = {}
+        for word in words:
+            x0, y0, x1, y1, token = word[:5]
+            token = str(token)
+            # "תעודת זהות" מפוצלת לשתי מילים - די במילה "זהות"
+            if ANCHOR_PATTERN.search(token) or 'זהות' in token:
+                anchor_boxes.append((x0, y0, x1, y1))
+            digits = re.sub(r'[\s-]', '', token)
+            if digits.isdigit() and 8 <= len(digits) <= 9:
+                number_boxes.setdefault(digits.zfill(9), []).append((x0, y0, x1, y1))
+        if not anchor_boxes:
+            return None
+
+        distances = {}
+        for value, boxes in number_boxes.items():
+            best = None
+            for nx0, ny0, nx1, ny1 in boxes:
+                line_height = max(1.0, ny1 - ny0)
+                for ax0, ay0, ax1, ay1 in anchor_boxes:
+                    dx = max(0.0, ax0 - nx1, nx0 - ax1)
+                    dy = max(0.0, ay0 - ny1, ny0 - ay1)
+                    distance = math.hypot(dx, dy) / line_height
+                    best = distance if best is None else min(best, distance)
+            distances[value] = best
+        return distances
+
+
+@lru_cache(maxsize=32)
+def get_candidate_engine(regex_pattern):
+    """מחזיר מנוע מועמדים לתבנית (מקומפל פעם אחת לכל תבנית בכל תהליך)"""
+    return IdCandidateEngine(regex_pattern)
@@ -0,0 +1,99 @@
+"""
+מאגר לוג בין thread העיבוד לממשק (ללא תלות ב-Qt).
+
+thread העיבוד מוסיף הודעות לרשימה (append - ללא signal של Qt לכל שורה), והממשק מושך אותן
+בטיימר (drain) ומציג אותן בבת אחת. הרשימה חסומה: אם הממשק לא מספיק למשוך, ההודעות הישנות נזרקות
+(הן ממילא היו נדחקות מהתצוגה החסומה) - והלוג המלא נכתב לקובץ בדיסק.
+"""
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+# תיקיית קובצי הלוג (משתנה סביבה OCR_LOG_DIR; ריק - ללא קובץ)
+DEFAULT_LOG_DIR = os.environ.get("OCR_LOG_DIR",
+                                 os.path.join(os.path.expanduser("~"), ".ocr_scanning", "logs")) or None
+# מספר קובצי הלוג שנשמרים (הישנים ביותר נמחקים בתחילת ריצה חדשה)
+LOG_FILES_TO_KEEP = 20
+# מספר ההודעות המרבי שממתינות לממשק
+MAX_PENDING_MESSAGES = 5000
+
+
+class LogBuffer:
+    """
+    לוג של ריצה אחת (עיבוד תיקייה / מעקב / סריקה).
+    kind - חלק משם קובץ הלוג: <kind>-<תאריך>.log
+    """
+
+    def __init__(self, kind, log_dir=DEFAULT_LOG_DIR, max_pending=MAX_PENDING_MESSAGES):
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_pending)
+        self._dropped = 0
+        self._file = None
+        self.path = None
+        if log_dir:
+            self._open_file(kind, log_dir)
+
+    def _open_file(self, kind, log_dir):
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            _prune_log_files(log_dir, LOG_FILES_TO_KEEP - 1)
+            path = os.path.join(log_dir, f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.log")
+            self._file = open(path, 'w', encoding='utf-8')
+            self.path = path
+        except OSError as e:
+            print(f"שגיאה ביצירת קובץ הלוג: {e}")
+
+    def append(self, message):
+        """מוסיף הודעה (בטוח לקריאה מכל thread)"""
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(message)
+            if self._file:
+                try:
+                    self._file.write(message + "\n")
+                except (OSError, ValueError) as e:
+                    print(f"שגיאה בכתיבה לקובץ הלוג: {e}")
+                    self._file = None
+
+    def drain(self):
+        """
+        מחזיר (הודעות שהצטברו מאז הקריאה הקודמת, מספר הודעות שנזרקו בדרך) ומרוקן את הרשימה.
+        הקובץ נשטף לדיסק בכל קריאה - כך שהוא עדכני כמו התצוגה.
+        """
+        with self._lock:
+            messages = list(self._pending)
+            dropped = self._dropped
+            self._pending.clear()
+            self._dropped = 0
+            if self._file:
+                try:
+                    self._file.flush()
+                except OSError:
+                    pass
+        return messages, dropped
+
+    def close(self):
+        """סוגר את קובץ הלוג (הודעות שלא נמשכו נשארות ל-drain)"""
+        with self._lock:
+            if self._file:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass
+                self._file = None
+
+
+def _prune_log_files(log_dir, keep):
+    """מוחק את קובצי הלוג הישנים ומשאיר את keep האחרונים"""
+    try:
+        names = sorted((name for name in os.listdir(log_dir) if name.endswith('.log')),
+                       key=lambda name: os.path.getmtime(os.path.join(log_dir, name)))
+    except OSError:
+        return
+    for name in names[:max(0, len(names) - keep)]:
+        try:
+            os.remove(os.path.join(log_dir, name))
+        except OSError:
+            pass
@@ -2,6 +2,7 @@
 נקודת כניסה ראשית לאפליקציית PDF Rename Tool
 """
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 import ui_main
@@ -27,5 +28,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # נדרש לעיבוד מקבילי (process pool) בקובץ הרצה ארוז ב-Windows
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,324 @@
+"""
+מדדי ביצועים: זמני שלבים לכל קובץ (spans), מונים והיסטוגרמות.
+
+- track_file(name) - פותח "רשומת קובץ" ל-thread הנוכחי; span(stage) ו-count(name) נרשמים אליה.
+  מחוץ ל-track_file הם לא עושים כלום (כמעט ללא עלות), כך שהפונקציות ב-pdf_processor נמדדות
+  רק כשהן רצות במסגרת עיבוד של קובץ.
+- הרשומה היא מילון רגיל (as_dict) - עוברת מתהליך עבודה לתהליך הראשי יחד עם תוצאת הקובץ.
+- RunMetrics - צבירה לריצה שלמה: מונים, היסטוגרמות לכל שלב, ושורה לכל קובץ (במצב מעקב - רק השורות האחרונות).
+  בסיום: דוח JSON + CSV; במהלך ריצה ארוכה: קובץ טקסט בפורמט Prometheus שמתעדכן כל כמה שניות.
+  נשמרים רק הדוחות של REPORTS_TO_KEEP הריצות האחרונות.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# תיקיית הדוחות (משתנה סביבה OCR_METRICS_DIR; ריק - ללא כתיבת קבצים)
+DEFAULT_METRICS_DIR = os.environ.get("OCR_METRICS_DIR",
+                                     os.path.join(os.path.expanduser("~"), ".ocr_scanning", "metrics")) or None
+# שם קובץ הטקסט לגריפה (מתעדכן במהלך הריצה) ותדירות העדכון
+LIVE_FILE_NAME = "metrics.prom"
+LIVE_EXPORT_INTERVAL = 10.0
+METRIC_PREFIX = "ocr_scanning"
+# מספר הדוחות (run-*.json / .csv) שנשמרים - הישנים ביותר נמחקים בכתיבת דוח חדש
+REPORTS_TO_KEEP = 50
+# מספר שורות הקבצים שנשמרות בזיכרון במצב מעקב (ריצה ללא סוף); המונים וההיסטוגרמות כוללים את כל הקבצים
+WATCH_FILE_ROWS = 10000
+
+# שלבים מוכרים (לסדר העמודות ב-CSV); שלב אחר נוסף בסוף
+STAGES = ('open', 'extract', 'render', 'rotate', 'ocr', 'match', 'save', 'place')
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# מונים של בתים שנכתבו ליעד (העתקה לתיקיית היעד / PDF מהסורק) - להיסטוגרמת גודל הקבצים
+BYTES_COUNTERS = ('bytes_copied', 'bytes_written')
+BYTES_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2,
+                 256 * 1024 ** 2)
+
+_current = threading.local()
+
+
+class FileMetrics:
+    """זמני השלבים והמונים של קובץ (או דף סרוק) אחד"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+        # זמן שלבים פנימיים של כל span פתוח (מנוכה ממנו - כל שלב נספר פעם אחת)
+        self.open_spans = []
+
+    def add_span(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {'file': self.name, 'seconds': time.perf_counter() - self.started,
+                'spans': dict(self.spans), 'counters': dict(self.counters)}
+
+
+@contextmanager
+def track_file(name):
+    """רשומת מדדים לקובץ שמעובד ב-thread הנוכחי (מקוננת - הרשומה הקודמת חוזרת ביציאה)"""
+    recorder = FileMetrics(name)
+    previous = getattr(_current, 'file', None)
+    _current.file = recorder
+    try:
+        yield recorder
+    finally:
+        _current.file = previous
+
+
+@contextmanager
+def span(stage):
+    """
+    מודד את זמן הבלוק ומוסיף אותו לשלב ברשומת הקובץ הנוכחית.
+    span בתוך span: הזמן הפנימי נספר רק לשלב הפנימי (למשל חילוץ מילים בזמן דירוג התאמה).
+    """
+    recorder = getattr(_current, 'file', None)
+    if recorder is None:
+        yield
+        return
+    recorder.open_spans.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder.add_span(stage, elapsed - recorder.open_spans.pop())
+        if recorder.open_spans:
+            recorder.open_spans[-1] += elapsed
+
+
+def count(name, value=1):
+    """מוסיף למונה ברשומת הקובץ הנוכחית"""
+    recorder = getattr(_current, 'file', None)
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def merge_records(first, second):
+    """
+    רשומת קובץ אחת משתי רשומות של אותו קובץ (למשל מסלול הטקסט ואחריו מסלול ה-OCR) -
+    הזמנים והמונים מסוכמים, כך שהקובץ נספר פעם אחת.
+    """
+    if not first:
+        return second
+    if not second:
+        return first
+    spans = dict(first['spans'])
+    for stage, seconds in second['spans'].items():
+        spans[stage] = spans.get(stage, 0.0) + seconds
+    counters = dict(first['counters'])
+    for name, value in second['counters'].items():
+        counters[name] = counters.get(name, 0) + value
+    return {'file': second['file'], 'seconds': first['seconds'] + second['seconds'],
+            'spans': spans, 'counters': counters}
+
+
+class Histogram:
+    """היסטוגרמה עם גבולות קבועים (מצטברת, כמו ב-Prometheus)"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+    def cumulative(self):
+        """[(גבול, מספר התצפיות עד הגבול)] - כולל +Inf"""
+        total = 0
+        result = []
+        for bound, bucket in zip(self.bounds, self.buckets):
+            total += bucket
+            result.append((bound, total))
+        result.append(("+Inf", self.count))
+        return result
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6),
+                'mean': round(self.sum / self.count, 6) if self.count else None,
+                'buckets': {str(bound): total for bound, total in self.cumulative()}}
+
+
+class RunMetrics:
+    """
+    צבירת המדדים של ריצה אחת (עיבוד תיקייה, מעקב או סריקה).
+    metrics_dir - תיקיית הדוחות (None - צבירה בזיכרון בלבד).
+    max_file_rows - מספר שורות הקבצים המרבי לדוח ה-CSV (None - כולן); מעבר לזה נשמרות האחרונות.
+    """
+
+    def __init__(self, kind, metrics_dir=DEFAULT_METRICS_DIR, live_interval=LIVE_EXPORT_INTERVAL,
+                 max_file_rows=None):
+        self.kind = kind
+        self.metrics_dir = metrics_dir
+        self.live_interval = live_interval
+        self.started = datetime.now()
+        self.counters = {}
+        self.stage_histograms = {}
+        self.file_seconds = Histogram(SECONDS_BUCKETS)
+        self.file_bytes = Histogram(BYTES_BUCKETS)
+        self.files = deque(maxlen=max_file_rows)
+        self._lock = threading.Lock()
+        self._last_export = time.monotonic()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_file(self, record, status=None):
+        """מוסיף רשומת קובץ (FileMetrics.as_dict) לצבירה"""
+        if not record:
+            return
+        with self._lock:
+            for stage, seconds in record['spans'].items():
+                histogram = self.stage_histograms.get(stage)
+                if histogram is None:
+                    histogram = self.stage_histograms[stage] = Histogram(SECONDS_BUCKETS)
+                histogram.observe(seconds)
+            for name, value in record['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            if status:
+                key = f"files_{status}"
+                self.counters[key] = self.counters.get(key, 0) + 1
+            self.file_seconds.observe(record['seconds'])
+            written = sum(record['counters'].get(name, 0) for name in BYTES_COUNTERS)
+            if written:
+                self.file_bytes.observe(written)
+            self.files.append(dict(record, status=status))
+
+    def stage_totals(self):
+        """{שלב: סך השניות} - לסיכום בלוג ובסטטיסטיקה"""
+        with self._lock:
+            return {stage: round(h.sum, 3) for stage, h in self.stage_histograms.items()}
+
+    def summary(self):
+        """שורת סיכום ללוג: הזמן הכולל לכל שלב"""
+        totals = self.stage_totals()
+        if not totals:
+            return "מדדים: לא נמדדו שלבים"
+        ordered = [stage for stage in STAGES if stage in totals] + sorted(set(totals) - set(STAGES))
+        return "זמן לפי שלב: " + ", ".join(f"{stage} {totals[stage]:.1f}s" for stage in ordered)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'started': self.started.isoformat(timespec='seconds'),
+                'elapsed': round((datetime.now() - self.started).total_seconds(), 3),
+                'counters': dict(self.counters),
+                'stages': {stage: h.as_dict() for stage, h in self.stage_histograms.items()},
+                'file_seconds': self.file_seconds.as_dict(),
+                'file_bytes': self.file_bytes.as_dict(),
+            }
+
+    def prometheus_text(self):
+        """המדדים בפורמט הטקסט של Prometheus"""
+        lines = []
+        with self._lock:
+            for name in sorted(self.counters):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f'{metric}{{kind="{self.kind}"}} {self.counters[name]}')
+            histograms = [('stage_seconds', {'stage': stage}, h) for stage, h in sorted(self.stage_histograms.items())]
+            histograms += [('file_seconds', {}, self.file_seconds), ('file_bytes', {}, self.file_bytes)]
+            typed = set()
+            for name, labels, histogram in histograms:
+                metric = f"{METRIC_PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                labels = dict(labels, kind=self.kind)
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                for bound, total in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {total}')
+                lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _write_atomic(self, path, write):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    def export_live(self, force=False):
+        """כותב את קובץ הגריפה (metrics.prom) - לכל היותר פעם ב-live_interval שניות"""
+        if not self.metrics_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_export < self.live_interval:
+            return
+        self._last_export = now
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            text = self.prometheus_text()
+            self._write_atomic(os.path.join(self.metrics_dir, LIVE_FILE_NAME), lambda f: f.write(text))
+        except OSError as e:
+            print(f"שגיאה בכתיבת קובץ המדדים: {e}")
+
+    def write_report(self):
+        """
+        דוח סיום: run-<זמן>-<סוג>.json (מונים והיסטוגרמות) ו-.csv (שורה לכל קובץ, עמודה לכל שלב).
+        מחזיר את נתיב ה-JSON (או None).
+        """
+        if not self.metrics_dir:
+            return None
+        base = os.path.join(self.metrics_dir, f"run-{self.started.strftime('%Y%m%d-%H%M%S')}-{self.kind}")
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            snapshot = self.snapshot()
+            self._write_atomic(base + ".json",
+                               lambda f: json.dump(snapshot, f, ensure_ascii=False, indent=2))
+            self._write_atomic(base + ".csv", self._write_csv)
+        except OSError as e:
+            print(f"שגיאה בכתיבת דוח המדדים: {e}")
+            return None
+        _prune_reports(self.metrics_dir, REPORTS_TO_KEEP)
+        self.export_live(force=True)
+        return base + ".json"
+
+    def _write_csv(self, f):
+        with self._lock:
+            files = list(self.files)
+        stages = {stage for record in files for stage in record['spans']}
+        stages = [stage for stage in STAGES if stage in stages] + sorted(stages - set(STAGES))
+        counters = sorted({name for record in files for name in record['counters']})
+        writer = csv.writer(f)
+        writer.writerow(['file', 'status', 'seconds'] + [f"{stage}_seconds" for stage in stages] + counters)
+        for record in files:
+            writer.writerow([record['file'], record.get('status') or '', f"{record['seconds']:.6f}"]
+                            + [f"{record['spans'].get(stage, 0.0):.6f}" for stage in stages]
+                            + [record['counters'].get(name, 0) for name in counters])
+
+
+def _prune_reports(metrics_dir, keep):
+    """מוחק את דוחות הריצות הישנים ומשאיר את keep האחרונים (לכל סיומת)"""
+    for extension in ('.json', '.csv'):
+        try:
+            names = sorted((name for name in os.listdir(metrics_dir)
+                            if name.startswith('run-') and name.endswith(extension)),
+                           key=lambda name: os.path.getmtime(os.path.join(metrics_dir, name)))
+        except OSError:
+            return
+        for name in names[:max(0, len(names) - keep)]:
+            try:
+                os.remove(os.path.join(metrics_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,195 @@
+"""
+מנוע OCR - שכבת הפשטה מעל Tesseract.
+- TesserocrEngine: מנוע שנטען פעם אחת (tesserocr / libtesseract) ומשמש לכל הדפים והקבצים באותו worker.
+- PytesseractEngine: גיבוי - תהליך tesseract חדש לכל תמונה (pytesseract), כמו בעבר.
+"""
+import os
+import threading
+
+OCR_LANGS = 'heb+eng'
+FALLBACK_LANG = 'eng'
+
+# בחירת מנוע: "auto" (tesserocr אם מותקן, אחרת pytesseract), "tesserocr" או "pytesseract"
+DEFAULT_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+
+
+class OcrEngine:
+    """ממשק בסיס למנוע OCR"""
+    name = "base"
+
+    def image_to_string(self, img, psm=6):
+        """מחזיר את הטקסט שזוהה בתמונה"""
+        raise NotImplementedError
+
+    def image_to_data(self, img, psm=6):
+        """
+        מחזיר את המילים שזוהו עם התיבות שלהן, באותו מבנה כמו
+        pytesseract.image_to_data(..., output_type=Output.DICT)
+        """
+        raise NotImplementedError
+
+    def detect_orientation(self, img):
+        """מחזיר את הזווית (עם כיוון השעון) שבה צריך לסובב את הדף כדי שיהיה ישר"""
+        raise NotImplementedError
+
+    def close(self):
+        """משחרר את משאבי המנוע"""
+
+
+class PytesseractEngine(OcrEngine):
+    """מנוע גיבוי: כל קריאה מריצה תהליך tesseract חדש"""
+    name = "pytesseract"
+
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_string(self, img, psm=6):
+        config = f'--oem 3 --psm {psm}'
+        try:
+            return self._pytesseract.image_to_string(img, lang=OCR_LANGS, config=config)
+        except Exception:
+            return self._pytesseract.image_to_string(img, lang=FALLBACK_LANG, config=config)
+
+    def image_to_data(self, img, psm=6):
+        config = f'--oem 3 --psm {psm}'
+        output_type = self._pytesseract.Output.DICT
+        try:
+            return self._pytesseract.image_to_data(img, lang=OCR_LANGS, config=config, output_type=output_type)
+        except Exception:
+            return self._pytesseract.image_to_data(img, lang=FALLBACK_LANG, config=config, output_type=output_type)
+
+    def detect_orientation(self, img):
+        osd = self._pytesseract.image_to_osd(img, config='--psm 0', output_type=self._pytesseract.Output.DICT)
+        return int(osd.get('rotate', 0)) % 360
+
+
+class TesserocrEngine(OcrEngine):
+    """
+    מנוע בתוך התהליך: ה-traineddata נטען פעם אחת ונשאר בזיכרון.
+    מופע אחד לכל thread (PyTessBaseAPI אינו בטוח לשימוש מכמה threads במקביל).
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANGS):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._tessdata = _find_tessdata_path()
+        try:
+            self._api = self._create_api(lang)
+        except RuntimeError:
+            # אין נתוני שפה לעברית - ממשיכים באנגלית בלבד
+            self._api = self._create_api(FALLBACK_LANG)
+        self._osd_api = None
+
+    def _create_api(self, lang, psm=None):
+        kwargs = {'lang': lang, 'oem': self._tesserocr.OEM.DEFAULT}
+        if psm is not None:
+            kwargs['psm'] = psm
+        if self._tessdata:
+            kwargs['path'] = self._tessdata
+        return self._tesserocr.PyTessBaseAPI(**kwargs)
+
+    def image_to_string(self, img, psm=6):
+        self._api.SetPageSegMode(psm)
+        self._api.SetImage(img)
+        return self._api.GetUTF8Text()
+
+    def image_to_data(self, img, psm=6):
+        tesserocr = self._tesserocr
+        RIL = tesserocr.RIL
+        self._api.SetPageSegMode(psm)
+        self._api.SetImage(img)
+        self._api.Recognize()
+
+        data = {key: [] for key in ('text', 'conf', 'left', 'top', 'width', 'height',
+                                    'block_num', 'par_num', 'line_num', 'word_num')}
+        block_num = par_num = line_num = word_num = 0
+        iterator = self._api.GetIterator()
+        if iterator is None:
+            return data
+        for word in tesserocr.iterate_level(iterator, RIL.WORD):
+            if word.IsAtBeginningOf(RIL.BLOCK):
+                block_num += 1
+                par_num = line_num = 0
+            if word.IsAtBeginningOf(RIL.PARA):
+                par_num += 1
+                line_num = 0
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line_num += 1
+                word_num = 0
+            word_num += 1
+            box = word.BoundingBox(RIL.WORD)
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            data['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+            data['conf'].append(word.Confidence(RIL.WORD))
+            data['left'].append(x1)
+            data['top'].append(y1)
+            data['width'].append(x2 - x1)
+            data['height'].append(y2 - y1)
+            data['block_num'].append(block_num)
+            data['par_num'].append(par_num)
+            data['line_num'].append(line_num)
+            data['word_num'].append(word_num)
+        return data
+
+    def detect_orientation(self, img):
+        if self._osd_api is None:
+            self._osd_api = self._create_api('osd', psm=self._tesserocr.PSM.OSD_ONLY)
+        self._osd_api.SetImage(img)
+        result = self._osd_api.DetectOrientationScript()
+        if not result:
+            return 0
+        # orient_deg הוא כיוון התמונה; הסיבוב הנדרש (עם כיוון השעון) הוא המשלים ל-360
+        return (360 - int(result['orient_deg'])) % 360
+
+    def close(self):
+        for api in (self._api, self._osd_api):
+            if api is not None:
+                api.End()
+        self._api = self._osd_api = None
+
+
+def _find_tessdata_path():
+    """מחפש את תיקיית tessdata (משתנה סביבה, או ליד tesseract.exe ב-Windows)"""
+    if os.environ.get("TESSDATA_PREFIX"):
+        return None  # tesserocr משתמש במשתנה הסביבה בעצמו
+    try:
+        import pytesseract
+        tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+    except ImportError:
+        return None
+    candidate = os.path.join(os.path.dirname(tesseract_cmd), "tessdata")
+    return candidate if os.path.dirname(tesseract_cmd) and os.path.isdir(candidate) else None
+
+
+def create_ocr_engine(backend=DEFAULT_BACKEND):
+    """יוצר מנוע OCR חדש לפי שם המנוע ("auto" - tesserocr אם אפשר, אחרת pytesseract)"""
+    if backend in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine()
+        except Exception as e:
+            if backend == "tesserocr":
+                raise
+            if not isinstance(e, ImportError):
+                print(f"מנוע tesserocr לא זמין ({e}) - ממשיך עם pytesseract")
+    return PytesseractEngine()
+
+
+_local = threading.local()
+
+
+def get_ocr_engine(backend=DEFAULT_BACKEND):
+    """
+    מחזיר את מנוע ה-OCR של ה-thread הנוכחי (נוצר בקריאה הראשונה ונשמר לשימוש חוזר).
+    ב-process pool כל תהליך עבודה מקבל מנוע אחד לכל אורך חייו.
+    """
+    engines = getattr(_local, 'engines', None)
+    if engines is None:
+        engines = _local.engines = {}
+    engine = engines.get(backend)
+    if engine is None:
+        engine = engines[backend] = create_ocr_engine(backend)
+    return engine
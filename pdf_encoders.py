@@ -0,0 +1,135 @@
+"""
+קידוד תמונות סרוקות לקובץ PDF.
+- g4    - שחור-לבן (סף Otsu) בדחיסת CCITT Group 4 - עשרות KB לדף טופס
+- jpeg  - גווני אפור ב-JPEG באיכות נתונה (לדפים עם תמונות / חותמות)
+- flate - גווני אפור ללא אובדן (deflate של PyMuPDF, עם garbage collection)
+- rgb   - צבע מלא ב-JPEG של PIL (כמו בעבר)
+"""
+import io
+import os
+
+import fitz  # PyMuPDF
+from PIL import features
+
+from text_layer import add_text_layer
+
+# מקודד ברירת המחדל (משתנה סביבה PDF_ENCODER) ואיכות ה-JPEG
+DEFAULT_ENCODER = os.environ.get("PDF_ENCODER", "g4")
+JPEG_QUALITY = 60
+ENCODERS = ('g4', 'jpeg', 'flate', 'rgb')
+
+
+def otsu_threshold(gray):
+    """סף בינריזציה לפי Otsu (היסטוגרמה של תמונה בגווני אפור)"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(value * count for value, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for value, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += value * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = value, variance
+    return best_threshold
+
+
+def binarize(image):
+    """ממיר לשחור-לבן (מצב "1") לפי סף Otsu"""
+    gray = image if image.mode == 'L' else image.convert('L')
+    threshold = otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0).convert('1', dither=None)
+
+
+def _save_with_pil(images, output_path, dpi, **params):
+    images[0].save(output_path, "PDF", resolution=dpi, save_all=True, append_images=images[1:], **params)
+
+
+def _save_with_fitz(images, output_path, dpi, text_layers):
+    doc = fitz.open()
+    try:
+        for image, words in zip(images, text_layers):
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG")
+            width, height = image.width * 72 / dpi, image.height * 72 / dpi
+            page = doc.new_page(width=width, height=height)
+            page.insert_image(page.rect, stream=buffer.getvalue())
+            if words:
+                add_text_layer(page, words)
+        doc.save(output_path, garbage=4, deflate=True)
+    finally:
+        doc.close()
+
+
+def _append_text_layers(output_path, text_layers):
+    """מוסיף שכבות טקסט לקובץ שנכתב ע"י PIL (שמירה מצטברת - התמונות לא נכתבות מחדש)"""
+    doc = fitz.open(output_path)
+    try:
+        for page, words in zip(doc, text_layers):
+            if words:
+                add_text_layer(page, words)
+        doc.saveIncr()
+    finally:
+        doc.close()
+
+
+def save_images_as_pdf(images, output_path, encoder=DEFAULT_ENCODER, dpi=300, quality=JPEG_QUALITY,
+                       text_layers=None):
+    """
+    שומר רשימת תמונות (PIL) כקובץ PDF, דף לכל תמונה, ויוצר את התיקייה אם צריך.
+    text_layers - רשימה אופציונלית (לכל דף) של מילי OCR מנורמלות, לשכבת טקסט בלתי נראית.
+    מחזיר את גודל הקובץ שנכתב (בתים).
+    """
+    if encoder not in ENCODERS:
+        raise ValueError(f"מקודד PDF לא מוכר: {encoder}")
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    if encoder == 'g4' and not features.check('libtiff'):
+        # ללא libtiff אין CCITT ב-PIL - גווני אפור ב-JPEG במקום
+        encoder = 'jpeg'
+    if encoder == 'g4':
+        _save_with_pil([binarize(image) for image in images], output_path, dpi)
+    elif encoder == 'jpeg':
+        _save_with_pil([image.convert('L') for image in images], output_path, dpi, quality=quality)
+    elif encoder == 'flate':
+        _save_with_fitz([image.convert('L') for image in images], output_path, dpi,
+                        text_layers or [None] * len(images))
+        text_layers = None
+    else:
+        _save_with_pil([image.convert('RGB') for image in images], output_path, dpi)
+    if text_layers and any(text_layers):
+        _append_text_layers(output_path, text_layers)
+    return os.path.getsize(output_path)
+
+
+def raw_image_bytes(image):
+    """גודל הדף כמפת סיביות RGB לא דחוסה (בסיס להשוואת החיסכון)"""
+    return image.width * image.height * 3
+
+
+def record_encoding(stats, image, written):
+    """מעדכן מילון סטטיסטיקה: דפים, גודל גולמי וגודל הפלט"""
+    stats['encoded_pages'] = stats.get('encoded_pages', 0) + 1
+    stats['raw_bytes'] = stats.get('raw_bytes', 0) + raw_image_bytes(image)
+    stats['output_bytes'] = stats.get('output_bytes', 0) + written
+
+
+def encoding_summary(stats, encoder=DEFAULT_ENCODER):
+    """שורת סיכום ללוג"""
+    pages = stats.get('encoded_pages', 0)
+    if not pages:
+        return f"קידוד PDF ({encoder}): לא נכתבו דפים"
+    output_kb = stats['output_bytes'] / 1024
+    ratio = stats['output_bytes'] / stats['raw_bytes'] if stats.get('raw_bytes') else 0
+    return (f"קידוד PDF ({encoder}): {output_kb / pages:.0f} KB לדף בממוצע, "
+            f"{ratio:.1%} מגודל התמונה הגולמית (RGB)")
@@ -3,8 +3,11 @@
 """
 import os
 import re
-import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing, nullcontext
 from datetime import datetime
+from uuid import uuid4
 import fitz  # PyMuPDF
 import importlib.util, pkgutil
 if not hasattr(pkgutil, "find_loader"):
@@ -12,14 +15,52 @@ if not hasattr(pkgutil, "find_loader"):
  
 import pytesseract
 from PIL import Image
-import io
 import pytesseract
+from roi_templates import (DEFAULT_TEMPLATES_PATH, RoiTemplateStore, layout_fingerprint, find_word_box, crop_rect,
+                           get_template_store)
+from result_cache import DEFAULT_CACHE_PATH, get_result_cache
+from ocr_engine import get_ocr_engine
+from id_candidates import get_candidate_engine, words_from_ocr_data
+from destination_index import DestinationIndex, get_destination_index, next_number_on_disk
+from file_placement import DEFAULT_STRATEGIES, place_file, move_file, record_placement, placement_summary
+from folder_watcher import POLL_INTERVAL, SETTLE_TIME, PendingFiles, create_watcher, list_pdf_files
+from text_layer import add_text_layer
+from batch_journal import journal_dir, file_key, append_record, load_journal, remove_journal
+from metrics import (DEFAULT_METRICS_DIR, WATCH_FILE_ROWS, RunMetrics, merge_records, track_file, span,
+                     count as count_metric)
+from progress import ProgressTracker
+from raster_budget import RASTER_BUDGET_MB, RasterBudget, get_raster_budget, init_raster_budget, gray_raster_bytes
 
 # === הגדרות TESSERACT ===
 DEFAULT_TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 if os.path.exists(DEFAULT_TESSERACT_PATH):
     pytesseract.pytesseract.tesseract_cmd = DEFAULT_TESSERACT_PATH
 
+# סולם רזולוציות ל-OCR: מתחילים ברינדור זול ועולים רק אם לא נמצא מספר תקין
+OCR_DPI_LADDER = (150, 300)
+
+# זיהוי כיוון הדף (OSD) מתבצע על עותק מוקטן - הצלע הארוכה לכל היותר בפיקסלים
+OSD_MAX_SIDE = 1200
+
+# הוספת שכבת טקסט בלתי נראית (מתוצאות ה-OCR) לקבצים שזוהו - הרצה הבאה לא צריכה OCR
+SEARCHABLE_PDF = os.environ.get("SEARCHABLE_PDF", "1") != "0"
+
+# מסלולי העיבוד בתיקיית יעד: מהיר (שכבת הטקסט בלבד) ואיטי (OCR לדפים סרוקים)
+LANE_TEXT = "text"
+LANE_OCR = "ocr"
+# גודל מאגר התהליכים של מסלול ה-OCR (0 - ללא OCR: קבצים סרוקים עוברים ל-unidentified כמו בעבר)
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
+# חתימת ההגדרות למטמון התוצאות: תוצאה של קריאת טקסט בלבד שונה מתוצאה עם OCR.
+# גרסת מנוע המועמדים היא חלק מהחתימה - שינוי בדירוג לא יחזיר תוצאות ישנות מהמטמון.
+CANDIDATE_ENGINE_VERSION = "candidates-v2"
+TEXT_ONLY_CACHE_SIGNATURE = f"text-only:{CANDIDATE_ENGINE_VERSION}"
+
+def ocr_config_signature():
+    """חתימת הגדרות ה-OCR (שפות, psm, סולם DPI) - חלק ממפתח מטמון התוצאות"""
+    ladder = "-".join(str(dpi) for dpi in OCR_DPI_LADDER)
+    return f"ocr:oem3:psm6:heb+eng:dpi{ladder}:osd:{CANDIDATE_ENGINE_VERSION}"
+
 def is_valid_israeli_id(id_str):
     """
     בודק תקינות תעודת זהות ישראלית (אלגוריתם ה-Luhn/ספרת ביקורת)
@@ -76,139 +117,406 @@ def normalize_id_number(id_str):
 def extract_text_from_pdf(pdf_path):
     """מנסה לחלץ טקסט ישירות מקובץ PDF searchable"""
     try:
-        doc = fitz.open(pdf_path)
+        with span('open'):
+            doc = fitz.open(pdf_path)
+        count_metric('pages', len(doc))
         text = ""
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text += page.get_text()
+        with span('extract'):
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                text += page.get_text()
         doc.close()
         return text.strip()
     except Exception as e:
         print(f"שגיאה בקריאת PDF {pdf_path}: {e}")
         return ""
 
+def render_page_gray(page, dpi=300):
+    """
+    מרנדר דף בודד (fitz.Page) ישירות לתמונת PIL בגווני אפור.
+    ה-pixmap הגולמי מועבר ל-PIL כמו שהוא - בלי קידוד ל-PNG ופענוח חזרה.
+    """
+    zoom = dpi / 72
+    mat = fitz.Matrix(zoom, zoom)
+    with span('render'):
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombuffer("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride, 1)
+
+class DocumentSession:
+    """
+    פותח קובץ PDF פעם אחת ומספק גישה לטקסט ולתמונות של כל דף.
+    שימוש: with DocumentSession(path) as session: ...
+    """
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        with span('open'):
+            self.doc = fitz.open(pdf_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.doc)
+
+    def close(self):
+        """סוגר את הקובץ"""
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+    def page_text(self, page_num):
+        """מחזיר את שכבת הטקסט של דף"""
+        with span('extract'):
+            return self.doc[page_num].get_text()
+
+    def page_words(self, page_num):
+        """מחזיר את מילות הדף עם התיבות שלהן: (x0, y0, x1, y1, מילה, ...)"""
+        with span('extract'):
+            return self.doc[page_num].get_text("words")
+
+    def text(self):
+        """מחזיר את הטקסט של כל הדפים (כמו extract_text_from_pdf)"""
+        return "".join(self.page_text(i) for i in range(len(self.doc))).strip()
+
+    def render_gray(self, page_num, dpi=300):
+        """מרנדר דף לתמונת PIL בגווני אפור (מצב L)"""
+        return render_page_gray(self.doc[page_num], dpi)
+
+    def raster_bytes(self, page_num, dpi=300, copies=1):
+        """גודל משוער (בבתים) של render_gray לדף - לתקציב הזיכרון (raster_budget)"""
+        rect = self.doc[page_num].rect
+        return gray_raster_bytes(rect.width, rect.height, dpi, copies)
+
+def iter_page_images(pdf_path, dpi=300):
+    """
+    גנרטור: מרנדר את דפי הקובץ אחד-אחד (גווני אפור) - רק דף אחד בזיכרון בכל רגע,
+    כל עוד הצרכן לא שומר את התמונות.
+    """
+    with DocumentSession(pdf_path) as session:
+        for page_num in range(len(session)):
+            yield session.render_gray(page_num, dpi)
+
 def pdf_to_images(pdf_path):
-    """ממיר קובץ PDF לרשימת תמונות באיכות גבוהה ל-OCR"""
+    """
+    ממיר קובץ PDF לרשימת תמונות (גווני אפור) באיכות גבוהה ל-OCR.
+    כל הדפים נשמרים בזיכרון (כ-9MB לדף A4) - לקבצים גדולים עדיף iter_page_images.
+    """
     try:
-        doc = fitz.open(pdf_path)
-        images = []
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            zoom = 300 / 72  
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            images.append(img)
-        doc.close()
-        return images
+        return list(iter_page_images(pdf_path))
     except Exception as e:
         print(f"שגיאה בהמרת PDF לתמונות {pdf_path}: {e}")
         return []
 
-def save_images_to_pdf(images, output_path):
-    """שומר רשימת תמונות כקובץ PDF (לשמירה מחדש אחרי סיבוב)"""
-    if not images:
+def detect_orientation(img):
+    """
+    מזהה את כיוון הדף באמצעות Tesseract OSD על עותק מוקטן.
+    מחזיר את הזווית (0/90/180/270, עם כיוון השעון) שבה צריך לסובב את הדף כדי שיהיה ישר.
+    אם הזיהוי נכשל (למשל מעט מדי טקסט בדף) מחזיר 0.
+    """
+    with span('rotate'):
+        small = img.convert('L')
+        if max(small.size) > OSD_MAX_SIDE:
+            small = small.copy()
+            small.thumbnail((OSD_MAX_SIDE, OSD_MAX_SIDE))
+        try:
+            return get_ocr_engine().detect_orientation(small)
+        except Exception:
+            return 0
+
+def apply_page_rotations(pdf_path, rotations, text_layers=None):
+    """
+    שומר את תיקון הכיוון בקובץ עצמו (מאפיין Rotate של הדף - ללא רינדור מחדש).
+    rotations - מילון {מספר דף: זווית עם כיוון השעון}.
+    text_layers - מילון אופציונלי {מספר דף: מילים מה-OCR} - נוספות כשכבת טקסט בלתי נראית.
+    """
+    rotations = {page_num: angle for page_num, angle in rotations.items() if angle}
+    text_layers = {page_num: words for page_num, words in (text_layers or {}).items() if words}
+    if not rotations and not text_layers:
         return
     try:
-        converted_images = []
-        for img in images:
-            if img.mode != 'RGB':
-                converted_images.append(img.convert('RGB'))
-            else:
-                converted_images.append(img)
-        
-        converted_images[0].save(
-            output_path, "PDF", resolution=300, save_all=True, append_images=converted_images[1:]
-        )
+        doc = fitz.open(pdf_path)
+        count_metric('rotated_pages', len(rotations))
+        try:
+            for page_num, angle in rotations.items():
+                page = doc[page_num]
+                page.set_rotation((page.rotation + angle) % 360)
+            # המילים מתייחסות לדף הישר - נכתבות אחרי עדכון הסיבוב
+            for page_num, words in text_layers.items():
+                add_text_layer(doc[page_num], words)
+            with span('save'):
+                if doc.can_save_incrementally():
+                    doc.saveIncr()
+                else:
+                    temp_path = pdf_path + ".rotated.tmp"
+                    doc.save(temp_path, garbage=3, deflate=True)
+                    doc.close()
+                    os.replace(temp_path, pdf_path)
+        finally:
+            if not doc.is_closed:
+                doc.close()
     except Exception as e:
-        print(f"שגיאה בשמירת PDF מתוקן: {e}")
+        print(f"שגיאה בשמירת תיקון הכיוון / שכבת הטקסט {pdf_path}: {e}")
+
+def iter_page_matches(pdf_path, regex_pattern, templates=None, dpi_ladder=OCR_DPI_LADDER):
+    """
+    גנרטור: מעבד את הקובץ דף אחרי דף ומחזיר (מספר דף, התאמה, DPI, סיבוב, מילים).
+    דף ללא שכבת טקסט מומר לתמונה ועובר OCR רק כשמגיעים אליו,
+    כך שהצרכן יכול לעצור ברגע שנמצאה התאמה בלי לעבד את שאר הדפים.
+    כיוון הדף מזוהה פעם אחת (OSD על הרינדור הזול) והדף מסובב לפני ה-OCR,
+    וה-OCR עולה בסולם הרזולוציות (dpi_ladder) עד שנמצאת התאמה.
+    ה-DPI, הסיבוב והמילים (ראו ocr_match_with_ladder) הם None אם הדף לא עבר OCR.
+    """
+    with DocumentSession(pdf_path) as session:
+        for page_num in range(len(session)):
+            count_metric('pages')
+            text = session.page_text(page_num).strip()
+            dpi = rotation = words = None
+            if len(text) < 5:
+                # שני עותקים: הרינדור והעותק המסובב (אם הדף מסובב) חיים יחד לרגע
+                match, dpi, rotation, words = ocr_match_with_ladder(
+                    lambda dpi: session.render_gray(page_num, dpi), regex_pattern, templates, text, dpi_ladder,
+                    raster_bytes=lambda dpi: session.raster_bytes(page_num, dpi, copies=2))
+            else:
+                match = find_regex_match(text, regex_pattern,
+                                         words=lambda: session.page_words(page_num))
+            yield page_num, match, dpi, rotation, words
+
+def ocr_match_with_ladder(render, regex_pattern, templates=None, page_text="", dpi_ladder=OCR_DPI_LADDER,
+                          raster_bytes=None):
+    """
+    OCR של דף בסולם הרזולוציות: render(dpi) מחזיר את תמונת הדף ב-DPI הנתון.
+    כיוון הדף מזוהה פעם אחת (OSD על הרינדור הראשון) והדף מסובב לפני ה-OCR.
+    raster_bytes(dpi) - גודל משוער של התמונה: נשמר מתקציב הזיכרון המשותף (raster_budget) מהרינדור
+    ועד סוף ה-OCR, והתמונה משוחררת לפני השלב הבא בסולם. None - תמונה שכבר בזיכרון (למשל מהסורק).
+    מחזיר (התאמה, DPI אחרון שנוסה, סיבוב, מילים) - המילים שזוהו בניסיון האחרון,
+    כ-(x0, y0, x1, y1, טקסט) מנורמלים (0..1) ביחס לדף הישר.
+    """
+    match = dpi = rotation = words = None
+    budget = get_raster_budget()
+    for rung, dpi in enumerate(dpi_ladder):
+        if rung:
+            count_metric('dpi_retries')
+        with budget.reserve(raster_bytes(dpi) if raster_bytes else 0):
+            image = render(dpi)
+            if rotation is None:
+                rotation = detect_orientation(image)
+            if rotation:
+                with span('rotate'):
+                    image = image.rotate(-rotation, expand=True)
+            match, words = ocr_page_match(image, regex_pattern, templates, page_text)
+            del image
+        if match:
+            break
+    return match, dpi, rotation, words
+
+def scale_image_to_dpi(image, source_dpi, dpi):
+    """
+    מחזיר עותק בגווני אפור של תמונה סרוקה (ב-source_dpi) ברזולוציה dpi.
+    הקטנה ביחס שלם נעשית ב-reduce (ממוצע בלוקים - מהיר), ורזולוציה גבוהה מהמקור לא מוגדלת.
+    """
+    gray = image if image.mode == 'L' else image.convert('L')
+    if dpi >= source_dpi:
+        return gray
+    if source_dpi % dpi == 0:
+        return gray.reduce(source_dpi // dpi)
+    size = (max(1, gray.width * dpi // source_dpi), max(1, gray.height * dpi // source_dpi))
+    return gray.resize(size, Image.BILINEAR)
+
+def ocr_image(img, psm=6):
+    """מבצע OCR על תמונה בודדת (במנוע ה-OCR של ה-worker הנוכחי)"""
+    count_metric('ocr_calls')
+    with span('ocr'):
+        return get_ocr_engine().image_to_string(img.convert('L'), psm=psm)
+
+def ocr_image_with_boxes(img, psm=6):
+    """
+    מבצע OCR על תמונה ומחזיר גם את תיבות המילים.
+    מחזיר (טקסט, data) כאשר data הוא במבנה של image_to_data כמילון.
+    """
+    count_metric('ocr_calls')
+    with span('ocr'):
+        data = get_ocr_engine().image_to_data(img.convert('L'), psm=psm)
+
+    # בניית הטקסט מחדש לפי שורות (בלוק/פסקה/שורה)
+    lines = []
+    current_key = None
+    for index, word in enumerate(data['text']):
+        word = str(word).strip()
+        if not word:
+            continue
+        key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+        if key != current_key:
+            lines.append([])
+            current_key = key
+        lines[-1].append(word)
+    return "\n".join(" ".join(line) for line in lines), data
+
+def _normalized_words(data, image_size, crop=None):
+    """
+    מילים מפלט image_to_data, מנורמלות (0..1) ביחס לדף המלא.
+    crop - מלבן החיתוך (left, top, right, bottom) אם ה-OCR רץ על חלק מהדף.
+    """
+    width, height = image_size
+    left, top = crop[:2] if crop else (0, 0)
+    return [((x0 + left) / width, (y0 + top) / height, (x1 + left) / width, (y1 + top) / height, text)
+            for x0, y0, x1, y1, text in words_from_ocr_data(data)]
+
+def ocr_page_match(image, regex_pattern, templates=None, page_text=""):
+    """
+    מבצע OCR לדף ומחפש בו התאמה.
+    אם יש מאגר תבניות ROI: קודם OCR רק על האזור שנלמד לפריסה הזו,
+    ורק אם לא נמצאה התאמה - OCR על הדף המלא (ולימוד המיקום מחדש).
+    מחזיר (התאמה, מילים מנורמלות) - המילים משמשות לשכבת הטקסט של הקובץ.
+    """
+    if templates is not None:
+        fingerprint = layout_fingerprint(image)
+        template = templates.find(fingerprint)
+        if template:
+            crop = crop_rect(image.size, template['box'])
+            crop_text, crop_data = ocr_image_with_boxes(image.crop(crop))
+            match = find_regex_match(crop_text, regex_pattern)
+            if match:
+                templates.record_hit()
+                return match, _normalized_words(crop_data, image.size, crop)
+            templates.record_miss()
+        else:
+            templates.record_unknown()
+
+    ocr_text, data = ocr_image_with_boxes(image)
+    match = find_regex_match((page_text + "\n" + ocr_text).strip(), regex_pattern,
+                             words=words_from_ocr_data(data))
+    if match and templates is not None:
+        box = find_word_box(data, match, image.size)
+        if box:
+            templates.learn(fingerprint, box)
+    return match, _normalized_words(data, image.size)
 
 def perform_ocr_on_images(images):
     """מבצע OCR על רשימת תמונות"""
     full_text = ""
-    custom_config = r'--oem 3 --psm 6'
     
     try:
         for img in images:
-            gray_img = img.convert('L')
-            try:
-                text = pytesseract.image_to_string(gray_img, lang='heb+eng', config=custom_config)
-            except Exception:
-                text = pytesseract.image_to_string(gray_img, lang='eng', config=custom_config)
-            full_text += text + "\n"
+            full_text += ocr_image(img) + "\n"
     except Exception as e:
         print(f"שגיאה ב-OCR: {e}")
     
     return full_text.strip()
 
-def find_regex_match(text, regex_pattern):
+def find_regex_match(text, regex_pattern, words=None):
     """
     מחפש התאמה בטקסט.
-    שינוי קריטי: עובר על כל ההתאמות ובודק תקינות תעודת זהות.
+    כל ההתאמות - של תבנית המשתמש ושל התבניות המובנות (8/9 ספרות, עם/בלי מקפים) -
+    נבדקות לתקינות תעודת זהות ומדורגות לפי הקרבה לתוויות כמו "ת.ז" (id_candidates).
+    words - תיבות מילים אופציונליות (fitz / OCR) לדירוג לפי מיקום בדף.
+    מחזיר את המועמד המוביל (מנורמל ל-9 ספרות) או None.
     """
     try:
-        # משתמשים ב-finditer כדי לעבור על כל התוצאות האפשריות
-        matches = re.finditer(regex_pattern, text, re.MULTILINE)
-        
-        for match in matches:
-            candidate = match.group(0).strip()
-            
-            # בדיקה: האם זה מספר תקין מבחינת ספרת ביקורת?
-            # הערה: אם אתה מחפש משהו שאינו ת"ז (למשל סתם קטלוג), אפשר לבטל את הבדיקה הזו
-            if is_valid_israeli_id(candidate):
-                # נרמול המספר - הוספת 0 מוביל אם המספר הוא 8 ספרות
-                normalized = normalize_id_number(candidate)
-                return normalized
-            else:
-                print(f"דלג על מספר לא תקין (ספרת ביקורת שגויה): {candidate}")
-                
-        return None
+        with span('match'):
+            return get_candidate_engine(regex_pattern).best(text, words)
     except re.error as e:
         print(f"שגיאה בתבנית REGEX: {e}")
         return None
 
-def process_pdf_file(pdf_path, regex_pattern):
-    """הפונקציה הראשית לעיבוד קובץ"""
-    text = extract_text_from_pdf(pdf_path)
-    images = []
-    
-    if not text or len(text.strip()) < 5: 
-        try:
-            images = pdf_to_images(pdf_path)
-            if images:
-                ocr_text = perform_ocr_on_images(images)
-                text += "\n" + ocr_text
-        except Exception as e:
-            print(f"OCR נכשל: {e}")
-    
-    match = None
-    if text:
-        match = find_regex_match(text, regex_pattern)
-    
+def _log_page_match(log, page_num, rotation, dpi, stats):
+    """לוג וסטטיסטיקה לדף שנמצאה בו התאמה"""
+    if rotation:
+        log(f"   זוהה דף מסובב ({rotation}°) - סובב לפני OCR (דף {page_num + 1})")
+    if dpi is not None:
+        log(f"   OCR: נמצאה התאמה ב-{dpi} DPI (דף {page_num + 1})")
+        if stats is not None:
+            rungs = stats.setdefault('dpi_rungs', {})
+            rungs[dpi] = rungs.get(dpi, 0) + 1
+
+def process_page_image(image, regex_pattern, templates=None, log_callback=None, stats=None, source_dpi=300):
+    """
+    מעבד דף סרוק שכבר נמצא בזיכרון (תמונת PIL מהסורק) - OCR ישירות על התמונה,
+    ללא כתיבה ל-PDF ורינדור מחדש. source_dpi - הרזולוציה שבה נסרק הדף.
+    מחזיר (התאמה או None, סיבוב עם כיוון השעון שנדרש כדי שהדף יהיה ישר,
+    מילים מנורמלות ביחס לדף הישר - לשכבת הטקסט).
+    """
+    log = log_callback or print
+    try:
+        match, dpi, rotation, words = ocr_match_with_ladder(
+            lambda dpi: scale_image_to_dpi(image, source_dpi, dpi), regex_pattern, templates)
+    except Exception as e:
+        print(f"OCR נכשל: {e}")
+        return None, 0, None
     if match:
-        return match
+        _log_page_match(log, 0, rotation, dpi, stats)
+    return match, rotation or 0, words
 
-    # ניסיון סיבוב (Rotation)
-    if images:
-        print(f"לא נמצאה התאמה. מנסה לסובב ב-180 מעלות...")
-        try:
-            rotated_images = [img.rotate(180) for img in images]
-            rotated_text = perform_ocr_on_images(rotated_images)
-            rotated_match = find_regex_match(rotated_text, regex_pattern)
-            
-            if rotated_match:
-                print(f"✓ נמצאה התאמה לאחר סיבוב! שומר מחדש...")
-                save_images_to_pdf(rotated_images, pdf_path)
-                return rotated_match
-        except Exception as e:
-            print(f"שגיאה בניסיון סיבוב: {e}")
+def find_pdf_match(pdf_path, regex_pattern, templates=None, log_callback=None, stats=None,
+                   text_layer=SEARCHABLE_PDF, errors=None):
+    """
+    עוברת על הדפים אחד-אחד (חילוץ טקסט / OCR) ועוצרת בדף הראשון שנמצא בו מספר תקין.
+    דף סרוק מסובב לכיוון הנכון לפני ה-OCR. הקובץ עצמו לא משתנה.
+    מחזירה (התאמה או None, {דף: סיבוב}, {דף: מילים לשכבת הטקסט}) - לשימוש ב-apply_page_rotations.
+    errors - רשימה אופציונלית: שגיאת קריאה / OCR נוספת אליה. None במקרה כזה אינו "אין התאמה"
+    ואין לשמור אותו במטמון התוצאות.
+    """
+    log = log_callback or print
+    rotations = {}
+    text_layers = {}
+    match_value = None
 
-    return None
+    try:
+        with closing(iter_page_matches(pdf_path, regex_pattern, templates)) as pages:
+            for page_num, match, dpi, rotation, words in pages:
+                if rotation:
+                    rotations[page_num] = rotation
+                if words and text_layer:
+                    text_layers[page_num] = words
+                if match:
+                    _log_page_match(log, page_num, rotation, dpi, stats)
+                    match_value = match
+                    break
+    except Exception as e:
+        print(f"OCR נכשל: {e}")
+        if errors is not None:
+            errors.append(f"OCR נכשל: {e}")
+    return match_value, rotations, text_layers
+
+def process_pdf_file(pdf_path, regex_pattern, templates=None, log_callback=None, stats=None,
+                     text_layer=SEARCHABLE_PDF, errors=None, page_fixes=None):
+    """
+    הפונקציה הראשית לעיבוד קובץ (ראו find_pdf_match).
+    אם נמצאה התאמה - תיקון הכיוון נשמר גם בקובץ.
+    templates - מאגר תבניות ROI (RoiTemplateStore) אופציונלי להאצת ה-OCR.
+    stats - מילון אופציונלי; stats['dpi_rungs'][dpi] סופר באיזה שלב בסולם ה-DPI נמצאה התאמה.
+    text_layer - אם נמצאה התאמה, טקסט ה-OCR נשמר בקובץ כשכבה בלתי נראית (searchable PDF).
+    errors - רשימה אופציונלית לשגיאות קריאה / OCR (ראו find_pdf_match).
+    page_fixes - מילון אופציונלי: מתמלא בסיבוב ובשכבת הטקסט שנשמרו בקובץ (לשמירה במטמון התוצאות).
+    """
+    match_value, rotations, text_layers = find_pdf_match(pdf_path, regex_pattern, templates, log_callback,
+                                                         stats, text_layer, errors)
+
+    # שמירת תיקון הכיוון ושכבת הטקסט בקובץ (רק אם זוהה מספר - כמו בעבר אחרי סיבוב מוצלח)
+    if match_value and (rotations or text_layers):
+        apply_page_rotations(pdf_path, rotations, text_layers)
+        if page_fixes is not None:
+            page_fixes.update(_page_fixes_details(rotations, text_layers) or {})
+
+    return match_value
 
-def generate_id_folder_path(root_folder, id_number):
-    """יוצרת נתיב בתיקייה ייעודית"""
+def generate_id_folder_path(root_folder, id_number, index=None):
+    """
+    יוצרת נתיב בתיקייה ייעודית.
+    index - אינדקס יעד (DestinationIndex) אופציונלי: המספור מתבצע בזיכרון והשם נשמר
+    כקובץ ריק, ולכן יש להעביר אליו את הקובץ עם os.replace.
+    """
     id_folder_path = os.path.join(root_folder, id_number)
+
+    if index is not None:
+        try:
+            return index.reserve(id_number)
+        except OSError as e:
+            print(f"שגיאה ביצירת תיקייה {id_folder_path}: {e}")
+            return get_safe_filename(root_folder, id_number, ".pdf")
     
     if not os.path.exists(id_folder_path):
         try:
@@ -240,30 +548,14 @@ def get_next_file_number(destination_folder, id_number):
     """
     מחזירה את המספר העוקב הבא בתיקיית ID.
     סופרת את כל הקבצים הקיימים בתיקייה ומחזירה את המספר הבא.
+    (לעיבוד אצווה עדיף DestinationIndex - סריקה אחת לכל תיקייה בריצה)
     """
     id_folder_path = os.path.join(destination_folder, id_number)
     
     if not os.path.exists(id_folder_path):
         return 1
     
-    # סופרת את כל הקבצים בתיקייה שמתחילים ב-{id_number}-
-    max_number = 0
-    try:
-        for filename in os.listdir(id_folder_path):
-            if filename.startswith(f"{id_number}-") and filename.endswith(".pdf"):
-                # מנסה לחלץ את המספר מהשם
-                try:
-                    # פורמט: {id_number}-{number}.pdf
-                    number_part = filename[len(id_number) + 1:-4]  # מוריד את {id_number}- ואת .pdf
-                    number = int(number_part)
-                    if number > max_number:
-                        max_number = number
-                except ValueError:
-                    continue
-    except OSError:
-        pass
-    
-    return max_number + 1
+    return next_number_on_disk(id_folder_path, id_number)
 
 def generate_scan_folder_name():
     """
@@ -275,20 +567,483 @@ def generate_scan_folder_name():
     folder_name = f"scan{date_str}_{time_str}"
     return folder_name
 
-def process_folder_with_destination(source_folder, destination_folder, regex_pattern, log_callback=None):
+def reserve_destination_path(destination_folder, id_number, run_id=None):
+    """
+    שומרת באופן אטומי את שם הקובץ הפנוי הבא בתיקיית ID ({id}-{n}.pdf).
+    המספור מתבצע באינדקס בזיכרון של הריצה (run_id) - התיקייה נסרקת פעם אחת בלבד,
+    והקובץ נוצר ריק עם O_EXCL כך ששני תהליכים מקבילים לא יקבלו אותו שם.
+    """
+    return get_destination_index(destination_folder, run_id).reserve(id_number)
+
+def release_destination_path(destination_folder, dest_path, run_id=None):
+    """משחררת שם שנשמר ב-reserve_destination_path ולא נוצל (הקובץ הריק נמחק)"""
+    get_destination_index(destination_folder, run_id).release(dest_path)
+
+def _copy_to_unidentified(pdf_path, pdf_file, unidentified_folder, outcome, log_callback=None,
+                          placement=DEFAULT_STRATEGIES):
+    """מעתיקה קובץ לתיקיית unidentified ומעדכנת את תוצאת העיבוד"""
+    dest_path = os.path.join(unidentified_folder, pdf_file)
+    try:
+        with span('place'):
+            strategy, transferred = place_file(pdf_path, dest_path, placement)
+        count_metric('bytes_copied', transferred)
+        outcome['placements'].append((strategy, transferred))
+        if log_callback:
+            log_callback(f"   → הועתק ל-unidentified")
+        outcome['status'] = 'unidentified'
+    except Exception as e:
+        if log_callback:
+            log_callback(f"   ✗ שגיאה בהעתקה: {e}")
+        outcome['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
+    return outcome
+
+def pdf_inventory(pdf_path):
     """
-    עיבוד תיקיית מקור והעתקת קבצים לתיקיית יעד.
-    - קוראת רק טקסט מ-searchable PDF (ללא OCR)
+    מלאי זול של הקובץ לפי משאבי הדפים (ללא חילוץ טקסט וללא רינדור).
+    מחזירה (מספר דפים עם גופנים, מספר דפים סרוקים - עם תמונות וללא גופנים).
+    """
+    text_pages = scanned_pages = 0
+    with span('open'), fitz.open(pdf_path) as doc:
+        for page_num in range(len(doc)):
+            if doc.get_page_fonts(page_num):
+                text_pages += 1
+            elif doc.get_page_images(page_num):
+                scanned_pages += 1
+    return text_pages, scanned_pages
+
+def find_destination_match(pdf_path, regex_pattern, log_callback=None):
+    """
+    מחפשת תעודת זהות תקנית בשכבת הטקסט של הקובץ (ללא OCR).
+    מחזירה את המספר המנורמל, או None אם לא נמצאה תעודת זהות תקנית.
+    """
+    # קריאת טקסט מ-searchable PDF (ללא OCR)
+    text = extract_text_from_pdf(pdf_path)
+
+    if not text or len(text.strip()) < 5:
+        if log_callback:
+            log_callback(f"   ⚠ לא נמצא טקסט בקובץ (אולי לא searchable PDF)")
+        return None
+
+    # חיפוש תעודת זהות באמצעות REGEX
+    if log_callback:
+        log_callback(f"   מחפש תעודת זהות...")
+
+    match_value = find_regex_match(text, regex_pattern)
+
+    # נרמול המספר (הוספת 0 מוביל אם הוא 8 ספרות) לפני שימוש
+    if match_value:
+        match_value = normalize_id_number(match_value)
+
+    if not match_value:
+        # לא נמצאה תעודת זהות
+        if log_callback:
+            log_callback(f"   ⚠ לא נמצאה תעודת זהות")
+        return None
+
+    if log_callback:
+        log_callback(f"   נמצא מספר: {match_value}")
+
+    # בדיקה מפורשת נוספת של תקינות תעודת זהות
+    if not is_valid_israeli_id(match_value):
+        # נמצא מספר אבל לא תעודת זהות תקנית
+        if log_callback:
+            log_callback(f"   ⚠ נמצא מספר {match_value} אבל לא תעודת זהות תקנית")
+        return None
+
+    return match_value
+
+def _cached_content_hash(cache, pdf_path):
+    """ה-hash של תוכן הקובץ לפי המטמון (None אם אין מטמון או שהחישוב נכשל)"""
+    if cache is None:
+        return None
+    try:
+        return cache.content_hash(pdf_path)
+    except Exception as e:
+        print(f"שגיאה בקריאה ממטמון התוצאות: {e}")
+        return None
+
+def _cached_lookup(cache, pdf_path, regex_pattern, config_signature, content_hash=None):
+    """
+    בדיקה במטמון התוצאות: (נמצא, התאמה, פרטים - מילון). שגיאה במטמון לעולם לא מכשילה את העיבוד.
+    """
+    if cache is None:
+        return False, None, {}
+    try:
+        cached, match_value, details = cache.lookup(pdf_path, regex_pattern, config_signature, content_hash)
+    except Exception as e:
+        print(f"שגיאה בקריאה ממטמון התוצאות: {e}")
+        return False, None, {}
+    count_metric('cache_hits' if cached else 'cache_misses')
+    return cached, match_value, details
+
+def _cached_store(cache, pdf_path, regex_pattern, config_signature, match_value, details=None,
+                  content_hash=None):
+    """שמירה במטמון התוצאות (שגיאות נבלעות)"""
+    if cache is None:
+        return
+    try:
+        cache.put(pdf_path, regex_pattern, config_signature, match_value, details, content_hash)
+    except Exception as e:
+        print(f"שגיאה בכתיבה למטמון התוצאות: {e}")
+
+def _page_fixes_details(rotations, text_layers):
+    """הסיבוב ושכבת הטקסט שחושבו ב-OCR - לשמירה במטמון יחד עם ההתאמה"""
+    details = {}
+    if rotations:
+        details['rotations'] = rotations
+    if text_layers:
+        details['text_layers'] = text_layers
+    return details or None
+
+def _page_fixes_from_details(details):
+    """({דף: סיבוב}, {דף: מילים}) מפרטי המטמון (מפתחות ה-JSON הם מחרוזות)"""
+    rotations = {int(page_num): angle for page_num, angle in details.get('rotations', {}).items()}
+    text_layers = {int(page_num): words for page_num, words in details.get('text_layers', {}).items()}
+    return rotations, text_layers
+
+def _resume_reserved_path(reserved_path, destination_folder, match_value):
+    """
+    שם היעד מהריצה שנקטעה - אם הוא בתיקיית ה-ID הנוכחית (אותו קובץ, אותה תוצאה).
+    אחרת (או כשאין התאמה) השם הישן - קובץ ריק או עותק חלקי - נמחק, ומוחזר None.
+    """
+    if not reserved_path:
+        return None
+    id_folder = os.path.join(destination_folder, match_value) if match_value else None
+    if id_folder and os.path.dirname(os.path.abspath(reserved_path)) == os.path.abspath(id_folder):
+        return reserved_path
+    try:
+        os.remove(reserved_path)
+    except OSError:
+        pass
+    return None
+
+def _text_lane_match(pdf_path, regex_pattern, cache, outcome, log_callback=None, defer_ocr=False):
+    """
+    המסלול המהיר: חיפוש בשכבת הטקסט בלבד.
+    defer_ocr - קובץ עם דפים סרוקים שלא נמצא בו מספר מסומן ב-outcome['status'] = 'needs_ocr'
+    (קובץ ללא שכבת טקסט כלל - בלי לקרוא את הטקסט בכלל).
+    המטמון נבדק לפני פתיחת הקובץ: מספר הדפים הסרוקים (pdf_inventory) נשמר יחד עם התוצאה,
+    כך שקובץ שכבר עובד לא נפתח ב-PyMuPDF כלל.
+    """
+    cached, match_value, details = _cached_lookup(cache, pdf_path, regex_pattern, TEXT_ONLY_CACHE_SIGNATURE)
+    scanned_pages = details.get('scanned_pages')
+    if cached:
+        outcome['cache_hit'] = True
+        if match_value:
+            if log_callback:
+                log_callback(f"   נמצא מספר (מהמטמון): {match_value}")
+            return match_value
+
+    if defer_ocr and scanned_pages is None:
+        text_pages, scanned_pages = pdf_inventory(pdf_path)
+        if scanned_pages and not text_pages:
+            # אין שכבת טקסט - "אין התאמה" בטקסט נשמר במטמון בלי לקרוא את הקובץ
+            if not cached:
+                _cached_store(cache, pdf_path, regex_pattern, TEXT_ONLY_CACHE_SIGNATURE, None,
+                              {'scanned_pages': scanned_pages})
+            outcome['status'] = 'needs_ocr'
+            count_metric('ocr_fallbacks')
+            return None
+
+    if cached:
+        if log_callback and not (scanned_pages and defer_ocr):
+            log_callback(f"   ⚠ לא נמצאה תעודת זהות (מהמטמון)")
+    else:
+        match_value = find_destination_match(pdf_path, regex_pattern, log_callback)
+        _cached_store(cache, pdf_path, regex_pattern, TEXT_ONLY_CACHE_SIGNATURE, match_value,
+                      {'scanned_pages': scanned_pages} if scanned_pages is not None else None)
+
+    if not match_value and scanned_pages and defer_ocr:
+        outcome['status'] = 'needs_ocr'
+        count_metric('ocr_fallbacks')
+    return match_value
+
+def _ocr_lane_match(pdf_path, regex_pattern, cache, outcome, log_callback=None, templates_path=DEFAULT_TEMPLATES_PATH):
+    """
+    המסלול האיטי: טקסט לכל דף ו-OCR לדפים ללא טקסט (find_pdf_match), עם תבניות ROI.
+    מחזירה (התאמה, {דף: סיבוב}, {דף: מילים}) - הסיבוב ושכבת הטקסט נכתבים לעותק ביעד.
+    הסיבוב ושכבת הטקסט נשמרים במטמון יחד עם ההתאמה - עותק מהמטמון זהה לעותק אחרי OCR.
+    """
+    config_signature = ocr_config_signature()
+    cached, match_value, details = _cached_lookup(cache, pdf_path, regex_pattern, config_signature)
+    if cached:
+        outcome['cache_hit'] = True
+        if log_callback:
+            if match_value:
+                log_callback(f"   נמצא מספר (מהמטמון): {match_value}")
+            else:
+                log_callback(f"   ⚠ לא נמצאה תעודת זהות (מהמטמון)")
+        return (match_value,) + _page_fixes_from_details(details)
+
+    if log_callback:
+        log_callback(f"   מפענח טקסט (OCR)...")
+    templates = get_template_store(templates_path)
+    dpi_stats = {}
+    ocr_errors = []
+    match_value, rotations, text_layers = find_pdf_match(pdf_path, regex_pattern, templates,
+                                                         log_callback or (lambda message: None), dpi_stats,
+                                                         errors=ocr_errors)
+    templates.save()
+    outcome['dpi_rungs'] = dpi_stats.get('dpi_rungs', {})
+    if ocr_errors:
+        # כשל במנוע (tesseract חסר, timeout, דף פגום) - לא נשמר במטמון, הריצה הבאה תנסה שוב
+        outcome['ocr_failed'] = True
+        outcome['errors'].extend(f"{os.path.basename(pdf_path)}: {error}" for error in ocr_errors)
+        if log_callback:
+            for error in ocr_errors:
+                log_callback(f"   ✗ {error}")
+    else:
+        _cached_store(cache, pdf_path, regex_pattern, config_signature, match_value,
+                      _page_fixes_details(rotations, text_layers) if match_value else None)
+    if not match_value and log_callback:
+        log_callback(f"   ⚠ לא נמצאה תעודת זהות (גם ב-OCR)")
+    return match_value, rotations, text_layers
+
+def process_file_to_destination(pdf_file, source_folder, destination_folder, regex_pattern, log_callback=None,
+                                cache_path=DEFAULT_CACHE_PATH, run_id=None, placement=DEFAULT_STRATEGIES,
+                                lane=LANE_TEXT, defer_ocr=False, journal=None, reserved_path=None,
+                                templates_path=DEFAULT_TEMPLATES_PATH):
+    """
+    מעבדת קובץ PDF בודד מתיקיית המקור ומעתיקה אותו לתיקיית היעד.
+    cache_path - מטמון תוצאות (None לביטול): קובץ שתוכנו כבר עובד לא נקרא שוב.
+    run_id - מזהה הריצה, לאינדקס המספור בזיכרון (DestinationIndex).
+    placement - סדר אסטרטגיות ההעתקה (file_placement), למשל reflink לפני העתקה רגילה.
+    lane - LANE_TEXT (שכבת הטקסט בלבד) או LANE_OCR (OCR לדפים סרוקים; הסיבוב ושכבת הטקסט נשמרים בעותק ביעד).
+    defer_ocr - במסלול הטקסט: קובץ שצריך OCR לא מועתק אלא מוחזר עם status='needs_ocr'.
+    journal - תיקיית יומן הריצה (batch_journal): שם היעד נרשם לפני ההעתקה, והתוצאה - אחריה.
+    reserved_path - שם יעד שנשמר לקובץ בריצה שנקטעה; משמש שוב במקום לשמור שם חדש (ללא עותק כפול).
+    templates_path - קובץ תבניות ה-ROI של מסלול ה-OCR (None - תבניות בזיכרון בלבד, ללא שמירה).
+    מחזירה מילון תוצאה: {'status': 'success'/'unidentified'/'failed'/'needs_ocr', 'errors': [...],
+                         'cache_hit': bool, 'lane': lane, 'placements': [(אסטרטגיה, בתים שהועברו)],
+                         'metrics': זמני השלבים והמונים של הקובץ (metrics.FileMetrics.as_dict),
+                         'ocr_failed': True אם מנוע ה-OCR נכשל - התוצאה לא נשמרה במטמון}
+    """
+    pdf_path = os.path.join(source_folder, pdf_file)
+    unidentified_folder = os.path.join(destination_folder, "unidentified")
+    outcome = {'status': 'failed', 'errors': [], 'cache_hit': False, 'lane': lane, 'placements': []}
+    key = None
+
+    if log_callback:
+        log_callback(f"מעבד: {pdf_file}" if lane == LANE_TEXT else f"מעבד (OCR): {pdf_file}")
+
+    with track_file(pdf_file) as recorder:
+        try:
+            if journal:
+                key = file_key(pdf_path)
+            cache = get_result_cache(cache_path)
+            rotations, text_layers = {}, {}
+            if lane == LANE_OCR:
+                match_value, rotations, text_layers = _ocr_lane_match(pdf_path, regex_pattern, cache, outcome,
+                                                                      log_callback, templates_path)
+            else:
+                match_value = _text_lane_match(pdf_path, regex_pattern, cache, outcome, log_callback, defer_ocr)
+                if outcome['status'] == 'needs_ocr':
+                    if log_callback:
+                        log_callback(f"   → דף סרוק - הועבר לתור ה-OCR")
+                    return outcome
+
+            if not match_value:
+                _resume_reserved_path(reserved_path, destination_folder, None)
+                return _copy_to_unidentified(pdf_path, pdf_file, unidentified_folder, outcome, log_callback,
+                                             placement)
+
+            if log_callback:
+                log_callback(f"   ✓ תעודת זהות תקנית: {match_value}")
+
+            # יצירת תיקיית ID ושמירת המספר העוקב הבא (או השם שנשמר בריצה שנקטעה)
+            try:
+                dest_path = _resume_reserved_path(reserved_path, destination_folder, match_value)
+                if dest_path:
+                    if log_callback:
+                        log_callback(f"   ↻ המשך ריצה שנקטעה - נכתב לשם שנשמר: {os.path.basename(dest_path)}")
+                else:
+                    # תיקיית ה-ID נרשמת לפני יצירת הקובץ הריק - קריסה באמצע לא משאירה קובץ שהיומן לא מכיר
+                    append_record(journal, {'type': 'reserving', 'file': pdf_file, 'key': key, 'id': match_value})
+                    dest_path = reserve_destination_path(destination_folder, match_value, run_id)
+                    append_record(journal, {'type': 'reserved', 'file': pdf_file, 'key': key, 'dest': dest_path})
+            except OSError as e:
+                if log_callback:
+                    log_callback(f"   ✗ שגיאה ביצירת תיקייה: {e}")
+                outcome['errors'].append(f"שגיאה ביצירת תיקייה {match_value}: {e}")
+                return outcome
+
+            new_filename = os.path.basename(dest_path)
+
+            # העתקת הקובץ (reflink / העתקה בקרנל / העתקה רגילה - לפי מה שהכונן מאפשר)
+            try:
+                with span('place'):
+                    strategy, transferred = place_file(pdf_path, dest_path, placement)
+                count_metric('bytes_copied', transferred)
+                outcome['placements'].append((strategy, transferred))
+                if log_callback:
+                    log_callback(f"   ✓ הועתק ל: {match_value}/{new_filename}")
+                outcome['status'] = 'success'
+                outcome['dest'] = dest_path
+            except Exception as e:
+                if log_callback:
+                    log_callback(f"   ✗ שגיאה בהעתקה: {e}")
+                outcome['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
+                # שחרור השם השמור כדי שלא יישאר קובץ ריק
+                release_destination_path(destination_folder, dest_path, run_id)
+                return outcome
+
+            # תיקון הכיוון ושכבת הטקסט נכתבים לעותק בלבד (קישור קשיח היה משנה גם את קובץ המקור)
+            if (rotations or text_layers) and strategy != 'hardlink':
+                apply_page_rotations(dest_path, rotations, text_layers)
+
+        except Exception as e:
+            if log_callback:
+                log_callback(f"   ✗ שגיאה בעיבוד: {e}")
+            outcome['errors'].append(f"שגיאה בעיבוד {pdf_file}: {e}")
+        finally:
+            if journal and outcome['status'] in ('success', 'unidentified'):
+                append_record(journal, {'type': 'done', 'file': pdf_file, 'key': key,
+                                        'status': outcome['status'], 'dest': outcome.get('dest')})
+            outcome['metrics'] = recorder.as_dict()
+
+    return outcome
+
+def _process_file_to_destination_collected(pdf_file, source_folder, destination_folder, regex_pattern,
+                                           file_options):
+    """
+    עוטפת את process_file_to_destination לריצה בתהליך נפרד.
+    הודעות הלוג נאספות לרשימה ומוחזרות יחד עם התוצאה, כדי שיודפסו ברצף אחד.
+    file_options - שאר הפרמטרים של process_file_to_destination (מילון).
+    """
+    messages = []
+    outcome = process_file_to_destination(pdf_file, source_folder, destination_folder,
+                                          regex_pattern, messages.append, **file_options)
+    return outcome, messages
+
+def _apply_file_outcome(stats, outcome):
+    """מעדכנת את מילון הסטטיסטיקה לפי תוצאת עיבוד של קובץ בודד"""
+    if outcome['status'] == 'success':
+        stats['success_count'] += 1
+    elif outcome['status'] == 'unidentified':
+        stats['unidentified_count'] += 1
+    else:
+        stats['failed_count'] += 1
+    if outcome.get('cache_hit'):
+        stats['cache_hits'] = stats.get('cache_hits', 0) + 1
+    if outcome.get('lane') == LANE_OCR:
+        stats['ocr_files'] = stats.get('ocr_files', 0) + 1
+    for dpi, count in outcome.get('dpi_rungs', {}).items():
+        rungs = stats.setdefault('dpi_rungs', {})
+        rungs[dpi] = rungs.get(dpi, 0) + count
+    for strategy, transferred in outcome.get('placements', []):
+        record_placement(stats, strategy, transferred)
+    stats['errors'].extend(outcome['errors'])
+
+def _record_file_metrics(run_metrics, outcome, deferred=None):
+    """
+    מוסיפה את מדדי הקובץ לצבירת הריצה ומעדכנת את קובץ הגריפה (לכל היותר פעם בכמה שניות).
+    נקראת רק עם התוצאה הסופית: deferred - מדדי מסלול הטקסט של קובץ שהועבר לתור ה-OCR,
+    מסוכמים עם מדדי מסלול ה-OCR כך שהקובץ נספר פעם אחת.
+    """
+    run_metrics.add_file(merge_records(deferred, outcome.get('metrics')), outcome['status'])
+    run_metrics.export_live()
+
+def _outcome_pages(outcome):
+    """מספר הדפים שנקראו / עברו OCR בעיבוד הקובץ (ממדדי הקובץ)"""
+    return outcome.get('metrics', {}).get('counters', {}).get('pages', 0)
+
+def _finish_run_metrics(run_metrics, stats, log_callback=None):
+    """בסיום ריצה: זמן כולל לכל שלב בסטטיסטיקה, ודוח JSON / CSV בתיקיית המדדים"""
+    stats['stage_seconds'] = run_metrics.stage_totals()
+    report_path = run_metrics.write_report()
+    if report_path:
+        stats['metrics_report'] = report_path
+    if log_callback:
+        log_callback(run_metrics.summary())
+        if report_path:
+            log_callback(f"דוח מדדים: {report_path}")
+
+def _sweep_stale_reservations(destination_folder, previous, reserved_paths):
+    """
+    מוחקת שמות יעד ריקים ({id}-{n}.pdf בגודל 0) שנשארו מהריצה שנקטעה בתיקיות ה-ID שלה
+    (קריסה בין יצירת הקובץ הריק לרשומת ה-reserved). שמות שישמשו שוב (reserved_paths) נשארים.
+    מחזירה את מספר הקבצים שנמחקו.
+    """
+    keep = {os.path.abspath(path) for path in reserved_paths.values()}
+    removed = 0
+    for id_number in previous.id_numbers:
+        prefix = f"{id_number}-"
+        try:
+            with os.scandir(os.path.join(destination_folder, id_number)) as entries:
+                stale = [entry.path for entry in entries
+                         if entry.name.startswith(prefix) and entry.name.endswith(".pdf")
+                         and entry.is_file() and entry.stat().st_size == 0
+                         and os.path.abspath(entry.path) not in keep]
+        except OSError:
+            continue
+        for path in stale:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def _skip_journaled_files(pdf_files, source_folder, previous, stats):
+    """
+    מסננת קבצים שכבר טופלו בריצה שנקטעה (לפי יומן הריצה) ומוסיפה את תוצאתם לסטטיסטיקה.
+    מחזירה (קבצים לעיבוד, {קובץ: שם יעד שנשמר בריצה הקודמת}).
+    """
+    remaining = []
+    reserved_paths = {}
+    stats['resumed_count'] = 0
+    for pdf_file in pdf_files:
+        try:
+            key = file_key(os.path.join(source_folder, pdf_file))
+        except OSError:
+            remaining.append(pdf_file)
+            continue
+        record = previous.done_record(pdf_file, key)
+        if record:
+            _apply_file_outcome(stats, {'status': record['status'], 'errors': []})
+            stats['resumed_count'] += 1
+            continue
+        remaining.append(pdf_file)
+        reserved_path = previous.reserved_path(pdf_file, key)
+        if reserved_path:
+            reserved_paths[pdf_file] = reserved_path
+    return remaining, reserved_paths
+
+def process_folder_with_destination(source_folder, destination_folder, regex_pattern, log_callback=None,
+                                    workers=1, cache_path=DEFAULT_CACHE_PATH, placement=DEFAULT_STRATEGIES,
+                                    ocr_workers=OCR_WORKERS, resume=True, metrics_dir=DEFAULT_METRICS_DIR,
+                                    progress_callback=None, raster_budget_mb=RASTER_BUDGET_MB,
+                                    templates_path=DEFAULT_TEMPLATES_PATH):
+    """
+    עיבוד תיקיית מקור והעתקת קבצים לתיקיית יעד, בשני מסלולים:
+    - מסלול מהיר (workers תהליכים): סיווג זול לפי מלאי הגופנים והתמונות וקריאת שכבת הטקסט
+    - מסלול OCR (ocr_workers תהליכים, מאגר נפרד): קבצים סרוקים, או עם דפים סרוקים שלא נמצא בהם מספר
+      בשכבת הטקסט. כך קבצי טקסט מהירים לא ממתינים מאחורי סריקות ארוכות.
+      ocr_workers=0 - ללא OCR (קבצים סרוקים מועתקים ל-unidentified)
     - מחפשת תעודת זהות באמצעות REGEX
     - בודקת תקינות תעודת זהות ישראלית
     - מעתיקה קבצים לתיקיית יעד לפי תעודת זהות (או unidentified)
     - לא מוחקת/מזיזה קבצים מהמקור
+    - workers > 1 או ocr_workers > 1: עיבוד הקבצים במקביל במאגרי תהליכים (process pool);
+      אחרת - קודם כל קבצי הטקסט ואחריהם קבצי ה-OCR
+    - cache_path: מטמון תוצאות לפי תוכן הקובץ (None לביטול)
+    - placement: סדר אסטרטגיות ההעתקה (ראו file_placement); הסטטיסטיקה כוללת את הבתים שהועברו בפועל
+    - resume: יומן ריצה בתיקיית היעד (batch_journal). אחרי קריסה, הרצה חוזרת מדלגת על קבצים שכבר טופלו
+      וכותבת קבצים שהיו באמצע ההעתקה לאותו שם - ללא עותקים כפולים. היומן נמחק בסיום הריצה.
+    - metrics_dir: זמני השלבים לכל קובץ, מונים והיסטוגרמות (metrics) - דוח JSON / CSV בסיום,
+      וקובץ טקסט לגריפה (metrics.prom) שמתעדכן במהלך הריצה. None - ללא כתיבת קבצים.
+    - progress_callback: נקרא עם אירועי התקדמות (progress.ProgressTracker) - סך הקבצים, כמה הסתיימו,
+      כמה בעיבוד, קבצים ודפים לשנייה וזמן משוער לסיום. נקרא מה-thread של הפונקציה.
+    - raster_budget_mb: תקרה משותפת לכל התהליכים לתמונות הדפים שבעיבוד ל-OCR (raster_budget) -
+      צריכת הזיכרון לא גדלה עם גודל הקבצים או מספר התהליכים. 0 - ללא הגבלה.
+    - templates_path: קובץ תבניות ה-ROI (roi_templates) - None לתבניות בזיכרון בלבד (למשל בבנצ'מרק).
     """
     if log_callback:
         log_callback(f"מתחיל עיבוד תיקיית מקור: {source_folder}")
         log_callback(f"תיקיית יעד: {destination_folder}")
     
     stats = {'success_count': 0, 'failed_count': 0, 'unidentified_count': 0, 'errors': []}
+    run_metrics = RunMetrics("batch", metrics_dir)
     
     # יצירת תיקיית unidentified אם לא קיימת
     unidentified_folder = os.path.join(destination_folder, "unidentified")
@@ -314,118 +1069,109 @@ def process_folder_with_destination(source_folder, destination_folder, regex_pat
     
     if log_callback:
         log_callback(f"נמצאו {len(pdf_files)} קבצי PDF לעיבוד\n")
+
+    # יומן הריצה: אם הריצה הקודמת נקטעה - ממשיכים ממנה (ואותה תיקיית scan)
+    journal = journal_dir(destination_folder, source_folder) if resume and pdf_files else None
+    previous = load_journal(journal) if journal else None
+    reserved_paths = {}
+    if previous:
+        scan_folder_name = previous.run['scan_folder']
+        pdf_files, reserved_paths = _skip_journaled_files(pdf_files, source_folder, previous, stats)
+        swept = _sweep_stale_reservations(destination_folder, previous, reserved_paths)
+        if log_callback:
+            if swept:
+                log_callback(f"נמחקו {swept} שמות יעד ריקים שנשארו מהריצה שנקטעה")
+            log_callback(f"↻ ממשיך ריצה שנקטעה: {stats['resumed_count']} קבצים כבר טופלו, "
+                         f"{len(pdf_files)} נותרו לעיבוד\n")
+    else:
+        scan_folder_name = generate_scan_folder_name()
+        append_record(journal, {'type': 'run', 'scan_folder': scan_folder_name,
+                                'started': datetime.now().isoformat(timespec='seconds')})
+
+    # קבצים שטופלו בריצה שנקטעה נספרים כבר כמסתיימים
+    progress = ProgressTracker("batch", progress_callback, total=len(original_pdf_files),
+                               done=stats.get('resumed_count', 0))
+    progress.emit(force=True)
+
+    def with_reserved(pdf_file, options):
+        reserved_path = reserved_paths.get(pdf_file)
+        return dict(options, reserved_path=reserved_path) if reserved_path else options
     
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(source_folder, pdf_file)
-        
+    # מזהה ריצה - כל ריצה בונה אינדקס מספור חדש לתיקיית היעד (בכל תהליך עבודה)
+    ocr_workers = max(0, min(int(ocr_workers or 0), len(pdf_files)))
+    file_options = {'cache_path': cache_path, 'run_id': uuid4().hex, 'placement': placement,
+                    'templates_path': templates_path,
+                    'defer_ocr': ocr_workers > 0, 'journal': journal}
+    ocr_options = dict(file_options, lane=LANE_OCR)
+    workers = max(1, min(int(workers or 1), len(pdf_files) or 1))
+    # תקציב הזיכרון לתמונות - משותף לתהליך הנוכחי (עיבוד רציף) ולתהליכי העבודה
+    raster_budget = RasterBudget(raster_budget_mb)
+    init_raster_budget(raster_budget)
+    # מדדי מסלול הטקסט של קבצים שהועברו לתור ה-OCR - נרשמים יחד עם התוצאה הסופית
+    deferred_metrics = {}
+    if workers == 1 and ocr_workers <= 1:
+        ocr_files = []
+        for pdf_file in pdf_files:
+            progress.update(in_flight=1)
+            outcome = process_file_to_destination(pdf_file, source_folder, destination_folder,
+                                                  regex_pattern, log_callback, **with_reserved(pdf_file, file_options))
+            if outcome['status'] == 'needs_ocr':
+                ocr_files.append(pdf_file)
+                deferred_metrics[pdf_file] = outcome.get('metrics')
+            else:
+                _record_file_metrics(run_metrics, outcome)
+                _apply_file_outcome(stats, outcome)
+                progress.finished(_outcome_pages(outcome), in_flight=0)
+        for pdf_file in ocr_files:
+            progress.update(in_flight=1)
+            outcome = process_file_to_destination(pdf_file, source_folder, destination_folder,
+                                                  regex_pattern, log_callback, **with_reserved(pdf_file, ocr_options))
+            _record_file_metrics(run_metrics, outcome, deferred_metrics.pop(pdf_file, None))
+            _apply_file_outcome(stats, outcome)
+            progress.finished(_outcome_pages(outcome), in_flight=0)
+    else:
         if log_callback:
-            log_callback(f"מעבד: {pdf_file}")
-        
-        try:
-            # קריאת טקסט מ-searchable PDF (ללא OCR)
-            text = extract_text_from_pdf(pdf_path)
-            
-            if not text or len(text.strip()) < 5:
-                if log_callback:
-                    log_callback(f"   ⚠ לא נמצא טקסט בקובץ (אולי לא searchable PDF)")
-                # מעתיק ל-unidentified
-                dest_path = os.path.join(unidentified_folder, pdf_file)
-                try:
-                    shutil.copy2(pdf_path, dest_path)
-                    if log_callback:
-                        log_callback(f"   → הועתק ל-unidentified")
-                    stats['unidentified_count'] += 1
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"   ✗ שגיאה בהעתקה: {e}")
-                    stats['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
-                    stats['failed_count'] += 1
-                continue
-            
-            # חיפוש תעודת זהות באמצעות REGEX
-            if log_callback:
-                log_callback(f"   מחפש תעודת זהות...")
-            
-            match_value = find_regex_match(text, regex_pattern)
-            
-            # נרמול המספר (הוספת 0 מוביל אם הוא 8 ספרות) לפני שימוש
-            if match_value:
-                match_value = normalize_id_number(match_value)
-            
-            # בדיקה מפורשת נוספת של תקינות תעודת זהות
-            if match_value:
-                if log_callback:
-                    log_callback(f"   נמצא מספר: {match_value}")
-                
-                if is_valid_israeli_id(match_value):
-                    if log_callback:
-                        log_callback(f"   ✓ תעודת זהות תקנית: {match_value}")
-                    
-                    # יצירת תיקיית ID אם לא קיימת
-                    id_folder_path = os.path.join(destination_folder, match_value)
+            log_callback(f"עיבוד מקבילי עם {workers} תהליכים (+{ocr_workers} תהליכי OCR)\n")
+        pool_options = {'initializer': init_raster_budget, 'initargs': (raster_budget,)}
+        ocr_pool = ProcessPoolExecutor(max_workers=ocr_workers, **pool_options) if ocr_workers else nullcontext()
+        with ProcessPoolExecutor(max_workers=workers, **pool_options) as executor, ocr_pool:
+            futures = {
+                executor.submit(_process_file_to_destination_collected, pdf_file, source_folder,
+                                destination_folder, regex_pattern, with_reserved(pdf_file, file_options)): pdf_file
+                for pdf_file in pdf_files
+            }
+            # כל הקבצים נשלחים מראש - "בעיבוד" הם לכל היותר כמספר התהליכים
+            pool_size = workers + ocr_workers
+            progress.update(in_flight=min(len(futures), pool_size))
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_file = futures.pop(future)
                     try:
-                        os.makedirs(id_folder_path, exist_ok=True)
-                    except OSError as e:
-                        if log_callback:
-                            log_callback(f"   ✗ שגיאה ביצירת תיקייה: {e}")
-                        stats['errors'].append(f"שגיאה ביצירת תיקייה {match_value}: {e}")
-                        stats['failed_count'] += 1
-                        continue
-                    
-                    # קבלת המספר העוקב הבא
-                    next_number = get_next_file_number(destination_folder, match_value)
-                    new_filename = f"{match_value}-{next_number}.pdf"
-                    dest_path = os.path.join(id_folder_path, new_filename)
-                    
-                    # העתקת הקובץ
-                    try:
-                        shutil.copy2(pdf_path, dest_path)
-                        if log_callback:
-                            log_callback(f"   ✓ הועתק ל: {match_value}/{new_filename}")
-                        stats['success_count'] += 1
+                        outcome, messages = future.result()
                     except Exception as e:
-                        if log_callback:
-                            log_callback(f"   ✗ שגיאה בהעתקה: {e}")
-                        stats['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
-                        stats['failed_count'] += 1
-                else:
-                    # נמצא מספר אבל לא תעודת זהות תקנית
+                        # קריסה של תהליך עבודה (למשל BrokenProcessPool)
+                        messages = [f"מעבד: {pdf_file}", f"   ✗ שגיאה בעיבוד: {e}"]
+                        outcome = {'status': 'failed', 'errors': [f"שגיאה בעיבוד {pdf_file}: {e}"]}
                     if log_callback:
-                        log_callback(f"   ⚠ נמצא מספר {match_value} אבל לא תעודת זהות תקנית")
-                    # מעתיק ל-unidentified
-                    dest_path = os.path.join(unidentified_folder, pdf_file)
-                    try:
-                        shutil.copy2(pdf_path, dest_path)
-                        if log_callback:
-                            log_callback(f"   → הועתק ל-unidentified")
-                        stats['unidentified_count'] += 1
-                    except Exception as e:
-                        if log_callback:
-                            log_callback(f"   ✗ שגיאה בהעתקה: {e}")
-                        stats['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
-                        stats['failed_count'] += 1
-            else:
-                # לא נמצאה תעודת זהות
-                if log_callback:
-                    log_callback(f"   ⚠ לא נמצאה תעודת זהות")
-                # מעתיק ל-unidentified
-                dest_path = os.path.join(unidentified_folder, pdf_file)
-                try:
-                    shutil.copy2(pdf_path, dest_path)
-                    if log_callback:
-                        log_callback(f"   → הועתק ל-unidentified")
-                    stats['unidentified_count'] += 1
-                except Exception as e:
-                    if log_callback:
-                        log_callback(f"   ✗ שגיאה בהעתקה: {e}")
-                    stats['errors'].append(f"שגיאה בהעתקת {pdf_file}: {e}")
-                    stats['failed_count'] += 1
-                    
-        except Exception as e:
-            if log_callback:
-                log_callback(f"   ✗ שגיאה בעיבוד: {e}")
-            stats['errors'].append(f"שגיאה בעיבוד {pdf_file}: {e}")
-            stats['failed_count'] += 1
+                        for message in messages:
+                            log_callback(message)
+                    if outcome['status'] == 'needs_ocr':
+                        # מעבר למסלול ה-OCR - המסלול המהיר ממשיך לקבצים הבאים
+                        deferred_metrics[pdf_file] = outcome.get('metrics')
+                        try:
+                            futures[ocr_pool.submit(_process_file_to_destination_collected, pdf_file, source_folder,
+                                                    destination_folder, regex_pattern,
+                                                    with_reserved(pdf_file, ocr_options))] = pdf_file
+                            continue
+                        except Exception as e:
+                            # מאגר ה-OCR קרס (BrokenProcessPool) - הקובץ נרשם כנכשל והריצה ממשיכה
+                            if log_callback:
+                                log_callback(f"   ✗ שגיאה בשליחה למסלול ה-OCR: {e}")
+                            outcome = {'status': 'failed', 'errors': [f"שגיאה בעיבוד {pdf_file}: {e}"]}
+                    _record_file_metrics(run_metrics, outcome, deferred_metrics.pop(pdf_file, None))
+                    _apply_file_outcome(stats, outcome)
+                    progress.finished(_outcome_pages(outcome), in_flight=min(len(futures), pool_size))
     
     # סיכום
     if log_callback:
@@ -433,12 +1179,23 @@ def process_folder_with_destination(source_folder, destination_folder, regex_pat
         log_callback(f"הושלמו בהצלחה: {stats['success_count']}")
         log_callback(f"לא זוהו (unidentified): {stats['unidentified_count']}")
         log_callback(f"שגיאות: {stats['failed_count']}")
+        if stats.get('cache_hits'):
+            log_callback(f"נלקחו מהמטמון (ללא עיבוד מחדש): {stats['cache_hits']}")
+        if stats.get('resumed_count'):
+            log_callback(f"טופלו כבר בריצה שנקטעה (לפי יומן הריצה): {stats['resumed_count']}")
+        if stats.get('ocr_files'):
+            log_callback(f"עובדו במסלול ה-OCR: {stats['ocr_files']}")
+        if stats.get('dpi_rungs'):
+            rungs = ", ".join(f"{dpi} DPI: {count}" for dpi, count in sorted(stats['dpi_rungs'].items()))
+            log_callback(f"התאמות לפי רזולוציית OCR: {rungs}")
+        if stats.get('placement'):
+            log_callback(placement_summary(stats))
         if stats['errors']:
             log_callback(f"פרטי שגיאות: {len(stats['errors'])}")
+    _finish_run_metrics(run_metrics, stats, log_callback)
     
     # העברת קבצים לתיקיית scan
     if original_pdf_files:
-        scan_folder_name = generate_scan_folder_name()
         scan_folder_path = os.path.join(source_folder, scan_folder_name)
         try:
             os.makedirs(scan_folder_path, exist_ok=True)
@@ -450,7 +1207,7 @@ def process_folder_with_destination(source_folder, destination_folder, regex_pat
                 if os.path.exists(source_path):  # בדיקה שהקובץ עדיין קיים
                     dest_path = os.path.join(scan_folder_path, pdf_file)
                     try:
-                        shutil.move(source_path, dest_path)
+                        record_placement(stats, *move_file(source_path, dest_path, placement))
                         if log_callback:
                             log_callback(f"   → {pdf_file} הועבר ל-{scan_folder_name}/")
                     except Exception as e:
@@ -461,15 +1218,121 @@ def process_folder_with_destination(source_folder, destination_folder, regex_pat
             if log_callback:
                 log_callback(f"✗ שגיאה ביצירת תיקיית scan: {e}")
             stats['errors'].append(f"שגיאה ביצירת תיקיית scan: {e}")
+
+    # הריצה הושלמה - היומן כבר לא נחוץ
+    if journal:
+        remove_journal(journal)
+    progress.close()
     
     return stats
 
-def process_folder(folder_path, regex_pattern, log_callback=None):
-    """עיבוד תיקייה"""
+def watch_folder_with_destination(source_folder, destination_folder, regex_pattern, log_callback=None,
+                                  stop_event=None, cache_path=DEFAULT_CACHE_PATH, placement=DEFAULT_STRATEGIES,
+                                  poll_interval=POLL_INTERVAL, settle_time=SETTLE_TIME, use_inotify=None,
+                                  ocr=OCR_WORKERS > 0, metrics_dir=DEFAULT_METRICS_DIR,
+                                  raster_budget_mb=RASTER_BUDGET_MB, templates_path=DEFAULT_TEMPLATES_PATH):
+    """
+    מצב מעקב: מעבדת כל קובץ PDF שמגיע לתיקיית המקור מיד כשהכתיבה אליו הסתיימה
+    (כמו process_folder_with_destination, קובץ אחר קובץ), עד ש-stop_event מופעל.
+    ocr - קובץ סרוק עובר OCR מיד (באותו thread) במקום להיות מועתק ל-unidentified.
+    קבצים שכבר נמצאים בתיקייה בהתחלה מעובדים ראשונים.
+    הקבצים שעובדו מועברים לתיקיית scan אחת לכל הפעלה של המעקב.
+    metrics_dir - כמו ב-process_folder_with_destination; קובץ הגריפה מתעדכן גם כשאין קבצים חדשים.
+    raster_budget_mb - תקרת הזיכרון לתמונות הדפים שבעיבוד ל-OCR (raster_budget).
+    templates_path - קובץ תבניות ה-ROI (None - בזיכרון בלבד).
+    """
+    stats = {'success_count': 0, 'failed_count': 0, 'unidentified_count': 0, 'errors': [],
+             'latency_total': 0.0, 'latency_max': 0.0}
+    # ריצה ללא סוף - שורות הקבצים לדוח חסומות (המונים וההיסטוגרמות כוללים את כל הקבצים)
+    run_metrics = RunMetrics("watch", metrics_dir, max_file_rows=WATCH_FILE_ROWS)
+    unidentified_folder = os.path.join(destination_folder, "unidentified")
+    try:
+        os.makedirs(unidentified_folder, exist_ok=True)
+    except OSError as e:
+        if log_callback:
+            log_callback(f"שגיאה ביצירת תיקיית unidentified: {e}")
+        stats['errors'].append(f"שגיאה ביצירת תיקיית unidentified: {e}")
+
+    watcher = create_watcher(source_folder, poll_interval, use_inotify)
+    pending = PendingFiles(source_folder, settle_time)
+    pending.add(list_pdf_files(source_folder))
+    if log_callback:
+        log_callback(f"מעקב אחרי תיקיית מקור: {source_folder} ({watcher.name})")
+        log_callback(f"תיקיית יעד: {destination_folder}")
+        if len(pending):
+            log_callback(f"נמצאו {len(pending)} קבצי PDF קיימים לעיבוד\n")
+
+    file_options = {'cache_path': cache_path, 'run_id': uuid4().hex, 'placement': placement, 'defer_ocr': ocr,
+                    'templates_path': templates_path}
+    init_raster_budget(RasterBudget(raster_budget_mb))
+    scan_folder_name = generate_scan_folder_name()
+    scan_folder_path = os.path.join(source_folder, scan_folder_name)
+    try:
+        while not (stop_event and stop_event.is_set()):
+            # כשיש קבצים שממתינים לסיום הכתיבה - בודקים אותם בתדירות גבוהה
+            timeout = min(poll_interval, settle_time / 2) if len(pending) else poll_interval
+            names, closed = watcher.changes(timeout)
+            pending.add(names, closed)
+
+            for pdf_file, arrived in pending.pop_ready():
+                outcome = process_file_to_destination(pdf_file, source_folder, destination_folder,
+                                                      regex_pattern, log_callback, **file_options)
+                deferred = None
+                if outcome['status'] == 'needs_ocr':
+                    deferred = outcome.get('metrics')
+                    outcome = process_file_to_destination(pdf_file, source_folder, destination_folder,
+                                                          regex_pattern, log_callback, lane=LANE_OCR, **file_options)
+                _apply_file_outcome(stats, outcome)
+                source_path = os.path.join(source_folder, pdf_file)
+                try:
+                    os.makedirs(scan_folder_path, exist_ok=True)
+                    record_placement(stats, *move_file(source_path, os.path.join(scan_folder_path, pdf_file),
+                                                       placement))
+                except Exception as e:
+                    if log_callback:
+                        log_callback(f"   ✗ שגיאה בהעברת {pdf_file}: {e}")
+                    stats['errors'].append(f"שגיאה בהעברת {pdf_file}: {e}")
+                pending.mark_handled(pdf_file)
+
+                latency = time.monotonic() - arrived
+                stats['latency_total'] += latency
+                stats['latency_max'] = max(stats['latency_max'], latency)
+                _record_file_metrics(run_metrics, outcome, deferred)
+                if log_callback:
+                    log_callback(f"   ⏱ {latency:.1f} שניות מההגעה ועד הסידור")
+            run_metrics.export_live()
+    finally:
+        watcher.close()
+
+    if log_callback:
+        processed = stats['success_count'] + stats['unidentified_count'] + stats['failed_count']
+        log_callback(f"\n=== המעקב הופסק ===")
+        log_callback(f"הושלמו בהצלחה: {stats['success_count']}")
+        log_callback(f"לא זוהו (unidentified): {stats['unidentified_count']}")
+        log_callback(f"שגיאות: {stats['failed_count']}")
+        if processed:
+            log_callback(f"זמן ממוצע מהגעה ועד סידור: {stats['latency_total'] / processed:.1f} שניות "
+                         f"(מקסימום {stats['latency_max']:.1f})")
+        if stats.get('placement'):
+            log_callback(placement_summary(stats))
+    _finish_run_metrics(run_metrics, stats, log_callback)
+    return stats
+
+def process_folder(folder_path, regex_pattern, log_callback=None, templates=None, cache_path=DEFAULT_CACHE_PATH):
+    """
+    עיבוד תיקייה.
+    templates - מאגר תבניות ROI; אם לא הועבר נטען המאגר הקבוע מהדיסק.
+    cache_path - מטמון תוצאות לפי תוכן הקובץ (None לביטול).
+    """
     if log_callback:
         log_callback(f"מתחיל עיבוד תיקייה: {folder_path}")
     
     stats = {'success_count': 0, 'failed_count': 0, 'errors': []}
+    if templates is None:
+        templates = RoiTemplateStore()
+    cache = get_result_cache(cache_path)
+    config_signature = ocr_config_signature()
+    index = DestinationIndex(folder_path)
     
     pdf_files = [f for f in os.listdir(folder_path) 
                  if f.lower().endswith('.pdf') and os.path.isfile(os.path.join(folder_path, f))]
@@ -477,12 +1340,40 @@ def process_folder(folder_path, regex_pattern, log_callback=None):
     for pdf_file in pdf_files:
         pdf_path = os.path.join(folder_path, pdf_file)
         try:
-            match_value = process_pdf_file(pdf_path, regex_pattern)
+            # הקובץ מתוקן במקומו (סיבוב ושכבת טקסט) - המפתח נבנה מהתוכן המקורי, לפני כל שינוי
+            content_hash = _cached_content_hash(cache, pdf_path)
+            cached, match_value, details = _cached_lookup(cache, pdf_path, regex_pattern, config_signature,
+                                                          content_hash)
+            page_fixes = {}
+            if cached:
+                stats['cache_hits'] = stats.get('cache_hits', 0) + 1
+                # תיקון הכיוון ושכבת הטקסט מהמטמון - כמו אחרי OCR
+                if match_value and details:
+                    apply_page_rotations(pdf_path, *_page_fixes_from_details(details))
+                    page_fixes = details
+            else:
+                ocr_errors = []
+                match_value = process_pdf_file(pdf_path, regex_pattern, templates, log_callback, stats,
+                                               errors=ocr_errors, page_fixes=page_fixes)
+                if ocr_errors:
+                    # כשל ב-OCR אינו "אין התאמה" - לא נשמר במטמון
+                    stats['errors'].extend(f"{pdf_file}: {error}" for error in ocr_errors)
+                elif content_hash is not None:
+                    _cached_store(cache, pdf_path, regex_pattern, config_signature, match_value, page_fixes,
+                                  content_hash)
+            if page_fixes and content_hash is not None:
+                # גם הקובץ המתוקן נשמר - ללא התיקונים, כדי שלא יוחלו עליו שוב אם יחזור לתיקייה
+                _cached_store(cache, pdf_path, regex_pattern, config_signature, match_value)
             
             if match_value:
-                new_full_path = generate_id_folder_path(folder_path, match_value)
+                new_full_path = generate_id_folder_path(folder_path, match_value, index)
                 if new_full_path != pdf_path:
-                    os.rename(pdf_path, new_full_path)
+                    try:
+                        os.replace(pdf_path, new_full_path)
+                    except OSError:
+                        # שחרור השם השמור - שלא יישאר PDF ריק בתיקיית ה-ID
+                        index.release(new_full_path)
+                        raise
                     new_filename = os.path.basename(new_full_path)
                     parent_folder = os.path.basename(os.path.dirname(new_full_path))
                     if log_callback: 
@@ -495,5 +1386,15 @@ def process_folder(folder_path, regex_pattern, log_callback=None):
         except Exception as e:
             stats['errors'].append(str(e))
             stats['failed_count'] += 1
+    
+    templates.save()
+    stats['roi_hit_rate'] = templates.hit_rate()
+    if log_callback:
+        log_callback(templates.summary())
+        if stats.get('cache_hits'):
+            log_callback(f"נלקחו מהמטמון (ללא OCR מחדש): {stats['cache_hits']}")
+        if stats.get('dpi_rungs'):
+            rungs = ", ".join(f"{dpi} DPI: {count}" for dpi, count in sorted(stats['dpi_rungs'].items()))
+            log_callback(f"התאמות לפי רזולוציית OCR: {rungs}")
             
     return stats
\ No newline at end of file
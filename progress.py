@@ -0,0 +1,145 @@
+"""
+אירועי התקדמות מובנים לריצה ארוכה (עיבוד תיקייה / סריקה) - ללא תלות ב-Qt.
+
+ProgressTracker סופר קבצים שהסתיימו ובעיבוד, מחשב קצב (קבצים ודפים לשנייה, על חלון הזמן האחרון)
+וזמן משוער לסיום, וקורא ל-callback עם מילון אירוע - לכל היותר פעם ב-min_interval שניות,
+ותמיד באירוע האחרון (final). האירוע הוא מילון JSON רגיל:
+    {'event': 'progress', 'kind', 'time', 'total', 'done', 'in_flight', 'pages', 'elapsed',
+     'files_per_sec', 'pages_per_sec', 'eta_seconds', 'final'}
+total ו-eta_seconds הם None כשהמספר הכולל לא ידוע מראש (סריקה מהמזין).
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# מרווח מינימלי בין אירועים (שניות)
+PROGRESS_INTERVAL = 0.5
+# חלון הזמן לחישוב הקצב (שניות) - הקצב וה-ETA מגיבים לשינויים בסוג הקבצים לאורך הריצה
+RATE_WINDOW = 60.0
+
+
+class ProgressTracker:
+    """מונה ההתקדמות של ריצה אחת (בטוח לקריאה מכמה threads)"""
+
+    def __init__(self, kind, callback, total=None, done=0, min_interval=PROGRESS_INTERVAL):
+        self.kind = kind
+        self.callback = callback
+        self.total = total
+        self.done = done
+        self.in_flight = 0
+        self.pages = 0
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_emit = None
+        self._samples = deque([(self._started, done, 0)])
+
+    def started(self, count=1):
+        """count קבצים נכנסו לעיבוד"""
+        with self._lock:
+            self.in_flight += count
+        self.emit()
+
+    def update(self, in_flight):
+        """מעדכן את מספר הקבצים שבעיבוד (למשל אחרי שליחת קבצים למאגר התהליכים)"""
+        with self._lock:
+            self.in_flight = in_flight
+        self.emit()
+
+    def finished(self, pages=0, in_flight=None):
+        """
+        קובץ אחד הסתיים (pages - מספר הדפים שעובדו בו).
+        in_flight - מספר הקבצים שעדיין בעיבוד, אם ידוע (אחרת - פחות אחד).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.done += 1
+            self.pages += pages
+            self.in_flight = max(0, self.in_flight - 1) if in_flight is None else in_flight
+            self._samples.append((now, self.done, self.pages))
+            while len(self._samples) > 2 and now - self._samples[1][0] >= RATE_WINDOW:
+                self._samples.popleft()
+        self.emit()
+
+    def snapshot(self, final=False):
+        """מילון האירוע הנוכחי"""
+        now = time.monotonic()
+        with self._lock:
+            first_time, first_done, first_pages = self._samples[0]
+            span = now - first_time
+            files_per_sec = (self.done - first_done) / span if span > 0 else 0.0
+            pages_per_sec = (self.pages - first_pages) / span if span > 0 else 0.0
+            eta = None
+            if self.total is not None:
+                remaining = max(0, self.total - self.done)
+                if not remaining:
+                    eta = 0.0
+                elif files_per_sec > 0:
+                    eta = remaining / files_per_sec
+            return {
+                'event': 'progress',
+                'kind': self.kind,
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'total': self.total,
+                'done': self.done,
+                'in_flight': 0 if final else self.in_flight,
+                'pages': self.pages,
+                'elapsed': round(now - self._started, 3),
+                'files_per_sec': round(files_per_sec, 3),
+                'pages_per_sec': round(pages_per_sec, 3),
+                'eta_seconds': None if eta is None else round(eta, 1),
+                'final': final,
+            }
+
+    def emit(self, force=False):
+        """שולח אירוע ל-callback (לכל היותר פעם ב-min_interval, אלא אם force)"""
+        if not self.callback:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_emit is not None and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+        event = self.snapshot()
+        try:
+            self.callback(event)
+        except Exception as e:
+            print(f"שגיאה בדיווח ההתקדמות: {e}")
+
+    def close(self):
+        """האירוע האחרון של הריצה (final=True) - נשלח תמיד"""
+        if not self.callback:
+            return
+        try:
+            self.callback(self.snapshot(final=True))
+        except Exception as e:
+            print(f"שגיאה בדיווח ההתקדמות: {e}")
+
+
+def format_eta(seconds):
+    """שניות -> "H:MM:SS" (או "?" אם לא ידוע)"""
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def describe(event):
+    """שורת התקדמות לתצוגה: כמה הסתיימו, קצב וזמן משוער לסיום"""
+    done = f"{event['done']}/{event['total']}" if event['total'] is not None else f"{event['done']}"
+    text = f"{done} קבצים · {event['files_per_sec']:.1f} קבצים/שנ' · {event['pages_per_sec']:.1f} דפים/שנ'"
+    if event['in_flight']:
+        text += f" · בעיבוד: {event['in_flight']}"
+    if event['total'] is not None and not event['final']:
+        text += f" · זמן משוער לסיום: {format_eta(event['eta_seconds'])}"
+    return text
+
+
+def json_lines(stream):
+    """callback שכותב כל אירוע כשורת JSON לזרם (ושוטף מיד - מתאים ל-tail -f)"""
+    def write(event):
+        stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        stream.flush()
+    return write
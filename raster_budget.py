@@ -0,0 +1,86 @@
+"""
+תקציב זיכרון לתמונות דפים (רסטרים) שבעיבוד - משותף לכל תהליכי העבודה.
+
+לפני רינדור דף ל-OCR נשמר מהתקציב הגודל המשוער של התמונה (reserve), והוא משוחרר אחרי ה-OCR.
+כשהתקציב מנוצל, תהליך שצריך לרנדר ממתין עד שתהליך אחר משחרר - כך שסך התמונות בזיכרון
+בכל התהליכים יחד חסום, בלי קשר לגודל הקבצים ולמספר התהליכים.
+
+התקציב הוא multiprocessing.BoundedSemaphore ביחידות של MB. שמירה של כמה יחידות נעשית תחת נעילה,
+כדי ששני תהליכים לא יחזיקו כל אחד חלק מהיחידות שהם צריכים וימתינו זה לזה.
+"""
+import multiprocessing
+import os
+from contextlib import contextmanager
+
+from metrics import span, count as count_metric
+
+# תקציב ברירת המחדל ב-MB (משתנה סביבה RASTER_BUDGET_MB; 0 - ללא הגבלה)
+RASTER_BUDGET_MB = int(os.environ.get("RASTER_BUDGET_MB", 1024))
+MB = 1024 * 1024
+
+
+class RasterBudget:
+    """
+    תקציב של budget_mb MB לתמונות שבעיבוד.
+    מועבר לתהליכי העבודה דרך ה-initializer של מאגר התהליכים (init_raster_budget).
+    """
+
+    def __init__(self, budget_mb=RASTER_BUDGET_MB):
+        self.units = max(0, int(budget_mb or 0))
+        self._semaphore = multiprocessing.BoundedSemaphore(self.units) if self.units else None
+        self._lock = multiprocessing.Lock() if self.units else None
+
+    def _units_for(self, nbytes):
+        # תמונה גדולה מכל התקציב מקבלת את כל התקציב (ולא ממתינה לנצח)
+        return min(self.units, max(1, -(-int(nbytes) // MB)))
+
+    def _try_acquire(self, units):
+        with self._lock:
+            for taken in range(units):
+                if not self._semaphore.acquire(block=False):
+                    for _ in range(taken):
+                        self._semaphore.release()
+                    return False
+        return True
+
+    def _acquire(self, units):
+        with self._lock:
+            for _ in range(units):
+                self._semaphore.acquire()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """שומר nbytes מהתקציב לאורך הבלוק (ממתין אם התקציב מנוצל)"""
+        units = self._units_for(nbytes) if self._semaphore is not None and nbytes > 0 else 0
+        if units and not self._try_acquire(units):
+            count_metric('raster_waits')
+            with span('raster_wait'):
+                self._acquire(units)
+        try:
+            yield
+        finally:
+            for _ in range(units):
+                self._semaphore.release()
+
+
+_budget = None
+
+
+def init_raster_budget(budget):
+    """קובע את התקציב של התהליך הנוכחי (initializer של מאגר התהליכים)"""
+    global _budget
+    _budget = budget
+
+
+def get_raster_budget():
+    """התקציב של התהליך הנוכחי (ברירת מחדל - RASTER_BUDGET_MB לתהליך הזה בלבד)"""
+    global _budget
+    if _budget is None:
+        _budget = RasterBudget()
+    return _budget
+
+
+def gray_raster_bytes(width_pt, height_pt, dpi, copies=1):
+    """גודל משוער של רינדור בגווני אפור (בייט לפיקסל) של דף בגודל הנתון בנקודות"""
+    zoom = dpi / 72
+    return int(width_pt * zoom) * int(height_pt * zoom) * copies
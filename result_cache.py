@@ -0,0 +1,174 @@
+"""
+מטמון תוצאות קבוע (SQLite) לעיבוד קבצי PDF.
+המפתח: hash של תוכן הקובץ + תבנית ה-REGEX + חתימת הגדרות העיבוד (OCR / טקסט בלבד),
+כך שקובץ שכבר עובד (גם אם הועתק מחדש לתיקייה) לא עובר שוב חילוץ טקסט ו-OCR.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".ocr_scanning", "results.sqlite3")
+# מספר התוצאות המקסימלי במטמון - מעבר לזה נמחקות הרשומות שלא נעשה בהן שימוש הכי הרבה זמן
+DEFAULT_MAX_ENTRIES = 200000
+# בדיקת גודל המטמון מתבצעת פעם בכמה כתיבות (ולא בכל כתיבה)
+EVICTION_CHECK_INTERVAL = 100
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(path):
+    """מחשב SHA-256 של תוכן הקובץ"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    מטמון תוצאות על גבי SQLite.
+    - files: נתיב -> (גודל, mtime, hash) - בדיקה זולה שחוסכת hash לקובץ שלא השתנה
+    - results: מפתח -> ערך ההתאמה (או NULL כשלא נמצאה התאמה), ופרטים נוספים על הקובץ
+      (מילון JSON דחוס - למשל מספר הדפים הסרוקים, או הסיבוב ושכבת הטקסט שחושבו ב-OCR)
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT, last_used REAL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, match_value TEXT, last_used REAL)")
+            # מטמון שנוצר לפני עמודת הפרטים - מוסיפים אותה (הרשומות הקיימות ללא פרטים)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            if 'details' not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN details BLOB")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files(last_used)")
+
+    def close(self):
+        """סוגר את החיבור למסד הנתונים"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def content_hash(self, path):
+        """
+        מחזיר את ה-hash של תוכן הקובץ.
+        אם הגודל וזמן השינוי זהים לרשומה הקיימת - ה-hash נלקח מהמטמון בלי לקרוא את הקובץ.
+        """
+        stat = os.stat(path)
+        key_path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (key_path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        content_hash = file_content_hash(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key_path, stat.st_size, stat.st_mtime_ns, content_hash, time.time()))
+        return content_hash
+
+    @staticmethod
+    def make_key(content_hash, regex_pattern, config_signature):
+        """בונה מפתח מטמון מה-hash של הקובץ, תבנית ה-REGEX וחתימת ההגדרות"""
+        raw = f"{content_hash}\0{regex_pattern}\0{config_signature}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, path, regex_pattern, config_signature, content_hash=None):
+        """
+        מחפש תוצאה שמורה לקובץ.
+        מחזיר (True, ערך, פרטים) אם נמצאה רשומה (הערך יכול להיות None - "אין התאמה"; הפרטים - מילון,
+        ריק אם לא נשמרו), אחרת (False, None, {}).
+        content_hash - hash שכבר חושב לקובץ (ברירת מחדל - מחושב כעת).
+        """
+        if content_hash is None:
+            content_hash = self.content_hash(path)
+        key = self.make_key(content_hash, regex_pattern, config_signature)
+        with self._lock:
+            row = self._conn.execute("SELECT match_value, details FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None, {}
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        details = json.loads(zlib.decompress(row[1]).decode('utf-8')) if row[1] else {}
+        return True, row[0], details
+
+    def get(self, path, regex_pattern, config_signature):
+        """כמו lookup, ללא הפרטים: (True, ערך) או (False, None)"""
+        cached, match_value, _ = self.lookup(path, regex_pattern, config_signature)
+        return cached, match_value
+
+    def put(self, path, regex_pattern, config_signature, match_value, details=None, content_hash=None):
+        """
+        שומר תוצאה לקובץ (match_value=None פירושו שלא נמצאה התאמה).
+        details - מילון אופציונלי (JSON) שמוחזר יחד עם התוצאה ב-lookup.
+        content_hash - hash של התוכן שעליו חושבה התוצאה, כשהקובץ השתנה מאז (ברירת מחדל - התוכן הנוכחי).
+        """
+        if content_hash is None:
+            content_hash = self.content_hash(path)
+        key = self.make_key(content_hash, regex_pattern, config_signature)
+        blob = zlib.compress(json.dumps(details, ensure_ascii=False).encode('utf-8')) if details else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, match_value, details, last_used) VALUES (?, ?, ?, ?)",
+                    (key, match_value, blob, time.time()))
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        """מוחק את הרשומות הישנות ביותר כשהמטמון חורג מהגודל המקסימלי (נקרא תחת הנעילה)"""
+        with self._conn:
+            for table in ('results', 'files'):
+                count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                excess = count - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE rowid IN "
+                        f"(SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)", (excess,))
+
+    def summary(self):
+        """שורת סיכום ללוג"""
+        return f"מטמון תוצאות: {self.hits} פגיעות, {self.misses} החטאות"
+
+
+_open_caches = {}
+
+
+def get_result_cache(path=DEFAULT_CACHE_PATH):
+    """מחזיר מופע מטמון משותף לנתיב (אחד לכל תהליך), או None אם המטמון לא זמין"""
+    if not path:
+        return None
+    if path not in _open_caches:
+        try:
+            _open_caches[path] = ResultCache(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"שגיאה בפתיחת מטמון התוצאות {path}: {e}")
+            _open_caches[path] = None
+    return _open_caches[path]
@@ -0,0 +1,175 @@
+"""
+מודול תבניות אזור-עניין (ROI) ל-OCR.
+לכל פריסת טופס (טביעת אצבע של הדף) נשמר המיקום שבו נמצאה תעודת הזהות,
+כך שבמסמכים הבאים מאותה פריסה אפשר להריץ OCR רק על החיתוך הזה.
+"""
+import json
+import os
+import threading
+from PIL import Image
+
+# קובץ התבניות נשמר בתיקיית המשתמש (ולא בתיקיית התוכנה, שעלולה להיות לקריאה בלבד)
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.expanduser("~"), ".ocr_scanning", "roi_templates.json")
+
+# טביעת אצבע: average-hash של הדף מוקטן ל-16x16 (256 ביטים)
+FINGERPRINT_SIZE = 16
+# מספר הביטים השונים המקסימלי כדי לזהות שני דפים כאותה פריסה
+MAX_FINGERPRINT_DISTANCE = 24
+
+# ריפוד סביב התיבה שנלמדה (יחסית לגודל התיבה ולגודל הדף)
+BOX_PADDING_RATIO = 0.5
+PAGE_PADDING_RATIO = 0.01
+
+
+def layout_fingerprint(img):
+    """
+    מחשב טביעת אצבע של פריסת הדף: יחס גובה-רוחב + average-hash.
+    לא תלוי ב-DPI של הרינדור.
+    """
+    width, height = img.size
+    small = img.convert('L').resize((FINGERPRINT_SIZE, FINGERPRINT_SIZE), Image.BILINEAR)
+    pixels = list(small.getdata())
+    average = sum(pixels) / len(pixels)
+    bits = 0
+    for value in pixels:
+        bits = (bits << 1) | (1 if value > average else 0)
+    return f"{width / height:.2f}:{bits:064x}"
+
+
+def fingerprint_distance(first, second):
+    """מחזיר את מרחק Hamming בין שתי טביעות, או None אם יחס הדף שונה"""
+    first_ratio, first_hash = first.split(':')
+    second_ratio, second_hash = second.split(':')
+    if first_ratio != second_ratio:
+        return None
+    return bin(int(first_hash, 16) ^ int(second_hash, 16)).count('1')
+
+
+def find_word_box(data, match_value, image_size):
+    """
+    מאתר בפלט image_to_data את המילה שמכילה את המספר שנמצא.
+    מחזיר תיבה מנורמלת (x0, y0, x1, y1) ביחס לגודל התמונה, או None.
+    """
+    width, height = image_size
+    target = match_value.lstrip('0')
+    for index, word in enumerate(data.get('text', [])):
+        digits = ''.join(ch for ch in str(word) if ch.isdigit())
+        if not digits or digits.lstrip('0') != target:
+            continue
+        left = data['left'][index]
+        top = data['top'][index]
+        return (left / width, top / height,
+                (left + data['width'][index]) / width, (top + data['height'][index]) / height)
+    return None
+
+
+def crop_rect(image_size, box):
+    """מחזיר את מלבן החיתוך בפיקסלים (left, top, right, bottom) של התיבה המנורמלת, כולל ריפוד"""
+    width, height = image_size
+    x0, y0, x1, y1 = box
+    pad_x = (x1 - x0) * BOX_PADDING_RATIO + PAGE_PADDING_RATIO
+    pad_y = (y1 - y0) * BOX_PADDING_RATIO + PAGE_PADDING_RATIO
+    return (
+        int(max(0.0, x0 - pad_x) * width),
+        int(max(0.0, y0 - pad_y) * height),
+        int(min(1.0, x1 + pad_x) * width),
+        int(min(1.0, y1 + pad_y) * height),
+    )
+
+
+class RoiTemplateStore:
+    """
+    מאגר תבניות ROI שנשמר בקובץ JSON.
+    סופר פגיעות (OCR על החיתוך הצליח), החטאות (תבנית נמצאה אבל החיתוך לא הספיק)
+    ודפים ללא תבנית מתאימה.
+    """
+
+    def __init__(self, path=DEFAULT_TEMPLATES_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+        self._lock = threading.Lock()
+        self.templates = self._read_file()
+
+    def _read_file(self):
+        """קורא את קובץ התבניות מהדיסק (מילון ריק אם לא קיים / פגום)"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"שגיאה בקריאת קובץ תבניות ROI {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        שומר את התבניות לדיסק (כתיבה אטומית).
+        תבניות שנוספו לקובץ בינתיים (למשל מתהליך אחר) נשמרות גם הן.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            merged = self._read_file()
+            merged.update(self.templates)
+            self.templates = merged
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"שגיאה בשמירת קובץ תבניות ROI {self.path}: {e}")
+
+    def find(self, fingerprint):
+        """מחזיר את התבנית הקרובה ביותר לטביעת האצבע (או None)"""
+        best, best_distance = None, None
+        with self._lock:
+            for known, template in self.templates.items():
+                distance = fingerprint_distance(fingerprint, known)
+                if distance is None or distance > MAX_FINGERPRINT_DISTANCE:
+                    continue
+                if best_distance is None or distance < best_distance:
+                    best, best_distance = template, distance
+        return best
+
+    def learn(self, fingerprint, box):
+        """שומר (או מעדכן) את מיקום תעודת הזהות עבור פריסה"""
+        with self._lock:
+            self.templates[fingerprint] = {'box': list(box)}
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_unknown(self):
+        with self._lock:
+            self.unknown += 1
+
+    def hit_rate(self):
+        """שיעור הדפים שזוהו מתוך החיתוך בלבד"""
+        total = self.hits + self.misses + self.unknown
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        """שורת סיכום ללוג"""
+        total = self.hits + self.misses + self.unknown
+        return (f"תבניות ROI: {self.hits}/{total} ניסיונות OCR זוהו מהחיתוך ({self.hit_rate():.0%}), "
+                f"{self.misses} החטאות, {self.unknown} ללא תבנית, {len(self.templates)} פריסות שמורות")
+
+
+_open_stores = {}
+
+
+def get_template_store(path=DEFAULT_TEMPLATES_PATH):
+    """מחזיר מאגר תבניות משותף לנתיב (אחד לכל תהליך) - לתהליכי העבודה של מסלול ה-OCR"""
+    if path not in _open_stores:
+        _open_stores[path] = RoiTemplateStore(path)
+    return _open_stores[path]
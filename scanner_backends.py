@@ -0,0 +1,210 @@
+"""
+שכבת הפשטה מעל הסורק: רשימת התקנים, הגדרת מזין (ADF) ומשיכת דפים.
+- WiaScanner: סורק אמיתי דרך WIA (Windows, pywin32 - נטען רק בשימוש)
+- SimulatorScanner: "סורק" שמנגן תיקיית תמונות בקצב נתון (דפים לשנייה) -
+  לבדיקה ולמדידת קצב הסריקה מקצה לקצה גם ב-Linux.
+"""
+import io
+import os
+import time
+from PIL import Image
+
+# בחירת סורק: "wia" (ברירת מחדל) או "simulator" (עם SCANNER_SIMULATOR_DIR / SCANNER_SIMULATOR_PPS)
+DEFAULT_BACKEND = os.environ.get("SCANNER_BACKEND", "wia")
+
+# קבועים של WIA
+WIA_MPC_HANDLE_DOCUMENT_HANDLING_SELECT = 3088
+WIA_MPC_HANDLE_DOCUMENT_HANDLING_STATUS = 3087
+WIA_FEEDER = 1
+WIA_FLATBED = 2
+WIA_DUPLEX = 4
+WIA_FORMAT_BMP = "{B96B3CAB-0728-11D3-9D7B-0000F81EF32E}"
+# קוד השגיאה של WIA ל"נגמר הנייר"
+WIA_ERROR_PAPER_EMPTY = "0x80210003"
+
+SIMULATOR_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+
+class ScannerError(Exception):
+    """שגיאה בחיבור לסורק"""
+
+
+class ScannerBackend:
+    """ממשק בסיס לסורק"""
+    name = "base"
+
+    def list_devices(self):
+        """מחזיר רשימה של שמות הסורקים הזמינים"""
+        raise NotImplementedError
+
+    def connect(self, device_index=0):
+        """מתחבר לסורק (ScannerError אם אין סורק)"""
+        raise NotImplementedError
+
+    def configure_adf(self):
+        """מנסה להגדיר מצב מזין דפים (ADF); מחזיר True אם הצליח"""
+        return False
+
+    def configure(self, dpi=300, color=True):
+        """הגדרות סריקה (רזולוציה וצבע)"""
+
+    def pages(self):
+        """
+        מושך דפים עד שהמזין מתרוקן ומחזיר (generator) אובייקט דף לכל דף.
+        שגיאה לפני הדף הראשון נזרקת למתקשר.
+        """
+        raise NotImplementedError
+
+    def page_to_image(self, page):
+        """ממיר דף שנמשך לתמונת PIL בזיכרון (נקרא באותו thread שמשך את הדף)"""
+        raise NotImplementedError
+
+    def close(self):
+        """משחרר את החיבור לסורק"""
+
+
+class WiaScanner(ScannerBackend):
+    """סורק WIA (Windows)"""
+    name = "wia"
+
+    def __init__(self):
+        import pythoncom
+        import win32com.client
+        self._pythoncom = pythoncom
+        self._client = win32com.client
+        self._device = None
+        self._item = None
+
+    def _device_manager(self):
+        self._pythoncom.CoInitialize()
+        return self._client.Dispatch("WIA.DeviceManager")
+
+    def list_devices(self):
+        device_manager = self._device_manager()
+        return [device_manager.DeviceInfos(i).Properties("Name").Value
+                for i in range(1, device_manager.DeviceInfos.Count + 1)]
+
+    def connect(self, device_index=0):
+        device_manager = self._device_manager()
+        if device_manager.DeviceInfos.Count <= device_index:
+            raise ScannerError("לא נמצא סורק מחובר")
+        self._device = device_manager.DeviceInfos(device_index + 1).Connect()
+        self._item = None
+
+    def configure_adf(self):
+        # מנסה למצוא את המאפיין שאחראי על מקור הנייר ולהגדיר ל-FEEDER
+        try:
+            for prop in self._device.Properties:
+                if prop.PropertyID == WIA_MPC_HANDLE_DOCUMENT_HANDLING_SELECT:
+                    try:
+                        prop.Value = WIA_FEEDER
+                        return True
+                    except Exception:
+                        return False  # אם נכשל, אולי הסורק הוא Flatbed בלבד
+        except Exception:
+            pass
+        return False
+
+    @property
+    def item(self):
+        if self._item is None:
+            self._item = self._device.Items(1)
+        return self._item
+
+    def configure(self, dpi=300, color=True):
+        for prop in self.item.Properties:
+            if prop.Name == "Horizontal Resolution": prop.Value = dpi
+            if prop.Name == "Vertical Resolution": prop.Value = dpi
+            if prop.Name == "Current Intent": prop.Value = 1 if color else 2  # Color / Grayscale
+
+    def pages(self):
+        pages_scanned = 0
+        while True:
+            try:
+                # ניסיון למשוך דף. אם המגש ריק, WIA יזרוק שגיאה
+                image_obj = self.item.Transfer(WIA_FORMAT_BMP)
+            except Exception as e:
+                error_str = str(e)
+                if WIA_ERROR_PAPER_EMPTY in error_str or "paper is empty" in error_str.lower():
+                    return
+                if pages_scanned > 0:
+                    # אם סרקנו כבר דפים ועפנו, כנראה פשוט נגמרו הדפים
+                    return
+                raise
+            pages_scanned += 1
+            yield image_obj
+
+    def page_to_image(self, page):
+        # הבתים של ה-BMP ישירות מ-WIA (ללא קובץ זמני)
+        data = bytes(page.FileData.BinaryData)
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def close(self):
+        self._device = self._item = None
+
+
+class SimulatorScanner(ScannerBackend):
+    """
+    סורק מדומה: כל תמונה בתיקייה (לפי סדר השמות) היא דף במזין.
+    pages_per_sec - קצב הזנת הדפים (None - מהר ככל האפשר); repeat - כמה פעמים לנגן את התיקייה.
+    """
+    name = "simulator"
+
+    def __init__(self, image_folder, pages_per_sec=None, repeat=1):
+        self.image_folder = image_folder
+        self.pages_per_sec = pages_per_sec
+        self.repeat = repeat
+        self._connected = False
+
+    def _image_paths(self):
+        try:
+            names = sorted(f for f in os.listdir(self.image_folder)
+                           if f.lower().endswith(SIMULATOR_IMAGE_EXTENSIONS))
+        except OSError:
+            return []
+        return [os.path.join(self.image_folder, name) for name in names]
+
+    def list_devices(self):
+        return [f"Simulator ({self.image_folder})"] if os.path.isdir(self.image_folder) else []
+
+    def connect(self, device_index=0):
+        if device_index != 0 or not os.path.isdir(self.image_folder):
+            raise ScannerError("לא נמצא סורק מחובר")
+        self._connected = True
+
+    def configure_adf(self):
+        return True
+
+    def pages(self):
+        if not self._connected:
+            raise ScannerError("הסורק לא מחובר")
+        paths = self._image_paths()
+        start = time.monotonic()
+        for page_num in range(len(paths) * self.repeat):
+            if self.pages_per_sec:
+                # כמו מזין אמיתי: דף n זמין רק n / קצב שניות אחרי תחילת הסריקה
+                delay = start + page_num / self.pages_per_sec - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield paths[page_num % len(paths)]
+
+    def page_to_image(self, page):
+        with Image.open(page) as image:
+            image.load()
+            return image.copy() if image.mode in ("1", "L", "RGB") else image.convert("RGB")
+
+    def close(self):
+        self._connected = False
+
+
+def create_scanner_backend(backend=DEFAULT_BACKEND):
+    """יוצר את שכבת הסורק לפי שם ("wia" או "simulator")"""
+    if backend == "simulator":
+        pages_per_sec = os.environ.get("SCANNER_SIMULATOR_PPS")
+        return SimulatorScanner(os.environ.get("SCANNER_SIMULATOR_DIR", "."),
+                                float(pages_per_sec) if pages_per_sec else None)
+    if backend == "wia":
+        return WiaScanner()
+    raise ValueError(f"סורק לא מוכר: {backend}")
@@ -1,202 +1,230 @@
 """
-מודול לסריקה ישירה מסורקים ב-Windows - תמיכה ב-ADF (סריקת אצווה)
+מודול לסריקה ישירה מסורקים - תמיכה ב-ADF (סריקת אצווה).
+הגישה לסורק עצמו עוברת דרך scanner_backends (WIA ב-Windows, או סימולטור).
 """
 import os
-import win32com.client
-import pythoncom
-import win32api
-import tempfile
+import queue
+import threading
+import time
 from uuid import uuid4
-from PIL import Image
 
-# קבועים של WIA
-WIA_MPC_HANDLE_DOCUMENT_HANDLING_SELECT = 3088
-WIA_MPC_HANDLE_DOCUMENT_HANDLING_STATUS = 3087
-WIA_FEEDER = 1
-WIA_FLATBED = 2
-WIA_DUPLEX = 4
+from scanner_backends import ScannerError, create_scanner_backend
+from pdf_encoders import DEFAULT_ENCODER, save_images_as_pdf, record_encoding, encoding_summary
+from metrics import DEFAULT_METRICS_DIR, RunMetrics, track_file, span, count as count_metric
+from progress import ProgressTracker
+from roi_templates import DEFAULT_TEMPLATES_PATH
 
-def get_scanners():
+# רזולוציית הסריקה
+SCAN_DPI = 300
+
+# מספר ה-threads שמבצעים OCR וסידור במקביל לסריקה
+SCAN_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# גודל התור בין המזין ל-OCR (דפים לכל worker) - מגביל את מספר הדפים שממתינים בזיכרון
+SCAN_QUEUE_PAGES_PER_WORKER = 2
+
+
+def get_scanners(backend=None):
     """מחזיר רשימה של סורקים זמינים"""
     try:
-        pythoncom.CoInitialize()
-        device_manager = win32com.client.Dispatch("WIA.DeviceManager")
-        scanners = []
-        for i in range(1, device_manager.DeviceInfos.Count + 1):
-            device_info = device_manager.DeviceInfos(i)
-            scanners.append(device_info.Properties("Name").Value)
-        return scanners
+        scanner = backend or create_scanner_backend()
+        return scanner.list_devices()
     except Exception as e:
         print(f"שגיאה בקבלת רשימת סורקים: {e}")
         return []
 
-def configure_adf(device):
-    """מנסה להגדיר את הסורק לעבוד במצב מזין דפים (ADF)"""
-    try:
-        # מנסה למצוא את המאפיין שאחראי על מקור הנייר
-        for prop in device.Properties:
-            if prop.PropertyID == WIA_MPC_HANDLE_DOCUMENT_HANDLING_SELECT:
-                # מנסה להגדיר ל-FEEDER (ערך 1)
-                # אם הסורק תומך, זה יגרום לו לקחת מהמגש
-                try:
-                    prop.Value = WIA_FEEDER
-                except:
-                    pass # אם נכשל, אולי הסורק הוא Flatbed בלבד
-                break
-    except Exception:
-        pass
-
-def save_wia_image_as_pdf(image_obj, output_path, dpi):
-    """פונקציית עזר לשמירת אובייקט WIA כקובץ PDF"""
-    temp_bmp_path = None
-    pil_image = None
-    
-    try:
-        # שמירה זמנית בטוחה
-        temp_dir = tempfile.gettempdir()
-        temp_filename = f"scan_{uuid4().hex}.bmp"
-        full_temp_path = os.path.join(temp_dir, temp_filename)
-        
-        # טריק נתיב קצר
-        with open(full_temp_path, 'w') as f: pass
+
+def _process_scanned_page(page_num, image, output_folder, regex_pattern, templates, index, log_callback,
+                          encoder=DEFAULT_ENCODER):
+    """
+    OCR, זיהוי ת"ז וסידור של דף אחד שנסרק.
+    ה-OCR רץ ישירות על התמונה שבזיכרון, וה-PDF נכתב פעם אחת בלבד - ישר למיקום הסופי.
+    מחזיר את גודל ה-PDF שנכתב (0 אם לא נכתב).
+    """
+    import pdf_processor
+
+    # ביצוע OCR וזיהוי מספר
+    log_callback("   מפענח טקסט (OCR)...")
+    match_value, rotation, words = pdf_processor.process_page_image(image, regex_pattern, templates,
+                                                                    log_callback, source_dpi=SCAN_DPI)
+
+    if not match_value:
+        # אם לא זוהה מספר - נשמר בתיקייה הראשית
+        pdf_path = os.path.join(output_folder, f"temp_page_{page_num}_{uuid4().hex[:6]}.pdf")
+        count_metric('pages_unidentified')
         try:
-            temp_bmp_path = win32api.GetShortPathName(full_temp_path)
-        except:
-            temp_bmp_path = full_temp_path
-        if os.path.exists(temp_bmp_path): os.remove(temp_bmp_path)
-
-        # שמירת התמונה הפיזית
-        image_obj.SaveFile(temp_bmp_path)
-        
-        # המרה ל-PDF
-        pil_image = Image.open(temp_bmp_path)
-        if pil_image.mode != "RGB":
-            pil_image = pil_image.convert("RGB")
-        
-        # יצירת תיקיות אם צריך
-        output_dir = os.path.dirname(output_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir, exist_ok=True)
-            
-        pil_image.save(output_path, "PDF", resolution=dpi)
-        return True
+            with span('save'):
+                written = save_images_as_pdf([image], pdf_path, encoder, SCAN_DPI)
+            count_metric('bytes_written', written)
+            log_callback("   ⚠ לא זוהה מס' תעודת זהות (נשמר בתיקייה הראשית)")
+            return written
+        except Exception as e:
+            log_callback(f"   ✗ שגיאה בשמירת הקובץ הסרוק: {e}")
+            return 0
+
+    # שימוש בלוגיקה של תיקיות (מס' ת"ז -> קובץ ממוספר); הדף נשמר ישר (כמו בעבר אחרי סיבוב מוצלח)
+    # יחד עם שכבת טקסט מה-OCR, כך שהקובץ ניתן לחיפוש
+    count_metric('pages_identified')
+    text_layers = [words] if pdf_processor.SEARCHABLE_PDF else None
+    if rotation:
+        with span('rotate'):
+            image = image.rotate(-rotation, expand=True)
+    new_full_path = pdf_processor.generate_id_folder_path(output_folder, match_value, index)
+    temp_pdf_path = new_full_path + ".tmp"
+    try:
+        with span('save'):
+            written = save_images_as_pdf([image], temp_pdf_path, encoder, SCAN_DPI, text_layers=text_layers)
+        count_metric('bytes_written', written)
+        with span('place'):
+            os.replace(temp_pdf_path, new_full_path)
+
+        # לוג יפה למשתמש
+        final_name = os.path.basename(new_full_path)
+        folder_name = os.path.basename(os.path.dirname(new_full_path))
+        log_callback(f"   ✓ זוהה: {match_value} -> נשמר ב: {folder_name}/{final_name}")
+        return written
 
     except Exception as e:
-        print(f"Error saving PDF: {e}")
-        return False
-    finally:
-        if pil_image:
-            try: pil_image.close()
-            except: pass
-        if temp_bmp_path and os.path.exists(temp_bmp_path):
-            try: os.remove(temp_bmp_path)
-            except: pass
-
-def scan_and_process(output_folder, regex_pattern, log_callback=None):
+        index.release(new_full_path)
+        if os.path.exists(temp_pdf_path):
+            os.remove(temp_pdf_path)
+        log_callback(f"   ✗ שגיאה בשמירת הקובץ הסרוק: {e}")
+        return 0
+
+
+def scan_and_process(output_folder, regex_pattern, log_callback=None, backend=None, workers=SCAN_WORKERS,
+                     encoder=DEFAULT_ENCODER, metrics_dir=DEFAULT_METRICS_DIR, progress_callback=None,
+                     templates_path=DEFAULT_TEMPLATES_PATH):
     """
     סריקת אצווה (Batch Scan):
     סורק את כל הדפים במזין, ולכל דף מבצע OCR, זיהוי ושמירה בתיקייה ייעודית.
+    backend - שכבת הסורק (ScannerBackend); ברירת מחדל לפי SCANNER_BACKEND.
+    encoder - קידוד ה-PDF שנכתב (pdf_encoders: g4 / jpeg / flate / rgb).
+    metrics_dir - זמני השלבים לכל דף (metrics): דוח בסיום וקובץ גריפה שמתעדכן במהלך הסריקה.
+    progress_callback - אירועי התקדמות (progress.ProgressTracker) לכל דף; הסך הכולל לא ידוע מראש (total=None).
+    נקרא מה-threads של ה-OCR.
+    templates_path - קובץ תבניות ה-ROI (None - תבניות בזיכרון בלבד, ללא שמירה).
+
+    הסריקה והעיבוד חופפים: ה-thread הנוכחי מושך דפים מהמזין (כתמונות בזיכרון) לתור חסום,
+    ו-workers threads מבצעים OCR וסידור במקביל - המזין לא מחכה ל-OCR של כל דף.
+    הלוג של כל דף נאסף ומודפס ברצף אחד (שורת הכותרת מציינת את מספר הדף).
     """
     import pdf_processor
-    
-    pythoncom.CoInitialize()
-    
+
     try:
+        scanner = backend or create_scanner_backend()
         if log_callback:
             log_callback("מתחבר לסורק...")
-        
-        # 1. חיבור לסורק
-        device_manager = win32com.client.Dispatch("WIA.DeviceManager")
-        if device_manager.DeviceInfos.Count == 0:
-            if log_callback: log_callback("✗ לא נמצא סורק מחובר")
+
+        # 1. חיבור לסורק (הראשון, או ניתן להוסיף לוגיקה לבחירה)
+        try:
+            scanner.connect()
+        except ScannerError as e:
+            if log_callback: log_callback(f"✗ {e}")
             return None
-            
-        # מתחבר לסורק הראשון (או ניתן להוסיף לוגיקה לבחירה)
-        device = device_manager.DeviceInfos(1).Connect()
-        
+
         # 2. ניסיון להגדיר ADF (מזין דפים)
-        configure_adf(device)
-        
-        item = device.Items(1)
-        
+        scanner.configure_adf()
+
         # הגדרות סריקה (DPI 300 וצבע)
-        for prop in item.Properties:
-            if prop.Name == "Horizontal Resolution": prop.Value = 300
-            if prop.Name == "Vertical Resolution": prop.Value = 300
-            if prop.Name == "Current Intent": prop.Value = 1 # Color
+        scanner.configure(dpi=SCAN_DPI, color=True)
 
-        WIA_FORMAT_BMP = "{B96B3CAB-0728-11D3-9D7B-0000F81EF32E}"
-        
         pages_scanned = 0
-        
+        # תבניות ROI - מיקום תעודת הזהות לפי פריסת הטופס
+        templates = pdf_processor.RoiTemplateStore(templates_path)
+        # מספור הקבצים בתיקיית היעד - בזיכרון, סריקה אחת לכל תיקיית ID
+        index = pdf_processor.DestinationIndex(output_folder)
+
+        log_lock = threading.Lock()
+        encoding_stats = {}
+        stats_lock = threading.Lock()
+        run_metrics = RunMetrics("scan", metrics_dir)
+        progress = ProgressTracker("scan", progress_callback)
+
+        def emit(messages):
+            if log_callback:
+                with log_lock:
+                    for message in messages:
+                        log_callback(message)
+
+        # 3. workers - OCR וסידור של דפים מהתור
+        workers = max(1, int(workers or 1))
+        page_queue = queue.Queue(maxsize=workers * SCAN_QUEUE_PAGES_PER_WORKER)
+
+        def ocr_worker():
+            while True:
+                item = page_queue.get()
+                if item is None:
+                    return
+                page_num, image = item
+                messages = [f"-- מעבד דף מספר {page_num} --"]
+                written = 0
+                with track_file(f"page_{page_num}") as recorder:
+                    try:
+                        written = _process_scanned_page(page_num, image, output_folder, regex_pattern,
+                                                        templates, index, messages.append, encoder)
+                        if written:
+                            with stats_lock:
+                                record_encoding(encoding_stats, image, written)
+                    except Exception as e:
+                        messages.append(f"   ✗ שגיאה בעיבוד הדף: {e}")
+                run_metrics.add_file(recorder.as_dict(), 'saved' if written else 'failed')
+                run_metrics.export_live()
+                progress.finished(pages=1)
+                emit(messages)
+
+        threads = [threading.Thread(target=ocr_worker, name=f"scan-ocr-{i + 1}", daemon=True)
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+
         if log_callback:
             log_callback("מתחיל סריקת אצווה (כל הדפים במגש)...")
+        start_time = time.perf_counter()
 
-        # === לולאת הסריקה ===
-        while True:
-            try:
-                # ניסיון למשוך דף. אם המגש ריק, WIA יזרוק שגיאה ונצא מהלולאה
-                image_obj = item.Transfer(WIA_FORMAT_BMP)
-                
+        # === לולאת הסריקה (מסתיימת כשהמזין מתרוקן) ===
+        # משיכת הדף והמרתו לתמונה נשארות ב-thread הזה (אובייקטי WIA/COM שייכים ל-thread שיצר אותם)
+        try:
+            for page in scanner.pages():
                 pages_scanned += 1
-                if log_callback: log_callback(f"-- מעבד דף מספר {pages_scanned} --")
-                
-                # יצירת שם זמני לדף הנוכחי
-                temp_pdf_name = f"temp_page_{pages_scanned}_{uuid4().hex[:6]}.pdf"
-                temp_pdf_path = os.path.join(output_folder, temp_pdf_name)
-                
-                # שמירה זמנית
-                success = save_wia_image_as_pdf(image_obj, temp_pdf_path, 300)
-                
-                if success:
-                    # ביצוע OCR וזיהוי מספר
-                    if log_callback: log_callback("   מפענח טקסט (OCR)...")
-                    
-                    match_value = pdf_processor.process_pdf_file(temp_pdf_path, regex_pattern)
-                    
-                    if match_value:
-                        # שימוש בלוגיקה של תיקיות (מס' ת"ז -> קובץ ממוספר)
-                        new_full_path = pdf_processor.generate_id_folder_path(output_folder, match_value)
-                        
-                        try:
-                            os.rename(temp_pdf_path, new_full_path)
-                            
-                            # לוג יפה למשתמש
-                            final_name = os.path.basename(new_full_path)
-                            folder_name = os.path.basename(os.path.dirname(new_full_path))
-                            if log_callback: log_callback(f"   ✓ זוהה: {match_value} -> נשמר ב: {folder_name}/{final_name}")
-                            
-                        except OSError as e:
-                            if log_callback: log_callback(f"   ✗ שגיאה בהעברה: {e}")
-                    else:
-                        # אם לא זוהה מספר
-                        if log_callback: log_callback("   ⚠ לא זוהה מס' תעודת זהות (נשמר בתיקייה הראשית)")
-                        
-                else:
-                    if log_callback: log_callback("   ✗ שגיאה בשמירת הקובץ הסרוק")
-
-            except Exception as e:
-                # שגיאה כאן בדרך כלל אומרת שהמזין ריק (נגמרו הדפים)
-                # בדיקה אם זו שגיאה "רגילה" של סיום סריקה
-                error_str = str(e)
-                if "0x80210003" in error_str or "paper is empty" in error_str.lower():
-                    # זה הקוד הרשמי של WIA ל"נגמר הנייר"
-                    pass 
-                elif pages_scanned > 0:
-                    # אם סרקנו כבר דפים ועפנו, כנראה פשוט נגמרו הדפים
-                    pass
-                else:
-                    # אם עפנו על ההתחלה, זו שגיאה אמיתית
-                    if log_callback: log_callback(f"סריקה הסתיימה או נעצרה: {e}")
-                
-                break # יציאה מהלולאה
+                try:
+                    image = scanner.page_to_image(page)
+                except Exception as e:
+                    emit([f"-- מעבד דף מספר {pages_scanned} --", f"   ✗ שגיאה בקריאת הדף מהסורק: {e}"])
+                    continue
+                # חסימה כשהתור מלא - קצב המזין מותאם לקצב ה-OCR
+                progress.started()
+                page_queue.put((pages_scanned, image))
 
+        except Exception as e:
+            # שגיאה לפני הדף הראשון היא שגיאה אמיתית; אחרי דפים שנסרקו - כנראה פשוט נגמרו הדפים
+            if pages_scanned == 0:
+                emit([f"סריקה הסתיימה או נעצרה: {e}"])
+        finally:
+            scanner.close()
+            for _ in threads:
+                page_queue.put(None)
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.perf_counter() - start_time
+        progress.close()
+        templates.save()
+        report_path = run_metrics.write_report()
         if log_callback:
             log_callback(f"\nסיכום: נסרקו ועובדו {pages_scanned} דפים.")
-            
+            if pages_scanned:
+                log_callback(f"זמן כולל: {elapsed:.1f} שניות ({pages_scanned / elapsed:.2f} דפים לשנייה, "
+                             f"OCR ב-{workers} threads)")
+                log_callback(encoding_summary(encoding_stats, encoder))
+            log_callback(templates.summary())
+            if pages_scanned:
+                log_callback(run_metrics.summary())
+            if report_path:
+                log_callback(f"דוח מדדים: {report_path}")
+
         return "Batch Complete"
 
     except Exception as e:
         if log_callback:
             log_callback(f"שגיאה כללית במודול הסריקה: {e}")
-        return None
\ No newline at end of file
+        return None
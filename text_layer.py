@@ -0,0 +1,74 @@
+"""
+שכבת טקסט בלתי נראית (render mode 3) מעל דף סרוק - הופכת את ה-PDF ל-searchable,
+כך שבהרצה הבאה הטקסט נקרא ישירות מהקובץ (extract_text_from_pdf) במקום OCR.
+
+מילים בעברית נכתבות בגופן Noto Hebrew המובנה ב-PyMuPDF (מוטמע, כ-10KB) מימין לשמאל,
+ושאר המילים (ספרות, אנגלית) ב-Helvetica הבסיסי - שלא מוטמע בקובץ.
+"""
+import re
+
+import fitz  # PyMuPDF
+
+# מספר הכתב של עברית בטבלת הגופנים המובנים של MuPDF
+HEBREW_SCRIPT = 5
+HEBREW_CHARS = re.compile(r'[֐-׿]')
+# סימני פיסוק שאין בגופן העברי - מוחלפים בגרש / גרשיים (ת.ז -> ת״ז), והשאר מושמטים
+HEBREW_PUNCTUATION = {'"': '״', '.': '״', "'": '׳'}
+
+_hebrew_font = None
+
+
+def _get_hebrew_font():
+    global _hebrew_font
+    if _hebrew_font is None:
+        _hebrew_font = fitz.Font(script=HEBREW_SCRIPT)
+    return _hebrew_font
+
+
+def _hebrew_word(font, word):
+    """משאיר רק תווים שיש להם צורה בגופן העברי (כדי שלא יוטמע גופן גיבוי גדול)"""
+    chars = (HEBREW_PUNCTUATION.get(ch, ch) for ch in word)
+    return ''.join(ch for ch in chars if font.has_glyph(ord(ch)))
+
+
+def add_text_layer(page, words):
+    """
+    מוסיף לדף שכבת טקסט בלתי נראית.
+    words - רשימת (x0, y0, x1, y1, טקסט) מנורמלת (0..1) ביחס לדף כפי שהוא מוצג (אחרי סיבוב).
+    מחזיר את מספר המילים שנכתבו.
+    """
+    rect = page.rect
+    derotate = page.derotation_matrix
+    hebrew_font = None
+    written = 0
+    for x0, y0, x1, y1, text in words:
+        text = str(text).strip()
+        if not text:
+            continue
+        width = (x1 - x0) * rect.width
+        height = (y1 - y0) * rect.height
+        if width <= 0 or height <= 0:
+            continue
+
+        if HEBREW_CHARS.search(text):
+            hebrew_font = hebrew_font or _get_hebrew_font()
+            text = _hebrew_word(hebrew_font, text)
+            unit_length = hebrew_font.text_length(text, fontsize=1)
+        else:
+            unit_length = fitz.get_text_length(text, fontname='helv', fontsize=1)
+        if not text or unit_length <= 0:
+            continue
+
+        # גודל הגופן - לפי גובה המילה, מוקטן אם הטקסט רחב מהתיבה
+        fontsize = min(height, width / unit_length)
+        origin = fitz.Point(x0 * rect.width, y1 * rect.height - height * 0.2) * derotate
+        if hebrew_font and HEBREW_CHARS.search(text):
+            writer = fitz.TextWriter(page.rect)
+            # right_to_left - הטקסט נשמר בסדר לוגי ונקרא נכון בחילוץ
+            writer.append((origin.x, origin.y), text, font=hebrew_font, fontsize=fontsize, right_to_left=True)
+            writer.write_text(page, render_mode=3, morph=(origin, fitz.Matrix(page.rotation)))
+        else:
+            page.insert_text(origin, text, fontname='helv', fontsize=fontsize,
+                             render_mode=3, rotate=page.rotation)
+        written += 1
+    return written
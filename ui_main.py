@@ -2,60 +2,110 @@
 ממשק משתמש ראשי לאפליקציית עיבוד PDF
 """
 import os
+import threading
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QLineEdit, QLabel, QTextEdit,
-                             QFileDialog, QMessageBox, QProgressBar)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                             QPushButton, QLineEdit, QLabel, QPlainTextEdit,
+                             QFileDialog, QMessageBox, QProgressBar, QSpinBox)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 import pdf_processor
 import scanner_module
+from log_buffer import LogBuffer
+from progress import describe
+
+# הלוג מוצג בקבוצות: הממשק מושך את ההודעות שהצטברו פעם ב-LOG_FLUSH_INTERVAL_MS
+LOG_FLUSH_INTERVAL_MS = 100
+# מספר השורות המרבי בתצוגת הלוג (השורות הישנות נמחקות; הלוג המלא נשמר בקובץ)
+LOG_MAX_BLOCKS = 5000
 
 
 class ProcessingThread(QThread):
-    """Thread לעיבוד PDFs ברקע כדי לא לחסום את ה-UI"""
-    log_signal = pyqtSignal(str)
+    """
+    Thread לעיבוד PDFs ברקע כדי לא לחסום את ה-UI.
+    הלוג נכתב ל-log_buffer (LogBuffer) - הממשק מושך ממנו בטיימר.
+    """
     finished_signal = pyqtSignal(dict)
     
-    def __init__(self, source_folder, destination_folder, regex_pattern):
+    def __init__(self, source_folder, destination_folder, regex_pattern, log_buffer, workers=1):
         super().__init__()
         self.source_folder = source_folder
         self.destination_folder = destination_folder
         self.regex_pattern = regex_pattern
+        self.log_buffer = log_buffer
+        self.workers = workers
+        # אירוע ההתקדמות האחרון (progress) - הממשק קורא אותו בטיימר
+        self.progress_event = None
+    
+    def report_progress(self, event):
+        """שומר את אירוע ההתקדמות האחרון"""
+        self.progress_event = event
     
     def run(self):
         """מריץ את עיבוד התיקייה"""
-        def log_callback(message):
-            self.log_signal.emit(message)
-        
         stats = pdf_processor.process_folder_with_destination(
             self.source_folder,
             self.destination_folder,
             self.regex_pattern,
-            log_callback
+            self.log_buffer.append,
+            workers=self.workers,
+            progress_callback=self.report_progress
+        )
+        self.finished_signal.emit(stats)
+
+
+class WatchThread(QThread):
+    """Thread למצב מעקב - מעבד קבצים חדשים בתיקיית המקור עד לעצירה"""
+    finished_signal = pyqtSignal(dict)
+    
+    def __init__(self, source_folder, destination_folder, regex_pattern, log_buffer):
+        super().__init__()
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.regex_pattern = regex_pattern
+        self.log_buffer = log_buffer
+        self.stop_event = threading.Event()
+    
+    def stop(self):
+        """עצירת המעקב (הקובץ שבעיבוד מסתיים קודם)"""
+        self.stop_event.set()
+    
+    def run(self):
+        """מריץ את המעקב"""
+        stats = pdf_processor.watch_folder_with_destination(
+            self.source_folder,
+            self.destination_folder,
+            self.regex_pattern,
+            self.log_buffer.append,
+            stop_event=self.stop_event
         )
         self.finished_signal.emit(stats)
 
 
 class ScanningThread(QThread):
     """Thread לסריקה ברקע"""
-    log_signal = pyqtSignal(str)
     finished_signal = pyqtSignal(bool)
     
-    def __init__(self, output_folder, regex_pattern):
+    def __init__(self, output_folder, regex_pattern, log_buffer):
         super().__init__()
         self.output_folder = output_folder
         self.regex_pattern = regex_pattern
+        self.log_buffer = log_buffer
+        self.progress_event = None
+    
+    def report_progress(self, event):
+        """שומר את אירוע ההתקדמות האחרון (נקרא מה-threads של ה-OCR)"""
+        self.progress_event = event
     
     def run(self):
         """מריץ את הסריקה"""
-        def log_callback(message):
-            self.log_signal.emit(message)
+        log_callback = self.log_buffer.append
         
         try:
             result = scanner_module.scan_and_process(
                 self.output_folder,
                 self.regex_pattern,
-                log_callback
+                log_callback,
+                progress_callback=self.report_progress
             )
             self.finished_signal.emit(result is not None)
         except Exception as e:
@@ -71,7 +121,12 @@ class MainWindow(QMainWindow):
         self.selected_folder = ""  # תיקיית יעד (לסריקה)
         self.source_folder = ""  # תיקיית מקור (לעיבוד)
         self.processing_thread = None
+        self.watch_thread = None
         self.scan_thread = None
+        # מאגרי הלוג של ה-threads הפעילים (עיבוד / מעקב / סריקה)
+        self.log_buffers = []
+        # אירוע ההתקדמות שמוצג כרגע
+        self.shown_progress = None
         self.init_ui()
         self.check_tesseract_on_startup()
     
@@ -138,9 +193,25 @@ class MainWindow(QMainWindow):
         main_layout.addLayout(regex_layout)
         
         # --- הוסף את השורה הזו כאן: ---
-        self.regex_edit.setText(r'\b\d{8,9}\b')  # הגדרת ברירת מחדל לתעודת זהות (תמיכה ב-8 ו-9 ספרות)
+        # ברירת מחדל לתעודת זהות (8 או 9 ספרות). גבול "ספרה / לא ספרה" ולא \b - ב-\b אות עברית
+        # צמודה למספר (למשל "זהות291417772" בשכבת הטקסט) אינה גבול מילה
+        self.regex_edit.setText(r'(?<!\d)\d{8,9}(?!\d)')
         # -----------------------------
         
+        # מספר תהליכי עיבוד במקביל
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel("תהליכים:")
+        workers_label.setMinimumWidth(80)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        # מסלול ה-OCR רץ במאגר נפרד (OCR_WORKERS) - ברירת המחדל משאירה לו את שאר הליבות
+        self.workers_spin.setValue(max(1, (os.cpu_count() or 1) - pdf_processor.OCR_WORKERS))
+        self.workers_spin.setToolTip(f"מספר הקבצים שמעובדים במקביל (בנוסף ל-{pdf_processor.OCR_WORKERS} תהליכי OCR)")
+        workers_layout.addWidget(workers_label)
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addStretch()
+        main_layout.addLayout(workers_layout)
+        
         # כפתור הרצה
         self.run_button = QPushButton("הרץ עיבוד")
         self.run_button.setMinimumHeight(40)
@@ -162,6 +233,13 @@ class MainWindow(QMainWindow):
         self.run_button.clicked.connect(self.start_processing)
         main_layout.addWidget(self.run_button)
         
+        # כפתור מצב מעקב (עיבוד רציף של קבצים חדשים)
+        self.watch_button = QPushButton("הפעל מעקב תיקייה")
+        self.watch_button.setMinimumHeight(30)
+        self.watch_button.setToolTip("מעבד כל קובץ PDF חדש בתיקיית המקור ברגע שהוא מגיע")
+        self.watch_button.clicked.connect(self.toggle_watching)
+        main_layout.addWidget(self.watch_button)
+        
         # כפתור סריקה
         scan_layout = QHBoxLayout()
         self.scan_button = QPushButton("סרוק מסמך")
@@ -190,32 +268,46 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         main_layout.addWidget(self.progress_bar)
         
+        # קצב וזמן משוער לסיום
+        self.progress_label = QLabel()
+        self.progress_label.setVisible(False)
+        main_layout.addWidget(self.progress_label)
+        
         # אזור לוג
         log_label = QLabel("לוג פעילות:")
         main_layout.addWidget(log_label)
         
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setFont(QFont("Courier", 9))
         self.log_text.setPlaceholderText("הלוג יופיע כאן...")
+        self.log_text.setMaximumBlockCount(LOG_MAX_BLOCKS)
         main_layout.addWidget(self.log_text)
         
+        # טיימר שמושך את הודעות הלוג מה-threads ומציג אותן בבת אחת
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_logs)
+        self.log_timer.timeout.connect(self.update_progress)
+        self.log_timer.start()
+        
         # הודעת ברוכים הבאים
-        self.log_text.append("ברוכים הבאים לכלי שינוי שמות קבצי PDF")
-        self.log_text.append("1. בחר תיקיית מקור (מכילה קבצי PDF searchable)")
-        self.log_text.append("2. בחר תיקיית יעד (לשמירת הקבצים המסודרים)")
-        self.log_text.append("3. הזן תבנית REGEX לחיפוש")
-        self.log_text.append("4. לחץ על 'הרץ עיבוד' לעיבוד תיקייה או 'סרוק מסמך' לסריקה ישירה\n")
+        self.log_text.appendPlainText("ברוכים הבאים לכלי שינוי שמות קבצי PDF")
+        self.log_text.appendPlainText("1. בחר תיקיית מקור (מכילה קבצי PDF searchable)")
+        self.log_text.appendPlainText("2. בחר תיקיית יעד (לשמירת הקבצים המסודרים)")
+        self.log_text.appendPlainText("3. הזן תבנית REGEX לחיפוש")
+        self.log_text.appendPlainText("4. לחץ על 'הרץ עיבוד' לעיבוד תיקייה או 'סרוק מסמך' לסריקה ישירה")
+        self.log_text.appendPlainText("   ('הפעל מעקב תיקייה' - עיבוד רציף של כל קובץ חדש שמגיע לתיקיית המקור)\n")
     
     def check_tesseract_on_startup(self):
         """בודק זמינות Tesseract OCR בהתחלה"""
         try:
             import pytesseract
             pytesseract.get_tesseract_version()
-            self.log_text.append("✓ Tesseract OCR זמין - תמיכה ב-OCR מופעלת\n")
+            self.log_text.appendPlainText("✓ Tesseract OCR זמין - תמיכה ב-OCR מופעלת\n")
         except Exception:
-            self.log_text.append("⚠ Tesseract OCR לא נמצא - רק PDFs searchable יעובדו\n")
-            self.log_text.append("  (להורדת Tesseract: https://github.com/UB-Mannheim/tesseract/wiki)\n")
+            self.log_text.appendPlainText("⚠ Tesseract OCR לא נמצא - רק PDFs searchable יעובדו\n")
+            self.log_text.appendPlainText("  (להורדת Tesseract: https://github.com/UB-Mannheim/tesseract/wiki)\n")
     
     def browse_source_folder(self):
         """פתיחת דיאלוג לבחירת תיקיית מקור"""
@@ -228,7 +320,7 @@ class MainWindow(QMainWindow):
         if folder:
             self.source_folder = folder
             self.source_folder_path_edit.setText(folder)
-            self.log_text.append(f"נבחרה תיקיית מקור: {folder}\n")
+            self.log_text.appendPlainText(f"נבחרה תיקיית מקור: {folder}\n")
     
     def browse_folder(self):
         """פתיחת דיאלוג לבחירת תיקיית יעד"""
@@ -241,7 +333,7 @@ class MainWindow(QMainWindow):
         if folder:
             self.selected_folder = folder
             self.folder_path_edit.setText(folder)
-            self.log_text.append(f"נבחרה תיקיית יעד: {folder}\n")
+            self.log_text.appendPlainText(f"נבחרה תיקיית יעד: {folder}\n")
     
     def validate_inputs(self):
         """בדיקת תקינות הקלט"""
@@ -289,7 +381,8 @@ class MainWindow(QMainWindow):
             return
         
         # בדיקה אם כבר רץ עיבוד
-        if self.processing_thread and self.processing_thread.isRunning():
+        if (self.processing_thread and self.processing_thread.isRunning()) or \
+                (self.watch_thread and self.watch_thread.isRunning()):
             QMessageBox.warning(
                 self,
                 "עיבוד בתהליך",
@@ -317,24 +410,74 @@ class MainWindow(QMainWindow):
         
         # ניקוי לוג
         self.log_text.clear()
-        self.log_text.append("מתחיל עיבוד...\n")
+        self.log_text.appendPlainText("מתחיל עיבוד...\n")
         
         # השבתת כפתור
         self.run_button.setEnabled(False)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        self.progress_bar.setRange(0, 0)  # עד האירוע הראשון (ספירת הקבצים)
         
         # יצירת thread לעיבוד
         regex_pattern = self.regex_edit.text().strip()
         self.processing_thread = ProcessingThread(
             self.source_folder,
             self.selected_folder,
-            regex_pattern
+            regex_pattern,
+            self.start_log("batch"),
+            workers=self.workers_spin.value()
         )
-        self.processing_thread.log_signal.connect(self.append_log)
         self.processing_thread.finished_signal.connect(self.processing_finished)
         self.processing_thread.start()
     
+    def toggle_watching(self):
+        """הפעלה / עצירה של מצב מעקב"""
+        if self.watch_thread and self.watch_thread.isRunning():
+            self.watch_thread.stop()
+            self.watch_button.setEnabled(False)
+            self.watch_button.setText("עוצר מעקב...")
+            return
+        
+        if not self.validate_inputs():
+            return
+        
+        if self.processing_thread and self.processing_thread.isRunning():
+            QMessageBox.warning(
+                self,
+                "עיבוד בתהליך",
+                "עיבוד כבר רץ. אנא המתן לסיום."
+            )
+            return
+        
+        if not os.access(self.selected_folder, os.W_OK) or not os.access(self.source_folder, os.W_OK):
+            QMessageBox.warning(
+                self,
+                "שגיאת הרשאות",
+                "מצב מעקב דורש הרשאות כתיבה לתיקיית המקור ולתיקיית היעד."
+            )
+            return
+        
+        self.log_text.clear()
+        self.log_text.appendPlainText("מתחיל מעקב...\n")
+        self.run_button.setEnabled(False)
+        self.watch_button.setText("עצור מעקב")
+        
+        regex_pattern = self.regex_edit.text().strip()
+        self.watch_thread = WatchThread(
+            self.source_folder,
+            self.selected_folder,
+            regex_pattern,
+            self.start_log("watch")
+        )
+        self.watch_thread.finished_signal.connect(self.watching_finished)
+        self.watch_thread.start()
+    
+    def watching_finished(self, stats):
+        """טיפול בסיום מצב מעקב"""
+        self.finish_log(self.watch_thread.log_buffer)
+        self.run_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
+        self.watch_button.setText("הפעל מעקב תיקייה")
+    
     def start_scanning(self):
         """התחלת סריקה ישירה"""
         if not self.selected_folder:
@@ -385,21 +528,28 @@ class MainWindow(QMainWindow):
         
         # השבתת כפתור
         self.scan_button.setEnabled(False)
-        self.log_text.append("\n=== מתחיל סריקה ===\n")
+        self.log_text.appendPlainText("\n=== מתחיל סריקה ===\n")
+        if not (self.processing_thread and self.processing_thread.isRunning()):
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)  # מספר הדפים במזין לא ידוע מראש
         
         # הרצת סריקה ב-thread נפרד
         regex_pattern = self.regex_edit.text().strip()
         self.scan_thread = ScanningThread(
             self.selected_folder,
-            regex_pattern
+            regex_pattern,
+            self.start_log("scan")
         )
-        self.scan_thread.log_signal.connect(self.append_log)
         self.scan_thread.finished_signal.connect(self.scanning_finished)
         self.scan_thread.start()
     
     def scanning_finished(self, success):
         """טיפול בסיום הסריקה"""
+        self.finish_log(self.scan_thread.log_buffer)
+        self.update_progress(self.scan_thread)
         self.scan_button.setEnabled(True)
+        if not (self.processing_thread and self.processing_thread.isRunning()):
+            self.progress_bar.setVisible(False)
         if success:
             QMessageBox.information(
                 self,
@@ -413,15 +563,66 @@ class MainWindow(QMainWindow):
                 "אירעה שגיאה בסריקה. בדוק את הלוג לפרטים."
             )
     
-    def append_log(self, message):
-        """הוספת הודעה ללוג"""
-        self.log_text.append(message)
-        # גלילה אוטומטית למטה
+    def start_log(self, kind):
+        """יוצר מאגר לוג ל-thread חדש (הלוג המלא נכתב לקובץ)"""
+        log_buffer = LogBuffer(kind)
+        self.log_buffers.append(log_buffer)
+        if log_buffer.path:
+            self.log_text.appendPlainText(f"הלוג המלא נשמר בקובץ: {log_buffer.path}\n")
+        return log_buffer
+    
+    def finish_log(self, log_buffer):
+        """מציג את ההודעות האחרונות של thread שהסתיים וסוגר את קובץ הלוג שלו"""
+        self.flush_logs()
+        log_buffer.close()
+        if log_buffer in self.log_buffers:
+            self.log_buffers.remove(log_buffer)
+    
+    def update_progress(self, thread=None):
+        """
+        מעדכן את פס ההתקדמות ואת שורת הקצב לפי אירוע ההתקדמות האחרון של thread
+        (ברירת מחדל: של עיבוד התיקייה אם הוא רץ, אחרת של הסריקה).
+        """
+        if thread is None:
+            thread = self.processing_thread
+            if not (thread and thread.isRunning()) and self.scan_thread:
+                thread = self.scan_thread
+        event = thread.progress_event if thread else None
+        if event is None or event is self.shown_progress:
+            return
+        self.shown_progress = event
+        if event['total']:
+            self.progress_bar.setRange(0, event['total'])
+            self.progress_bar.setValue(event['done'])
+        else:
+            self.progress_bar.setRange(0, 0)
+        self.progress_label.setText(describe(event))
+        self.progress_label.setVisible(True)
+    
+    def flush_logs(self):
+        """
+        מציג את כל ההודעות שהצטברו מאז הפעם הקודמת בעדכון אחד של התצוגה.
+        גלילה אוטומטית למטה - רק אם התצוגה כבר הייתה בסוף (כדי לא להפריע לקריאת שורות קודמות).
+        """
+        lines = []
+        for log_buffer in self.log_buffers:
+            messages, dropped = log_buffer.drain()
+            if dropped:
+                where = f" (הלוג המלא: {log_buffer.path})" if log_buffer.path else ""
+                lines.append(f"... {dropped} הודעות לא מוצגות{where}")
+            lines.extend(messages)
+        if not lines:
+            return
         scrollbar = self.log_text.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.log_text.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
     
     def processing_finished(self, stats):
         """טיפול בסיום העיבוד"""
+        self.finish_log(self.processing_thread.log_buffer)
+        self.update_progress(self.processing_thread)
         self.progress_bar.setVisible(False)
         self.run_button.setEnabled(True)
         